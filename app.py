@@ -1,7 +1,11 @@
 import os
 import io
 import json
-import base64
+import time
+import uuid
+import hashlib
+from types import SimpleNamespace
+from functools import partial
 from datetime import datetime
 
 import streamlit as st
@@ -12,23 +16,27 @@ from database import (
     auth_login,
     auth_signup,
     auth_logout,
-    save_extraction,
-    load_extractions,
+    get_extractions_feed,
 )
+from storage import get_storage, LOCAL_USER_ID
 from ocr_extraction import (
     set_ocr_context,
     get_file_type,
     detect_blur,
+    compute_dhash,
     extract_face_photo,
-    perform_ocr,
-    detect_doc_type,
-    extract_aadhaar_fields,
-    extract_pan_fields,
-    extract_dl_fields,
-    extract_voter_fields,
+    extract_fields,
+    EXPECTED_FIELD_COUNTS,
 )
-from ui_helpers import render_kv_table, render_confidence_bar, photo_html
+from metrics import METRICS, timed
+from event_log import EventLog, get_event_sink
+from artifact_store import get_artifact_store
+from dedup import get_phash_index
+from ocr_engines import ENGINES, get_engine, recognize_auto
+from ui_helpers import render_kv_table, render_confidence_bar, photo_html, cached_preview
 from sidebar_ui import render_sidebar
+from records import Extraction
+from export import export_to_bytes, fields_csv
 
 
 # ================================================================
@@ -45,7 +53,11 @@ st.markdown(APP_CSS, unsafe_allow_html=True)
 # 3. CONFIG
 # ================================================================
 OCR_API_KEY = os.getenv("OCR_API_KEY", "")
-supabase = get_supabase()
+storage = get_storage()
+# The sqlite backend runs without hosted auth (and may have no Supabase project).
+supabase = get_supabase() if storage.has_auth else None
+artifacts = get_artifact_store()
+phash_index = get_phash_index(artifacts)
 
 # ================================================================
 # 4. SESSION STATE INIT
@@ -53,10 +65,16 @@ supabase = get_supabase()
 for key, default in [
     ("user", None),
     ("access_token", None),
-    ("failure_log", []),
+    ("event_log_page", 0),
+    ("sb_records", None),
+    ("sb_counts", None),
+    ("pending_duplicate", None),
+    ("force_ocr", False),
     ("ocr_mode", "Normal"),
-    ("camera_bytes", None),
+    ("camera_artifact", None),
     ("camera_fsize", 0),
+    ("camera_hash", None),
+    ("preview_cache", {}),
     ("camera_open", False),
     ("camera_widget_nonce", 0),
     ("last_result", None),
@@ -66,16 +84,55 @@ for key, default in [
     if key not in st.session_state:
         st.session_state[key] = default
 
+if "event_log" not in st.session_state:
+    st.session_state.event_log = EventLog(session_id=uuid.uuid4().hex[:12], sink=get_event_sink())
+st.session_state.current_doc_hash = None
+
 
 # ================================================================
 # 5. HELPERS
 # ================================================================
-def log_failure(context: str, message: str):
-    ts = datetime.now().strftime("%H:%M:%S")
-    st.session_state.failure_log.append({"ts": ts, "ctx": context, "msg": message})
+def log_failure(context: str, message: str, severity: str = "error", duration_ms=None):
+    st.session_state.event_log.log(
+        context,
+        message,
+        severity=severity,
+        duration_ms=duration_ms,
+        doc_hash=st.session_state.current_doc_hash,
+    )
+
+
+def clear_last_result():
+    res = st.session_state.last_result
+    if res:
+        artifacts.delete(res.get("pages_id"), res.get("photo_id"))
+    st.session_state.last_result = None
+
+
+def save_document_result(doc_type, fields, page_texts, file_name, file_size_bytes, photo_bytes=None):
+    saved, save_err = storage.save_extraction(
+        st.session_state.user.id,
+        doc_type,
+        fields,
+        "\n".join(page_texts),
+        file_name,
+        file_size_bytes,
+        photo_bytes=photo_bytes,
+        log_failure=log_failure,
+        pages=page_texts if len(page_texts) > 1 else None,
+    )
+    if saved and get_extractions_feed() is None:
+        st.session_state.sb_records = None
+        st.session_state.sb_counts = None
+    return saved, save_err
+
+
+def clear_camera_capture():
+    artifacts.delete(st.session_state.camera_artifact)
+    st.session_state.camera_artifact = None
 
 
-set_ocr_context(api_key=OCR_API_KEY, logger=log_failure)
+ocr_client = set_ocr_context(api_key=OCR_API_KEY, logger=log_failure)
 
 
 def render_auth_ui():
@@ -121,6 +178,8 @@ def render_auth_ui():
 # ================================================================
 # 6. AUTH GATE
 # ================================================================
+if not st.session_state.user and not storage.has_auth:
+    st.session_state.user = SimpleNamespace(id=LOCAL_USER_ID, email=f"{LOCAL_USER_ID}@localhost")
 if not st.session_state.user:
     render_auth_ui()
     st.stop()
@@ -177,7 +236,7 @@ with st.container(border=True):
         else:
             if st.button("📄 Text Extraction", use_container_width=True, key="btn_mode_text"):
                 st.session_state.ocr_mode = "Normal"
-                st.session_state.last_result = None
+                clear_last_result()
                 st.rerun()
     with col_m2:
         if mode == "Document":
@@ -189,7 +248,7 @@ with st.container(border=True):
         else:
             if st.button("🪪 Document OCR", use_container_width=True, key="btn_mode_doc"):
                 st.session_state.ocr_mode = "Document"
-                st.session_state.last_result = None
+                clear_last_result()
                 st.rerun()
 
 mode = st.session_state.ocr_mode
@@ -214,8 +273,8 @@ else:
 
 st.divider()
 
-st.markdown('<div class="section-label">🌍 Language &nbsp;&nbsp; ⚙ OCR Engine</div>', unsafe_allow_html=True)
-col_l, col_e = st.columns(2)
+st.markdown('<div class="section-label">🌍 Language &nbsp;&nbsp; ⚙ OCR Engine &nbsp;&nbsp; 🖥 Backend</div>', unsafe_allow_html=True)
+col_l, col_e, col_b = st.columns(3)
 languages = {
     "English": "eng",
     "Spanish": "spa",
@@ -225,13 +284,17 @@ languages = {
     "Chinese (Simplified)": "chs",
     "Chinese (Traditional)": "cht",
 }
-engine_options = {"Engine 1 (Fast)": 1, "Engine 2 (Better)": 2, "Engine 3 (Best - Handwriting)": 3}
+engine_options = {"Auto (Fast → Best)": "auto", "Engine 1 (Fast)": 1, "Engine 2 (Better)": 2, "Engine 3 (Best - Handwriting)": 3}
 with col_l:
     selected_language = st.selectbox("Language", list(languages.keys()), label_visibility="collapsed")
     language_code = languages[selected_language]
 with col_e:
     selected_engine = st.selectbox("OCR Engine", list(engine_options.keys()), label_visibility="collapsed")
     engine_code = engine_options[selected_engine]
+with col_b:
+    backend_options = {cls.label: name for name, cls in ENGINES.items()}
+    selected_backend = st.selectbox("OCR Backend", list(backend_options.keys()), label_visibility="collapsed")
+    backend = backend_options[selected_backend]
 
 st.divider()
 
@@ -239,9 +302,15 @@ st.divider()
 # 10. SPLIT SCREEN — Left: Input  |  Right: Result
 # ================================================================
 MAX_FILE_BYTES = 5 * 1024 * 1024
-col_left, col_right = st.columns([1, 1.4], gap="large")
 
-with col_left:
+
+# Input, result and sidebar panels are fragments: widget interactions inside one
+# rerun only that panel. Anything another panel depends on is passed in as an
+# argument or read from session state, and cross-panel changes use a full rerun.
+@st.fragment
+def render_input_panel(mode, language_code, engine_code, backend):
+    # Fragment-only reruns skip the module-level setup, so rebind the OCR context.
+    ocr_client = set_ocr_context(api_key=OCR_API_KEY, logger=log_failure)
     st.markdown('<div class="section-label" style="margin-top:0;">Input Source</div>', unsafe_allow_html=True)
     input_tab1, input_tab2 = st.tabs(["📂 Upload File", "📷 Camera"])
 
@@ -261,12 +330,13 @@ with col_left:
                 st.error(f"❌ File too large ({round(_sz/1024/1024,2)} MB). Max 5 MB.")
             else:
                 uploaded_file = _uf
-                st.session_state.camera_bytes = None
+                if st.session_state.camera_artifact:
+                    clear_camera_capture()
                 file_type_check = get_file_type(_uf)
                 if file_type_check.startswith("image"):
-                    _uf.seek(0)
-                    st.image(_uf, use_container_width=True, caption=f"📄 {_uf.name} · {round(_sz/1024,1)} KB")
-                    _uf.seek(0)
+                    preview_key = f"upload:{getattr(_uf, 'file_id', _uf.name)}:{_sz}"
+                    preview = cached_preview(st.session_state.preview_cache, preview_key, _uf.getvalue)
+                    st.image(preview, use_container_width=True, caption=f"📄 {_uf.name} · {round(_sz/1024,1)} KB")
                 else:
                     st.caption(f"📄 {_uf.name} · {round(_sz/1024,1)} KB")
 
@@ -276,11 +346,11 @@ with col_left:
         with b1:
             if st.button("📸 Open Camera", use_container_width=True, key="btn_open_camera"):
                 st.session_state.camera_open = True
-                st.rerun()
+                st.rerun(scope="fragment")
         with b2:
             if st.button("✖ Close Camera", use_container_width=True, key="btn_close_camera"):
                 st.session_state.camera_open = False
-                st.rerun()
+                st.rerun(scope="fragment")
 
         camera_image = None
         if st.session_state.camera_open:
@@ -297,29 +367,81 @@ with col_left:
             if _csz > MAX_FILE_BYTES:
                 st.error("❌ Capture too large.")
             else:
-                st.session_state.camera_bytes = camera_image.read()
+                capture = camera_image.read()
+                clear_camera_capture()
+                st.session_state.camera_artifact = artifacts.put_bytes(capture)
                 st.session_state.camera_fsize = _csz
+                st.session_state.camera_hash = hashlib.sha256(capture).hexdigest()[:16]
                 st.session_state.camera_open = False
 
-        if st.session_state.camera_bytes:
-            cam_buf = io.BytesIO(st.session_state.camera_bytes)
+        camera_bytes = artifacts.get_bytes(st.session_state.camera_artifact)
+        if camera_bytes:
+            cam_buf = io.BytesIO(camera_bytes)
             cam_buf.name = "camera_capture.jpg"
             cam_buf.type = "image/jpeg"
             cam_buf.seek(0)
             if uploaded_file is None:
                 uploaded_file = cam_buf
-            st.image(io.BytesIO(st.session_state.camera_bytes), use_container_width=True, caption=f"📷 {round(st.session_state.camera_fsize/1024,1)} KB")
+            preview = cached_preview(
+                st.session_state.preview_cache,
+                f"camera:{st.session_state.camera_hash}",
+                lambda: camera_bytes,
+            )
+            st.image(preview, use_container_width=True, caption=f"📷 {round(st.session_state.camera_fsize/1024,1)} KB")
             if st.button("🗑 Clear Photo", key="btn_clear_cam"):
-                st.session_state.camera_bytes = None
+                clear_camera_capture()
                 st.session_state.camera_fsize = 0
                 st.session_state.camera_widget_nonce += 1
                 st.session_state.camera_open = False
-                st.rerun()
+                st.rerun(scope="fragment")
 
     st.markdown("<div style='margin-top:14px;'></div>", unsafe_allow_html=True)
     extract_clicked = st.button("🚀 Extract Text", use_container_width=True, key="btn_extract")
 
-    if extract_clicked and uploaded_file:
+    # The offer belongs to the file it was made for; a new upload or capture drops it.
+    source_key = getattr(uploaded_file, "file_id", None) or (
+        f"camera:{st.session_state.camera_hash}" if uploaded_file is not None else None
+    )
+    pending = st.session_state.pending_duplicate
+    if pending and pending.get("source") != source_key:
+        pending = st.session_state.pending_duplicate = None
+    if pending and not extract_clicked:
+        st.info(
+            f"♻ This looks like the {pending['label']} you extracted at {pending['time']} "
+            f"(distance {pending['distance']}). Reuse it instead of spending an OCR call?"
+        )
+        dp1, dp2 = st.columns(2)
+        with dp1:
+            if st.button("♻ Reuse Result", use_container_width=True, key="btn_dup_reuse"):
+                entry, _ = phash_index.find(
+                    st.session_state.user.id, pending["dhash"], max_distance=0, mode=mode, language=language_code
+                )
+                st.session_state.pending_duplicate = None
+                if entry is not None:
+                    clear_last_result()
+                    reused = dict(phash_index.materialize(entry), reused=True, saved=None, save_err=None)
+                    if reused.get("mode") == "Document" and reused.get("fields"):
+                        reused["saved"], reused["save_err"] = save_document_result(
+                            reused["doc_type"],
+                            reused["fields"],
+                            artifacts.get_json(reused.get("pages_id")) or [],
+                            reused.get("file_name") or "",
+                            reused.get("file_size_bytes") or 0,
+                            photo_bytes=artifacts.get_bytes(reused.get("photo_id")),
+                        )
+                    st.session_state.last_result = reused
+                    clear_camera_capture()
+                st.rerun(scope="app")
+        with dp2:
+            if st.button("🔍 Run OCR Anyway", use_container_width=True, key="btn_dup_force"):
+                st.session_state.pending_duplicate = None
+                st.session_state.force_ocr = True
+                st.rerun(scope="fragment")
+
+    force_ocr = st.session_state.force_ocr
+    st.session_state.force_ocr = False
+    if (extract_clicked or force_ocr) and uploaded_file:
+        st.session_state.pending_duplicate = None
         try:
             uploaded_file.seek(0)
             raw_bytes = uploaded_file.read()
@@ -328,6 +450,8 @@ with col_left:
             raw_bytes = None
 
         if raw_bytes:
+            extract_started = time.perf_counter()
+            st.session_state.current_doc_hash = hashlib.sha256(raw_bytes).hexdigest()[:16]
             file_type = get_file_type(uploaded_file)
             file_name = getattr(uploaded_file, "name", "camera_capture.jpg")
             is_pdf = file_type == "application/pdf" or file_name.lower().endswith(".pdf")
@@ -344,74 +468,104 @@ with col_left:
                 elif blur_score < 120:
                     st.warning(f"Slightly soft (score: {round(blur_score,1)}). Will enhance.")
 
+            dhash = None
+            if blur_ok and file_type.startswith("image"):
+                dhash = compute_dhash(io.BytesIO(raw_bytes))
+                match, distance = (None, None) if force_ocr or dhash is None else phash_index.find(
+                    st.session_state.user.id, dhash, mode=mode, language=language_code
+                )
+                if match is not None:
+                    st.session_state.pending_duplicate = {
+                        "source": source_key,
+                        "dhash": match["dhash"],
+                        "distance": distance,
+                        "time": datetime.fromtimestamp(match["ts"]).strftime("%H:%M:%S"),
+                        "label": match["result"].get("file_name") or "document",
+                    }
+                    log_failure("Near Duplicate", f"matched earlier upload (distance {distance})", severity="info")
+                    st.rerun(scope="fragment")
+
             if blur_ok:
-                photo_b64 = None
+                photo_bytes = None
                 if file_type.startswith("image") and mode == "Document":
                     with st.spinner("📸 Detecting photo..."):
-                        photo_b64 = extract_face_photo(io.BytesIO(raw_bytes))
+                        photo_bytes = extract_face_photo(io.BytesIO(raw_bytes))
 
                 with st.spinner("🔍 Extracting text..."):
-                    result = perform_ocr(raw_bytes, language_code, engine_code, is_pdf=is_pdf)
+                    if engine_code == "auto":
+                        result = recognize_auto(
+                            get_engine(backend), raw_bytes, language_code,
+                            is_pdf=is_pdf, client=ocr_client, parse=mode == "Document",
+                        )
+                    else:
+                        result = get_engine(backend).recognize(raw_bytes, language_code, engine_code, is_pdf=is_pdf, client=ocr_client)
 
-                st.session_state.camera_bytes = None
+                clear_camera_capture()
 
                 if "error" in result:
+                    log_failure("Extract", result["error"], duration_ms=(time.perf_counter() - extract_started) * 1000)
                     st.error(f"❌ {result['error']}")
                 elif result.get("ParsedResults"):
                     parsed_results = result["ParsedResults"]
                     processing_time = round(float(result.get("ProcessingTimeInMilliseconds", 0)) / 1000, 3)
                     combined_text = "\n".join(pr.get("ParsedText", "") for pr in parsed_results)
 
-                    if mode == "Document":
-                        doc_type = detect_doc_type(combined_text)
-                        if doc_type == "aadhaar":
-                            fields = extract_aadhaar_fields(combined_text)
-                        elif doc_type == "pan":
-                            fields = extract_pan_fields(combined_text)
-                        elif doc_type == "dl":
-                            fields = extract_dl_fields(combined_text)
-                        elif doc_type == "voter":
-                            fields = extract_voter_fields(combined_text)
-                        else:
-                            fields = {}
+                    auto = result.get("AutoEngine") or {}
+                    if mode == "Document" and auto.get("parsed"):
+                        doc_type, fields = auto["parsed"]
+                    elif mode == "Document":
+                        with timed("parse"):
+                            doc_type, fields = extract_fields(combined_text)
                     else:
                         doc_type = "normal"
                         fields = {}
 
+                    # Only small values and artifact handles live in session state.
+                    clear_last_result()
                     st.session_state.last_result = {
                         "mode": mode,
                         "doc_type": doc_type,
                         "fields": fields,
-                        "raw_text": combined_text,
-                        "photo_b64": photo_b64,
+                        "pages_id": artifacts.put_json([pr.get("ParsedText", "") for pr in parsed_results]),
+                        "page_count": len(parsed_results),
+                        "photo_id": artifacts.put_bytes(photo_bytes) if photo_bytes else None,
                         "processing_time": processing_time,
                         "file_name": file_name,
                         "file_size_bytes": len(raw_bytes),
-                        "parsed_results": parsed_results,
                     }
 
                     if mode == "Document" and fields:
-                        saved, save_err = save_extraction(
-                            supabase,
+                        saved, save_err = save_document_result(
                             doc_type,
                             fields,
-                            combined_text,
+                            [pr.get("ParsedText", "") for pr in parsed_results],
                             file_name,
                             len(raw_bytes),
-                            photo_b64=photo_b64,
-                            log_failure=log_failure,
+                            photo_bytes=photo_bytes,
                         )
                         st.session_state.last_result["saved"] = saved
                         st.session_state.last_result["save_err"] = save_err
 
-                    st.rerun()
+                    if dhash is not None:
+                        phash_index.add(st.session_state.user.id, dhash, st.session_state.last_result, mode, language_code)
+
+                    log_failure(
+                        "Extract",
+                        f"{doc_type} · {len(fields)} field(s) · {len(parsed_results)} page(s)"
+                        + (f" · engine {auto['engine']} (auto)" if auto else ""),
+                        severity="info",
+                        duration_ms=(time.perf_counter() - extract_started) * 1000,
+                    )
+                    st.rerun(scope="app")
                 else:
                     st.error("❌ No text could be extracted.")
 
-    elif extract_clicked and not uploaded_file:
+    elif (extract_clicked or force_ocr) and not uploaded_file:
         st.warning("⚠️ Please upload a file or take a photo first.")
 
-with col_right:
+
+@st.fragment
+def render_result_panel():
     st.markdown('<div class="section-label" style="margin-top:0;">Extracted Result</div>', unsafe_allow_html=True)
     res = st.session_state.last_result
 
@@ -426,10 +580,17 @@ with col_right:
             unsafe_allow_html=True,
         )
     else:
+        page_texts = artifacts.get_json(res.get("pages_id"))
+        if page_texts is None:
+            st.info("ℹ️ The raw text for this result has expired from the server cache.")
+            page_texts = []
+        if res.get("reused"):
+            st.caption("♻ Reused an earlier extraction of this document — no OCR call made.")
+
         if res["mode"] == "Document":
             doc_type = res["doc_type"]
             fields = res["fields"]
-            photo_b64 = res.get("photo_b64")
+            photo_bytes = artifacts.get_bytes(res.get("photo_id"))
 
             doc_label = {
                 "aadhaar": "Aadhaar Card",
@@ -463,11 +624,11 @@ with col_right:
             if doc_type == "unknown":
                 st.warning("⚠️ Could not detect document type.")
 
-            st.markdown(photo_html(photo_b64, fields.get("Name", ""), doc_type), unsafe_allow_html=True)
-            if photo_b64:
+            st.markdown(photo_html(photo_bytes, fields.get("Name", ""), doc_type, photo_key=res.get("photo_id")), unsafe_allow_html=True)
+            if photo_bytes:
                 st.download_button(
                     "⬇ Download Photo",
-                    data=base64.b64decode(photo_b64),
+                    data=photo_bytes,
                     file_name=f"{doc_type}_photo.jpg",
                     mime="image/jpeg",
                     key="dl_photo",
@@ -475,9 +636,9 @@ with col_right:
 
             if fields:
                 st.markdown('<div class="section-label">Extracted Fields</div>', unsafe_allow_html=True)
-                st.markdown(f'<div class="info-card">{render_kv_table(fields)}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="info-card">{render_kv_table(fields, record_id=res.get("pages_id"))}</div>', unsafe_allow_html=True)
 
-                expected = {"aadhaar": 8, "pan": 5, "dl": 8, "voter": 7}.get(doc_type, 4)
+                expected = EXPECTED_FIELD_COUNTS.get(doc_type, 4)
                 st.markdown(render_confidence_bar(min(len(fields) / expected, 1.0)), unsafe_allow_html=True)
 
                 saved = res.get("saved")
@@ -506,7 +667,7 @@ ALTER TABLE extractions
                     st.warning(f"⚠️ Could not save: {save_err}")
 
                 json_str = json.dumps(fields, indent=2, ensure_ascii=False)
-                csv_str = "\n".join(f"{k},{v}" for k, v in fields.items())
+                csv_str = fields_csv(fields)
                 dl1, dl2 = st.columns(2)
                 with dl1:
                     st.download_button("⬇ Download JSON", data=json_str, file_name=f"{doc_type}_fields.json", mime="application/json", key="dl_json")
@@ -516,10 +677,10 @@ ALTER TABLE extractions
                 st.warning("No structured fields extracted.")
 
             with st.expander("📄 Raw OCR Text"):
-                for i, pr in enumerate(res["parsed_results"]):
-                    raw = pr.get("ParsedText", "").strip()
+                for i, page_text in enumerate(page_texts):
+                    raw = page_text.strip()
                     st.text_area(
-                        f"Page {i+1}" if len(res["parsed_results"]) > 1 else "Raw Text",
+                        f"Page {i+1}" if len(page_texts) > 1 else "Raw Text",
                         value=raw or "No text found.",
                         height=160,
                         key=f"raw_{i}",
@@ -533,40 +694,61 @@ ALTER TABLE extractions
                     )
 
         else:
-            parsed_results = res["parsed_results"]
             st.markdown(
                 f"""
             <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:12px;">
                 <span class="badge badge-normal">Text Extraction</span>
                 <span style="color:#9ca3af;font-size:0.72rem;font-family:'DM Mono',monospace;">
-                    ⏱ {res['processing_time']}s · {len(parsed_results)} page(s)</span>
+                    ⏱ {res['processing_time']}s · {len(page_texts)} page(s)</span>
             </div>""",
                 unsafe_allow_html=True,
             )
 
-            if len(parsed_results) > 1:
-                tabs = st.tabs([f"Page {i+1}" for i in range(len(parsed_results))])
+            if len(page_texts) > 1:
+                tabs = st.tabs([f"Page {i+1}" for i in range(len(page_texts))])
                 for i, tab in enumerate(tabs):
                     with tab:
-                        text = parsed_results[i].get("ParsedText", "").strip()
+                        text = page_texts[i].strip()
                         edited = st.text_area("Text", value=text or "No text found.", height=300, key=f"norm_text_{i}")
                         st.download_button("⬇ Download", data=edited, file_name=f"page_{i+1}.txt", mime="text/plain", key=f"dl_norm_{i}")
             else:
-                text = parsed_results[0].get("ParsedText", "").strip()
+                text = page_texts[0].strip() if page_texts else ""
                 edited = st.text_area("Extracted Text", value=text or "No text found.", height=300)
                 st.download_button("⬇ Download Text", data=edited, file_name="ocr_text.txt", mime="text/plain", key="dl_norm")
 
         if st.button("✖ Clear Result", key="btn_clear_result"):
-            st.session_state.last_result = None
-            st.rerun()
+            clear_last_result()
+            st.rerun(scope="fragment")
+
+
+col_left, col_right = st.columns([1, 1.4], gap="large")
+with col_left:
+    render_input_panel(mode, language_code, engine_code, backend)
+with col_right:
+    render_result_panel()
 
 
 # ================================================================
-# 11. SIDEBAR — Saved Extractions + Failure Log
+# 11. SIDEBAR — Saved Extractions + Event Log + Diagnostics
 # ================================================================
 st.markdown(SIDEBAR_CSS, unsafe_allow_html=True)
-render_sidebar(
-    supabase=supabase,
-    auth_logout_fn=auth_logout,
-    load_extractions_fn=lambda s: load_extractions(s, log_failure=log_failure),
-)
+user_id = st.session_state.user.id
+with st.sidebar:
+    render_sidebar(
+        supabase=supabase,
+        auth_logout_fn=auth_logout,
+        load_extractions_fn=lambda _, limit, before=None, query="": Extraction.from_rows(
+            storage.load_extractions(user_id, log_failure=log_failure, limit=limit, before=before, query=query)
+        ),
+        load_counts_fn=lambda _: storage.load_counts(user_id, log_failure=log_failure),
+        load_raw_text_fn=lambda rid: storage.load_raw_text(user_id, rid, log_failure=log_failure),
+        search_archive_fn=(
+            (lambda q: Extraction.from_rows(storage.search_archive(user_id, q, log_failure=log_failure)))
+            if storage.has_archive else None
+        ),
+        change_feed=get_extractions_feed(),
+        # Bound now: the download callback runs outside this script run.
+        export_fn=partial(export_to_bytes, storage.bound(), user_id=user_id),
+        metrics=METRICS,
+        artifact_store=artifacts,
+    )
@@ -0,0 +1,132 @@
+"""Move old extractions from the hot table into the cold archive.
+
+Rows created more than ARCHIVE_AFTER_DAYS ago (default 365) are copied into
+``extractions_archive`` — the full row as lz4-compressed JSONB plus the gzip
+raw-text payload — and deleted from ``extractions`` in one statement per batch,
+so a crash never loses or duplicates a record. The work runs server-side in
+the ``archive_extractions`` function; print its SQL (and the archive table)
+with --print-sql and run it once in the Supabase SQL editor. Archived records
+stay searchable from the sidebar's "Include archived" option.
+
+Needs SUPABASE_URL and SUPABASE_SERVICE_KEY.
+
+    python archive.py --dry-run
+    python archive.py --older-than-days 180
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from supabase import create_client
+
+from database import (
+    SUPABASE_URL,
+    ARCHIVE_TABLE,
+    ARCHIVE_SEARCH_COLUMNS,
+    RAW_TEXT_TABLE,
+    _get_secret,
+)
+
+ARCHIVE_RPC = "archive_extractions"
+ARCHIVE_AFTER_DAYS = int(_get_secret("ARCHIVE_AFTER_DAYS", "365") or 365)
+
+
+def archive_sql(with_raw_table=True) -> str:
+    summary = ", ".join(ARCHIVE_SEARCH_COLUMNS)
+    summary_v = ", ".join(f"v.{c}" for c in ARCHIVE_SEARCH_COLUMNS)
+    summary_cols = ",\n  ".join(f"{c:<12} TEXT" for c in ARCHIVE_SEARCH_COLUMNS)
+    if with_raw_table:
+        payload_select = "r.payload"
+        payload_join = f"LEFT JOIN {RAW_TEXT_TABLE} r ON r.extraction_id = v.id"
+        # The preview is redundant once the full text travels along.
+        record = "CASE WHEN r.payload IS NULL THEN to_jsonb(v) ELSE to_jsonb(v) - 'raw_text' END"
+    else:
+        payload_select, payload_join, record = "NULL", "", "to_jsonb(v)"
+    return f"""CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} (
+  id           UUID PRIMARY KEY,
+  user_id      UUID NOT NULL,
+  doc_type     TEXT,
+  created_at   TIMESTAMPTZ,
+  archived_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+  {summary_cols},
+  record       JSONB NOT NULL,
+  raw_payload  TEXT
+);
+ALTER TABLE {ARCHIVE_TABLE} ALTER COLUMN record SET COMPRESSION lz4;
+CREATE INDEX IF NOT EXISTS {ARCHIVE_TABLE}_user_created ON {ARCHIVE_TABLE} (user_id, created_at DESC);
+ALTER TABLE {ARCHIVE_TABLE} ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "read own archive" ON {ARCHIVE_TABLE} FOR SELECT USING (user_id = auth.uid());
+
+-- Keeps the hot table's per-user listing an index range scan.
+CREATE INDEX IF NOT EXISTS extractions_user_created ON extractions (user_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION {ARCHIVE_RPC}(older_than_days integer, batch integer DEFAULT 1000)
+RETURNS integer LANGUAGE sql AS $$
+  WITH v AS (
+    SELECT * FROM extractions
+    WHERE created_at < now() - make_interval(days => older_than_days)
+    ORDER BY created_at
+    LIMIT batch
+    FOR UPDATE SKIP LOCKED
+  ), copied AS (
+    INSERT INTO {ARCHIVE_TABLE} (id, user_id, doc_type, created_at, {summary}, record, raw_payload)
+    SELECT v.id, v.user_id, v.doc_type, v.created_at, {summary_v}, {record}, {payload_select}
+    FROM v {payload_join}
+    ON CONFLICT (id) DO NOTHING
+    RETURNING 1
+  ), moved AS (
+    DELETE FROM extractions e USING v WHERE e.id = v.id
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM moved;
+$$;
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch", type=int, default=1000, help="rows moved per statement")
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would move")
+    parser.add_argument("--print-sql", action="store_true", help=f"print the archive table and {ARCHIVE_RPC} SQL and exit")
+    parser.add_argument("--no-raw-table", action="store_true", help=f"with --print-sql: the {RAW_TEXT_TABLE} table doesn't exist")
+    args = parser.parse_args(argv)
+
+    if args.print_sql:
+        print(archive_sql(with_raw_table=not args.no_raw_table))
+        return 0
+
+    key = _get_secret("SUPABASE_SERVICE_KEY")
+    if not SUPABASE_URL or not key:
+        print("SUPABASE_URL and SUPABASE_SERVICE_KEY are required", file=sys.stderr)
+        return 2
+    supabase = create_client(SUPABASE_URL, key)
+
+    if args.dry_run:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=args.older_than_days)).isoformat()
+        res = supabase.table("extractions").select("id", count="exact").lt("created_at", cutoff).limit(1).execute()
+        print(f"{res.count or 0} row(s) older than {args.older_than_days} days would be archived")
+        return 0
+
+    moved, started = 0, time.perf_counter()
+    while True:
+        try:
+            res = supabase.rpc(ARCHIVE_RPC, {"older_than_days": args.older_than_days, "batch": args.batch}).execute()
+        except Exception as e:
+            print(f"archive failed after {moved} row(s): {e}", file=sys.stderr)
+            if "PGRST202" in str(e):
+                print(f"{ARCHIVE_RPC} not found — run the SQL from --print-sql first", file=sys.stderr)
+            return 1
+        n = int(res.data or 0)
+        moved += n
+        print(f"moved {moved} row(s)", file=sys.stderr)
+        if n < args.batch:
+            break
+    print(f"archived={moved} older_than_days={args.older_than_days} elapsed={time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
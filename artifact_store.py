@@ -0,0 +1,123 @@
+import os
+import json
+import uuid
+import tempfile
+import threading
+from collections import OrderedDict
+
+ARTIFACT_MEMORY_BYTES = int(os.getenv("ARTIFACT_MEMORY_BYTES", str(128 * 1024 * 1024)) or 0)
+ARTIFACT_DISK_BYTES = int(os.getenv("ARTIFACT_DISK_BYTES", str(1024 * 1024 * 1024)) or 0)
+ARTIFACT_SPILL_DIR = os.getenv("ARTIFACT_SPILL_DIR", "")
+
+
+# Process-wide, byte-budgeted LRU for large per-result payloads (page texts,
+# photos, camera captures). Session state only keeps the string handles.
+# Past the memory budget the least recently used entries are spilled to temp
+# files; past the disk budget they are dropped and get() returns None.
+class ArtifactStore:
+    def __init__(self, memory_bytes: int = ARTIFACT_MEMORY_BYTES, disk_bytes: int = ARTIFACT_DISK_BYTES, spill_dir: str = ARTIFACT_SPILL_DIR):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="ocr-artifacts-")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = 0
+        self.evicted = 0
+
+    def put_bytes(self, data: bytes) -> str:
+        handle = uuid.uuid4().hex
+        with self._lock:
+            self._memory[handle] = data
+            self._memory_used += len(data)
+            self._enforce_budget()
+        return handle
+
+    def put_json(self, obj) -> str:
+        return self.put_bytes(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+    def get_bytes(self, handle):
+        if not handle:
+            return None
+        with self._lock:
+            data = self._memory.get(handle)
+            if data is not None:
+                self._memory.move_to_end(handle)
+                return data
+            size = self._disk.get(handle)
+        if size is None:
+            return None
+        try:
+            with open(self._path(handle), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_json(self, handle):
+        data = self.get_bytes(handle)
+        return json.loads(data) if data is not None else None
+
+    def delete(self, *handles):
+        with self._lock:
+            for handle in handles:
+                if not handle:
+                    continue
+                data = self._memory.pop(handle, None)
+                if data is not None:
+                    self._memory_used -= len(data)
+                size = self._disk.pop(handle, None)
+                if size is not None:
+                    self._disk_used -= size
+                    self._unlink(handle)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "memory_budget_bytes": self.memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_used,
+                "disk_budget_bytes": self.disk_bytes,
+                "evicted": self.evicted,
+            }
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.spill_dir, handle)
+
+    def _unlink(self, handle: str):
+        try:
+            os.remove(self._path(handle))
+        except OSError:
+            pass
+
+    def _enforce_budget(self):
+        while self._memory_used > self.memory_bytes and self._memory:
+            handle, data = self._memory.popitem(last=False)
+            self._memory_used -= len(data)
+            try:
+                with open(self._path(handle), "wb") as f:
+                    f.write(data)
+                self._disk[handle] = len(data)
+                self._disk_used += len(data)
+            except OSError:
+                self.evicted += 1
+        while self._disk_used > self.disk_bytes and self._disk:
+            handle, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            self._unlink(handle)
+            self.evicted += 1
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ArtifactStore()
+        return _STORE
@@ -0,0 +1,152 @@
+"""Microbenchmark for the ID-text parsers in ocr_extraction.py.
+
+Runs detect_doc_type and each extract_*_fields function over the synthetic
+corpus from id_corpus.py and reports documents/second and peak Python
+allocations per parser, plus doc-type detection accuracy. Parser outputs are
+compared against the checked-in golden file so accuracy changes show up next
+to speed changes.
+
+    python bench_parsers.py                  # benchmark + golden check
+    python bench_parsers.py --update-golden  # after an intended output change
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tracemalloc
+
+from id_corpus import DOC_TYPES, generate_corpus
+from ocr_extraction import FIELD_EXTRACTORS, detect_doc_type, extract_fields
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_data", "parser_golden.json")
+GOLDEN_PER_TYPE = 25
+GOLDEN_SEED = 1234
+
+
+def _throughput(fn, texts, min_seconds: float):
+    runs, started = 0, time.perf_counter()
+    while True:
+        for text in texts:
+            fn(text)
+        runs += len(texts)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return runs / elapsed, elapsed * 1e6 / runs
+
+
+def _peak_alloc(fn, texts):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for text in texts:
+            fn(text)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def golden_outputs(corpus):
+    out = {}
+    for doc in corpus:
+        out[doc["id"]] = {
+            "text_sha1": hashlib.sha1(doc["text"].encode("utf-8")).hexdigest(),
+            "detected": detect_doc_type(doc["text"]),
+            "fields": FIELD_EXTRACTORS[doc["doc_type"]](doc["text"]),
+        }
+    return out
+
+
+def diff_golden(expected: dict, actual: dict):
+    problems = []
+    for doc_id in sorted(set(expected) | set(actual)):
+        exp, act = expected.get(doc_id), actual.get(doc_id)
+        if exp is None or act is None:
+            problems.append(f"{doc_id}: {'missing from golden' if exp is None else 'missing from corpus'}")
+        elif exp["text_sha1"] != act["text_sha1"]:
+            problems.append(f"{doc_id}: corpus text changed (regenerate with --update-golden)")
+        else:
+            if exp["detected"] != act["detected"]:
+                problems.append(f"{doc_id}: detected {act['detected']!r}, golden {exp['detected']!r}")
+            for key in sorted(set(exp["fields"]) | set(act["fields"])):
+                if exp["fields"].get(key) != act["fields"].get(key):
+                    problems.append(f"{doc_id}: {key}: {act['fields'].get(key)!r} != golden {exp['fields'].get(key)!r}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-type", type=int, default=GOLDEN_PER_TYPE, help="documents per card type to benchmark")
+    parser.add_argument("--seed", type=int, default=GOLDEN_SEED)
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="minimum timed duration per parser")
+    parser.add_argument("--update-golden", action="store_true", help=f"rewrite {os.path.relpath(GOLDEN_PATH)}")
+    parser.add_argument("--no-check", action="store_true", help="skip the golden comparison")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    # The golden file always covers the fixed corpus, whatever --per-type/--seed say.
+    golden_corpus = generate_corpus(GOLDEN_PER_TYPE, GOLDEN_SEED)
+    if args.update_golden:
+        os.makedirs(os.path.dirname(GOLDEN_PATH), exist_ok=True)
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(golden_outputs(golden_corpus), f, indent=1, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"wrote {GOLDEN_PATH} ({len(golden_corpus)} documents)", file=sys.stderr)
+
+    problems = []
+    if not args.no_check:
+        try:
+            with open(GOLDEN_PATH, encoding="utf-8") as f:
+                problems = diff_golden(json.load(f), golden_outputs(golden_corpus))
+        except FileNotFoundError:
+            problems = [f"{GOLDEN_PATH} not found (create it with --update-golden)"]
+
+    corpus = generate_corpus(args.per_type, args.seed)
+    by_type = {t: [d["text"] for d in corpus if d["doc_type"] == t] for t in DOC_TYPES}
+    all_texts = [d["text"] for d in corpus]
+
+    cases = [("detect_doc_type", detect_doc_type, all_texts)]
+    cases += [(FIELD_EXTRACTORS[t].__name__, FIELD_EXTRACTORS[t], by_type[t]) for t in DOC_TYPES]
+    cases.append(("extract_fields", extract_fields, all_texts))
+
+    parsers = {}
+    for name, fn, texts in cases:
+        docs_per_s, us_per_doc = _throughput(fn, texts, args.min_seconds)
+        parsers[name] = {
+            "docs": len(texts),
+            "docs_per_s": round(docs_per_s, 1),
+            "us_per_doc": round(us_per_doc, 1),
+            "peak_alloc_kb": round(_peak_alloc(fn, texts) / 1024, 1),
+        }
+
+    correct = sum(1 for d in corpus if detect_doc_type(d["text"]) == d["doc_type"])
+    report = {
+        "corpus": {"per_type": args.per_type, "seed": args.seed, "docs": len(corpus)},
+        "detection_accuracy": round(correct / len(corpus), 4) if corpus else 0.0,
+        "parsers": parsers,
+        "golden_mismatches": problems,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"corpus: {len(corpus)} docs (seed={args.seed})  detection accuracy={report['detection_accuracy']:.1%}")
+        print(f"{'parser':<24}{'docs':>6}{'docs/s':>12}{'us/doc':>10}{'peak KB':>10}")
+        for name, p in parsers.items():
+            print(f"{name:<24}{p['docs']:>6}{p['docs_per_s']:>12.1f}{p['us_per_doc']:>10.1f}{p['peak_alloc_kb']:>10.1f}")
+        if args.no_check:
+            pass
+        elif problems:
+            print(f"\n{len(problems)} golden mismatch(es):")
+            for line in problems[:50]:
+                print(f"  {line}")
+        else:
+            print("\ngolden outputs: OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""End-to-end extraction pipeline load benchmark.
+
+Drives blur detection, perceptual hashing, face extraction, compression, OCR
+and parsing for N documents at a given concurrency against the mock OCR.space
+server (started in-process unless --url is given), then reports throughput,
+latency percentiles, CPU, memory and the per-stage timings from metrics.py.
+With --tracemalloc a second, serial pass over the corpus records each stage's
+peak Python allocation (tracemalloc's peak counter is process-wide, so it
+can't be attributed per stage under concurrency); the timed run is untraced.
+
+    python bench_pipeline.py --docs 200 --concurrency 16 --latency-ms 800 --jitter-ms 300
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from metrics import METRICS, timed, percentile
+from mock_ocr_server import BUILTIN_FIXTURES, MockOcrConfig, start_mock_server
+from ocr_engines import OcrSpaceEngine, recognize_auto
+from ocr_extraction import (
+    OcrClient,
+    ocr_context,
+    detect_blur,
+    compute_dhash,
+    extract_face_photo,
+    perform_ocr,
+    extract_fields,
+)
+
+
+def synthetic_card(text: str, seed: int) -> bytes:
+    img = Image.new("RGB", (1280, 800), (245, 245, 240))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((900, 150, 1180, 500), fill=(120 + seed % 60, 110, 100))
+    for i, line in enumerate(text.splitlines()):
+        draw.text((60, 120 + i * 48), line, fill=(20, 20, 20))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def run_document(raw_bytes: bytes, client: OcrClient, mode: str = "Document", engine: str = "2"):
+    started = time.perf_counter()
+    with ocr_context(client):
+        detect_blur(io.BytesIO(raw_bytes))
+        compute_dhash(io.BytesIO(raw_bytes))
+        if mode == "Document":
+            extract_face_photo(io.BytesIO(raw_bytes))
+        if engine == "auto":
+            result = recognize_auto(OcrSpaceEngine(), raw_bytes, "eng", client=client, parse=mode == "Document")
+        else:
+            result = perform_ocr(raw_bytes, "eng", int(engine), client=client)
+        ok = "error" not in result and bool(result.get("ParsedResults"))
+        if ok and "AutoEngine" not in result:
+            text = "\n".join(pr.get("ParsedText", "") for pr in result["ParsedResults"])
+            with timed("parse"):
+                extract_fields(text)
+    return ok, (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["Document", "Normal"], default="Document")
+    parser.add_argument("--engine", choices=["auto", "1", "2", "3"], default="2")
+    parser.add_argument("--url", default="", help="OCR endpoint; defaults to an in-process mock server")
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="also measure per-stage peak Python allocations in a serial pass")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if not url:
+        cfg = MockOcrConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            timeout_rate=args.timeout_rate,
+            seed=0,
+        )
+        server, url = start_mock_server(config=cfg)
+
+    docs = [synthetic_card(BUILTIN_FIXTURES[i % len(BUILTIN_FIXTURES)], i) for i in range(min(args.docs, 32))]
+    failures = []
+    client = OcrClient(api_key="bench", url=url, logger=lambda ctx, msg, **_: failures.append(ctx))
+
+    METRICS.reset()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(lambda i: run_document(docs[i % len(docs)], client, args.mode, args.engine), range(args.docs)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    stages = METRICS.snapshot()
+    requests_made = cfg.requests if server is not None else None
+
+    traced_peak = None
+    if args.tracemalloc:
+        METRICS.reset()
+        tracemalloc.start()
+        for raw_bytes in docs[:args.docs]:
+            run_document(raw_bytes, client, args.mode, args.engine)
+        tracemalloc.stop()
+        for stage, s in METRICS.snapshot().items():
+            if stage in stages and "mem_peak_kb_max" in s:
+                stages[stage]["mem_peak_kb_avg"] = s["mem_peak_kb_avg"]
+                stages[stage]["mem_peak_kb_max"] = s["mem_peak_kb_max"]
+        # Each stage resets tracemalloc's peak, so the overall figure is the largest stage peak.
+        traced_peak = max((s.get("mem_peak_kb_max", 0) for s in stages.values()), default=0) * 1024
+    if server is not None:
+        server.shutdown()
+
+    latencies = sorted(ms for _, ms in outcomes)
+    report = {
+        "docs": args.docs,
+        "concurrency": args.concurrency,
+        "engine": args.engine,
+        "ok": sum(1 for ok, _ in outcomes if ok),
+        "ocr_requests": requests_made,
+        "logged_failures": len(failures),
+        "wall_s": round(wall, 3),
+        "throughput_docs_per_s": round(args.docs / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+        },
+        "cpu_s": round(cpu, 3),
+        "cpu_utilisation": round(cpu / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "traced_stage_peak_mb": round(traced_peak / 1024 / 1024, 1) if traced_peak is not None else None,
+        "stages": stages,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    print(f"docs={report['docs']} ok={report['ok']} concurrency={report['concurrency']} engine={report['engine']}"
+          f" wall={report['wall_s']}s" + (f" ocr_requests={report['ocr_requests']}" if report["ocr_requests"] is not None else ""))
+    print(f"throughput={report['throughput_docs_per_s']} docs/s  latency p50/p95/p99="
+          f"{report['latency_ms']['p50']}/{report['latency_ms']['p95']}/{report['latency_ms']['p99']} ms")
+    print(f"cpu={report['cpu_s']}s ({report['cpu_utilisation']} cores)  peak_rss={report['peak_rss_mb']} MB"
+          + (f"  largest_stage_peak={report['traced_stage_peak_mb']} MB" if report["traced_stage_peak_mb"] is not None else ""))
+    mem = args.tracemalloc
+    print(f"{'stage':<20}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'cpu ms/doc':>12}"
+          + (f"{'mem KB avg':>12}{'mem KB max':>12}" if mem else ""))
+    for stage, s in report["stages"].items():
+        print(f"{stage:<20}{s['count']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+              f"{s['cpu_ms'] / max(s['count'], 1):>12.2f}"
+              + (f"{s.get('mem_peak_kb_avg', 0):>12.1f}{s.get('mem_peak_kb_max', 0):>12.1f}" if mem else ""))
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
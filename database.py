@@ -1,9 +1,18 @@
 import os
+import gzip
+import json
+import time
 import base64
-from datetime import datetime
+import hashlib
+import threading
+from collections import OrderedDict
 
+import httpx
 import streamlit as st
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+
+from metrics import timed
+from realtime_feed import get_change_feed
 
 
 def _safe_log(log_failure, context: str, message: str):
@@ -23,11 +32,79 @@ def _get_secret(key: str, default: str = "") -> str:
 
 SUPABASE_URL = _get_secret("SUPABASE_URL")
 SUPABASE_KEY = _get_secret("SUPABASE_ANON_KEY")
+# "supabase" (hosted, default) or "sqlite" (single-node, works offline).
+STORAGE_BACKEND = _get_secret("STORAGE_BACKEND", "supabase").strip().lower()
+POOL_MAX_CLIENTS = int(_get_secret("SUPABASE_POOL_MAX_CLIENTS", "256") or 256)
+POOL_IDLE_SECONDS = int(_get_secret("SUPABASE_POOL_IDLE_SECONDS", "1800") or 1800)
+
+
+# One client per access token, all sharing a pooled httpx transport. The token is
+# baked into the client's headers so concurrent sessions never re-auth a shared
+# object; idle (or over-capacity, oldest first) clients are evicted on acquire.
+class ClientPool:
+    def __init__(self, url: str, key: str, max_clients: int = POOL_MAX_CLIENTS, idle_seconds: int = POOL_IDLE_SECONDS):
+        self._url = url
+        self._key = key
+        self._max_clients = max_clients
+        self._idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+        self._http = httpx.Client(
+            follow_redirects=True,
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    def _new_client(self, access_token: str) -> Client:
+        options = ClientOptions(
+            headers={"Authorization": f"Bearer {access_token}"},
+            auto_refresh_token=False,
+            persist_session=False,
+            httpx_client=self._http,
+        )
+        return create_client(self._url, self._key, options)
+
+    def acquire(self, access_token: str) -> Client:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.pop(access_token, None)
+            client = entry[0] if entry else self._new_client(access_token)
+            self._clients[access_token] = (client, now)
+            self._evict(now)
+            return client
+
+    def release(self, access_token: str):
+        with self._lock:
+            self._clients.pop(access_token, None)
+
+    def _evict(self, now: float):
+        while self._clients:
+            token, (_, last_used) = next(iter(self._clients.items()))
+            if len(self._clients) <= self._max_clients and now - last_used < self._idle_seconds:
+                break
+            del self._clients[token]
+
+    def __len__(self):
+        return len(self._clients)
 
 
 @st.cache_resource
 def get_supabase() -> Client:
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Shared anon client, used only for the auth endpoints (sign in / sign up).
+    options = ClientOptions(auto_refresh_token=False, persist_session=False)
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options)
+
+
+@st.cache_resource
+def get_client_pool() -> ClientPool:
+    return ClientPool(SUPABASE_URL, SUPABASE_KEY)
+
+
+def get_session_client():
+    token = st.session_state.get("access_token")
+    if not token:
+        return None
+    return get_client_pool().acquire(token)
 
 
 def auth_login(supabase: Client, email: str, password: str):
@@ -35,15 +112,15 @@ def auth_login(supabase: Client, email: str, password: str):
         res = supabase.auth.sign_in_with_password({"email": email, "password": password})
         st.session_state.user = res.user
         st.session_state.access_token = res.session.access_token
-        supabase.postgrest.auth(res.session.access_token)
+        client = get_client_pool().acquire(res.session.access_token)
 
         try:
-            supabase.rpc("upsert_user_login", {
+            client.rpc("upsert_user_login", {
                 "p_user_id": res.user.id,
                 "p_email": res.user.email,
             }).execute()
             user_row = (
-                supabase.table("users")
+                client.table("users")
                 .select("last_login, created_at")
                 .eq("id", res.user.id)
                 .single()
@@ -77,7 +154,13 @@ def auth_signup(supabase: Client, email: str, password: str):
 
 
 def auth_logout(supabase: Client):
-    supabase.auth.sign_out()
+    token = st.session_state.get("access_token")
+    if token:
+        try:
+            supabase.auth.admin.sign_out(token)
+        except Exception:
+            pass
+        get_client_pool().release(token)
     st.session_state.user = None
     st.session_state.access_token = None
 
@@ -98,68 +181,183 @@ _EXTENDED_COLUMNS = {
 }
 
 
-def upload_photo_to_storage(supabase: Client, photo_b64: str, doc_type: str, log_failure=None) -> str:
-    if not photo_b64 or not st.session_state.user:
+PHOTO_BUCKET = "id-photos"
+PHOTO_URL_TTL = 315360000
+_SIGNED_URL_CACHE_SIZE = 1024
+_signed_urls = OrderedDict()
+_signed_urls_lock = threading.Lock()
+
+
+def _photo_path(user_id: str, photo_bytes: bytes) -> str:
+    # Content-addressed: identical crops map to one object, distinct ones never collide.
+    return f"{user_id}/{hashlib.sha256(photo_bytes).hexdigest()}.jpg"
+
+
+def _signed_photo_url(bucket, file_path: str) -> str:
+    with _signed_urls_lock:
+        url = _signed_urls.get(file_path)
+        if url:
+            _signed_urls.move_to_end(file_path)
+            return url
+    url_res = bucket.create_signed_url(file_path, PHOTO_URL_TTL)
+    url = url_res.get("signedURL", "") if isinstance(url_res, dict) else ""
+    if url:
+        with _signed_urls_lock:
+            _signed_urls[file_path] = url
+            while len(_signed_urls) > _SIGNED_URL_CACHE_SIZE:
+                _signed_urls.popitem(last=False)
+    return url
+
+
+def upload_photo_to_storage(supabase: Client, photo_bytes: bytes, log_failure=None) -> str:
+    if not photo_bytes or not st.session_state.user:
         return ""
     try:
-        photo_bytes = base64.b64decode(photo_b64)
-        user_id = st.session_state.user.id
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = f"{user_id}/{doc_type}_{timestamp}.jpg"
-
-        supabase.storage.from_("id-photos").upload(
-            file_path,
-            photo_bytes,
-            {"content-type": "image/jpeg", "upsert": "false"},
-        )
-        url_res = supabase.storage.from_("id-photos").create_signed_url(file_path, 315360000)
-        return url_res.get("signedURL", "") if isinstance(url_res, dict) else ""
+        file_path = _photo_path(st.session_state.user.id, photo_bytes)
+        bucket = supabase.storage.from_(PHOTO_BUCKET)
+
+        with timed("photo_upload"):
+            if not bucket.exists(file_path):
+                try:
+                    bucket.upload(
+                        file_path,
+                        photo_bytes,
+                        {"content-type": "image/jpeg", "upsert": "false"},
+                    )
+                except Exception as e:
+                    # Lost a race with a concurrent save of the same crop: same bytes, nothing to do.
+                    err = str(e).lower()
+                    if "duplicate" not in err and "already exists" not in err and "409" not in err:
+                        raise
+            return _signed_photo_url(bucket, file_path)
     except Exception as e:
         _safe_log(log_failure, "Photo Upload", str(e))
         return ""
 
 
+# extractions column -> parsed field name(s); the first non-empty one wins.
+FIELD_COLUMNS = {
+    "holder_name": ("Name",),
+    "dob": ("Date of Birth",),
+    "gender": ("Gender",),
+    "aadhaar_number": ("Aadhaar Number",),
+    "address": ("Address",),
+    "pincode": ("Pincode",),
+    "state": ("State",),
+    "vid": ("VID",),
+    "pan_number": ("PAN Number",),
+    "father_name": ("Father's Name",),
+    "account_type": ("Account Type",),
+    "issued_by": ("Issued By",),
+    "dl_number": ("DL Number",),
+    "valid_till": ("Valid Till",),
+    "vehicle_class": ("Vehicle Class",),
+    "blood_group": ("Blood Group",),
+    "issuing_authority": ("Issuing Authority",),
+    "epic_number": ("EPIC Number",),
+    "father_husband_name": ("Father's Name", "Father/Husband Name"),
+    "constituency": ("Constituency",),
+    "part_no": ("Part No",),
+}
+
+EXTENDED_FIELD_COLUMNS = {
+    "enrolment_no": ("Enrolment No",),
+    "date_of_issue": ("Date of Issue",),
+    "son_daughter_wife_of": ("Son/Daughter/Wife of",),
+    "serial_no": ("Serial No",),
+    "polling_station": ("Polling Station",),
+    "mobile": ("Mobile",),
+}
+
+
+def stored_doc_type(doc_type):
+    return doc_type if doc_type in ("aadhaar", "pan", "dl", "voter") else "other"
+
+
+def field_columns(fields, include_extended=True):
+    mapping = dict(FIELD_COLUMNS, **EXTENDED_FIELD_COLUMNS) if include_extended else FIELD_COLUMNS
+    return {col: next((fields[k] for k in keys if fields.get(k)), "") for col, keys in mapping.items()}
+
+
+# extractions.raw_text keeps a short preview; the full text and per-page OCR
+# output live gzip-compressed in RAW_TEXT_TABLE, read only when someone opens them.
+# Its table SQL is in the README.
+RAW_TEXT_PREVIEW_CHARS = 4000
+RAW_TEXT_TABLE = "extraction_raw_text"
+
+
+def pack_raw_text(raw_text: str, pages=None) -> str:
+    body = json.dumps({"text": raw_text, "pages": pages}, ensure_ascii=False).encode("utf-8")
+    return base64.b64encode(gzip.compress(body, compresslevel=6)).decode("ascii")
+
+
+def unpack_raw_text(payload: str):
+    data = json.loads(gzip.decompress(base64.b64decode(payload)))
+    return data.get("text", ""), data.get("pages")
+
+
+def _save_raw_text(supabase: Client, extraction_id, raw_text, pages=None, log_failure=None):
+    try:
+        with timed("db_raw_text"):
+            supabase.table(RAW_TEXT_TABLE).insert(
+                {
+                    "extraction_id": extraction_id,
+                    "user_id": st.session_state.user.id,
+                    "codec": "gzip",
+                    "chars": len(raw_text),
+                    "payload": pack_raw_text(raw_text, pages),
+                }
+            ).execute()
+    except Exception as e:
+        kept = "" if len(raw_text) <= RAW_TEXT_PREVIEW_CHARS else f" — only the first {RAW_TEXT_PREVIEW_CHARS} chars were kept"
+        _safe_log(log_failure, "Supabase Raw Text", f"{e}{kept}")
+
+
+def load_raw_text(supabase: Client, extraction_id, log_failure=None):
+    # (text, pages) for one record; falls back to the row's preview for records
+    # saved before the side table existed. pages is None when unknown.
+    try:
+        res = (
+            supabase.table(RAW_TEXT_TABLE)
+            .select("payload")
+            .eq("extraction_id", extraction_id)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            return unpack_raw_text(res.data[0]["payload"])
+    except Exception as e:
+        _safe_log(log_failure, "Supabase Raw Text", str(e))
+    try:
+        res = supabase.table("extractions").select("raw_text").eq("id", extraction_id).limit(1).execute()
+        if res.data:
+            return res.data[0].get("raw_text") or "", None
+        # Archived records carry their payload (or the preview) with them.
+        res = (
+            supabase.table(ARCHIVE_TABLE)
+            .select("raw_payload,raw_text:record->>raw_text")
+            .eq("id", extraction_id)
+            .limit(1)
+            .execute()
+        )
+        if res.data:
+            row = res.data[0]
+            return unpack_raw_text(row["raw_payload"]) if row.get("raw_payload") else (row.get("raw_text") or "", None)
+    except Exception as e:
+        _safe_log(log_failure, "Supabase Raw Text", str(e))
+    return "", None
+
+
 def _build_row(fields, doc_type, file_name, size_kb, raw_text, include_extended=True, photo_url=""):
     row = {
         "user_id": st.session_state.user.id,
-        "doc_type": doc_type if doc_type in ("aadhaar", "pan", "dl", "voter") else "other",
+        "doc_type": stored_doc_type(doc_type),
         "file_name": file_name,
         "file_size_kb": size_kb,
-        "holder_name": fields.get("Name", ""),
-        "dob": fields.get("Date of Birth", ""),
-        "gender": fields.get("Gender", ""),
-        "aadhaar_number": fields.get("Aadhaar Number", ""),
-        "address": fields.get("Address", ""),
-        "pincode": fields.get("Pincode", ""),
-        "state": fields.get("State", ""),
-        "vid": fields.get("VID", ""),
-        "pan_number": fields.get("PAN Number", ""),
-        "father_name": fields.get("Father's Name", ""),
-        "account_type": fields.get("Account Type", ""),
-        "issued_by": fields.get("Issued By", ""),
-        "dl_number": fields.get("DL Number", ""),
-        "valid_till": fields.get("Valid Till", ""),
-        "vehicle_class": fields.get("Vehicle Class", ""),
-        "blood_group": fields.get("Blood Group", ""),
-        "issuing_authority": fields.get("Issuing Authority", ""),
-        "epic_number": fields.get("EPIC Number", ""),
-        "father_husband_name": fields.get("Father's Name", "") or fields.get("Father/Husband Name", ""),
-        "constituency": fields.get("Constituency", ""),
-        "part_no": fields.get("Part No", ""),
-        "raw_text": raw_text[:4000],
+        **field_columns(fields, include_extended),
+        "raw_text": raw_text[:RAW_TEXT_PREVIEW_CHARS],
         "photo_url": photo_url,
     }
-    if include_extended:
-        row.update(
-            {
-                "enrolment_no": fields.get("Enrolment No", ""),
-                "date_of_issue": fields.get("Date of Issue", ""),
-                "son_daughter_wife_of": fields.get("Son/Daughter/Wife of", ""),
-                "serial_no": fields.get("Serial No", ""),
-                "polling_station": fields.get("Polling Station", ""),
-                "mobile": fields.get("Mobile", ""),
-            }
-        )
     return {k: v for k, v in row.items() if v != ""}
 
 
@@ -173,23 +371,34 @@ def _get_doc_unique_key(doc_type, fields):
     return mapping.get(doc_type, (None, None))
 
 
+def normalize_doc_number(value) -> str:
+    return str(value or "").replace(" ", "").replace("-", "").upper()
+
+
+def doc_unique_key(doc_type, fields):
+    # Normalised ID number that identifies a saved document, or None.
+    _, val = _get_doc_unique_key(doc_type, fields)
+    return normalize_doc_number(val) or None
+
+
 def check_duplicate(supabase: Client, doc_type, fields):
     col, val = _get_doc_unique_key(doc_type, fields)
     if not col or not val:
         return False
     try:
-        existing = (
-            supabase.table("extractions")
-            .select("id")
-            .eq("user_id", st.session_state.user.id)
-            .eq("doc_type", doc_type)
-            .execute()
-        )
+        with timed("db_duplicate_check"):
+            existing = (
+                supabase.table("extractions")
+                .select(f"id,{col}")
+                .eq("user_id", st.session_state.user.id)
+                .eq("doc_type", doc_type)
+                .execute()
+            )
         if not existing.data:
             return False
-        norm_val = val.replace(" ", "").replace("-", "").upper()
+        norm_val = normalize_doc_number(val)
         for row in existing.data:
-            stored = str(row.get(col) or "").replace(" ", "").replace("-", "").upper()
+            stored = normalize_doc_number(row.get(col))
             if stored and stored == norm_val:
                 return True
         return False
@@ -197,6 +406,23 @@ def check_duplicate(supabase: Client, doc_type, fields):
         return False
 
 
+def get_extractions_feed():
+    # Realtime only sees inserts into the hosted table; any other store gets the
+    # in-process feed.
+    if STORAGE_BACKEND != "supabase":
+        return get_change_feed()
+    return get_change_feed(SUPABASE_URL, SUPABASE_KEY)
+
+
+def _after_insert(supabase: Client, row, raw_text, pages=None, log_failure=None):
+    _save_raw_text(supabase, row["id"], raw_text, pages, log_failure)
+    # Other sessions of this user in this process see the row at once; Realtime
+    # delivers it to other processes (and echoes it here, deduped by id).
+    feed = get_extractions_feed()
+    if feed is not None:
+        feed.publish({k: v for k, v in row.items() if k != "raw_text"})
+
+
 def save_extraction(
     supabase: Client,
     doc_type,
@@ -204,26 +430,29 @@ def save_extraction(
     raw_text="",
     file_name="",
     file_size_bytes=0,
-    photo_b64=None,
+    photo_bytes=None,
     log_failure=None,
+    pages=None,
 ):
     if not st.session_state.user:
         return False, "Not logged in"
 
-    supabase.postgrest.auth(st.session_state.access_token)
     size_kb = round(file_size_bytes / 1024, 1) if file_size_bytes else 0
 
     if check_duplicate(supabase, doc_type, fields):
         return False, "duplicate"
 
     photo_url = ""
-    if photo_b64:
+    if photo_bytes:
         with st.spinner("📤 Uploading photo to storage..."):
-            photo_url = upload_photo_to_storage(supabase, photo_b64, doc_type, log_failure)
+            photo_url = upload_photo_to_storage(supabase, photo_bytes, log_failure)
 
     try:
         row = _build_row(fields, doc_type, file_name, size_kb, raw_text, include_extended=True, photo_url=photo_url)
-        supabase.table("extractions").insert(row).execute()
+        with timed("db_insert"):
+            res = supabase.table("extractions").insert(row).execute()
+        if res.data:
+            _after_insert(supabase, res.data[0], raw_text, pages, log_failure)
         return True, None
     except Exception as e:
         err = str(e)
@@ -235,7 +464,10 @@ def save_extraction(
 
     try:
         row = _build_row(fields, doc_type, file_name, size_kb, raw_text, include_extended=False, photo_url=photo_url)
-        supabase.table("extractions").insert(row).execute()
+        with timed("db_insert"):
+            res = supabase.table("extractions").insert(row).execute()
+        if res.data:
+            _after_insert(supabase, res.data[0], raw_text, pages, log_failure)
         return True, "partial"
     except Exception as e2:
         err2 = str(e2)
@@ -244,19 +476,151 @@ def save_extraction(
         return False, err2
 
 
-def load_extractions(supabase: Client, log_failure=None):
+# Everything the list shows; raw_text is left out to keep list queries small.
+LIST_COLUMNS = ("id", "created_at", "doc_type", "file_name", "file_size_kb", *FIELD_COLUMNS)
+# Rows per list query; the sidebar fetches the next page when paged past the last.
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "100") or 100)
+# Columns the sidebar search matches server-side (case-insensitive substring).
+SEARCH_COLUMNS = ("holder_name", "aadhaar_number", "pan_number", "dl_number", "epic_number", "file_name")
+
+
+def _search_term(query: str) -> str:
+    # PostgREST filter syntax reserves , ( ) and *; keep the term to plain characters.
+    return "".join(ch for ch in query if ch.isalnum() or ch in " .-/'").strip()
+
+
+def load_extractions(supabase: Client, log_failure=None, limit=LIST_PAGE_SIZE, before=None, query=""):
+    # One page, newest first. PostgREST caps a response at its max-rows (1000 by
+    # default), so the list is paged by keyset: before is the (created_at, id) of
+    # the last row already loaded. A query keeps only rows whose SEARCH_COLUMNS
+    # contain it, so a search pages through the whole history, not a prefix.
     if not st.session_state.user:
         return []
+    term = _search_term(query)
+    if query and not term:
+        return []
+    search = ",".join(f"{col}.ilike.*{term}*" for col in SEARCH_COLUMNS) if term else None
+    for columns in (LIST_COLUMNS + tuple(EXTENDED_FIELD_COLUMNS) + ("photo_url",), LIST_COLUMNS):
+        try:
+            with timed("db_fetch"):
+                request = (
+                    supabase.table("extractions")
+                    .select(",".join(columns))
+                    .eq("user_id", st.session_state.user.id)
+                    .order("created_at", desc=True)
+                    .order("id", desc=True)
+                    .limit(limit)
+                )
+                keyset = None
+                if before is not None:
+                    created_at, last_id = before
+                    keyset = f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})'
+                if search and keyset:
+                    request = request.or_(f"and(or({search}),or({keyset}))")
+                elif search or keyset:
+                    request = request.or_(search or keyset)
+                res = request.execute()
+            return res.data or []
+        except Exception as e:
+            err = str(e)
+            # Older schemas lack the extended columns: retry with the core list.
+            if columns != LIST_COLUMNS and ("42703" in err or "column" in err.lower()):
+                continue
+            _safe_log(log_failure, "Supabase Fetch", err)
+            return []
+    return []
+
+
+def iter_extraction_pages(supabase: Client, columns, page_size=500, user_id=None):
+    # Keyset pagination by id: each page is an index range scan however deep
+    # into the table it is, and only one page is held at a time. A raw_text
+    # column carries the full text, joined per page from the side table.
+    last_id = None
+    while True:
+        query = supabase.table("extractions").select(",".join(columns)).order("id").limit(page_size)
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            return
+        if "raw_text" in columns:
+            _join_raw_text(supabase, rows)
+        yield rows
+        last_id = rows[-1]["id"]
+        if len(rows) < page_size:
+            return
+
+
+def _join_raw_text(supabase: Client, rows, chunk=100):
+    # Only previews cut at RAW_TEXT_PREVIEW_CHARS can differ from the full text.
+    # Rows whose side-table entry is missing (or unreadable) keep the preview.
+    by_id = {r["id"]: r for r in rows if len(r.get("raw_text") or "") >= RAW_TEXT_PREVIEW_CHARS}
+    ids = list(by_id)
+    for i in range(0, len(ids), chunk):
+        try:
+            res = (
+                supabase.table(RAW_TEXT_TABLE)
+                .select("extraction_id,payload")
+                .in_("extraction_id", ids[i:i + chunk])
+                .execute()
+            )
+        except Exception:
+            return
+        for side in res.data or []:
+            by_id[side["extraction_id"]]["raw_text"] = unpack_raw_text(side["payload"])[0]
+
+
+# Records older than ARCHIVE_AFTER_DAYS are moved here by archive.py; the full
+# row sits in a compressed JSONB column and is only read for explicit searches.
+ARCHIVE_TABLE = "extractions_archive"
+ARCHIVE_SEARCH_COLUMNS = ("holder_name", "aadhaar_number", "pan_number", "dl_number", "epic_number")
+
+
+def search_archived_extractions(supabase: Client, query: str, limit: int = 50, log_failure=None):
+    if not st.session_state.user:
+        return []
+    term = _search_term(query)
+    if len(term) < 2:
+        return []
     try:
-        supabase.postgrest.auth(st.session_state.access_token)
-        res = (
-            supabase.table("extractions")
-            .select("*")
-            .eq("user_id", st.session_state.user.id)
-            .order("created_at", desc=True)
-            .execute()
-        )
-        return res.data or []
+        with timed("db_fetch"):
+            res = (
+                supabase.table(ARCHIVE_TABLE)
+                .select("record")
+                .eq("user_id", st.session_state.user.id)
+                .or_(",".join(f"{col}.ilike.*{term}*" for col in ARCHIVE_SEARCH_COLUMNS))
+                .order("created_at", desc=True)
+                .limit(limit)
+                .execute()
+            )
+        return [dict(r["record"], archived=True) for r in res.data or []]
     except Exception as e:
-        _safe_log(log_failure, "Supabase Fetch", str(e))
+        _safe_log(log_failure, "Supabase Archive", str(e))
         return []
+
+
+# Per-user, per-type record counts for the sidebar header, kept current by a
+# trigger on extractions so reading them never scans the user's history. The
+# table, trigger and backfill SQL are in the README ("Sidebar counts").
+COUNTS_TABLE = "extraction_type_counts"
+
+
+def load_extraction_counts(supabase: Client, log_failure=None):
+    # {doc_type: count}; None when the counts table is missing or the query failed.
+    if not st.session_state.user:
+        return {}
+    try:
+        with timed("db_fetch"):
+            res = (
+                supabase.table(COUNTS_TABLE)
+                .select("doc_type,n")
+                .eq("user_id", st.session_state.user.id)
+                .gt("n", 0)
+                .execute()
+            )
+        return {r["doc_type"]: r["n"] for r in res.data or []}
+    except Exception as e:
+        _safe_log(log_failure, "Supabase Counts", str(e))
+        return None
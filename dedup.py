@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6") or 6)
+PHASH_MAX_PER_USER = 50
+PHASH_MAX_USERS = 1000
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# Per-user index of perceptual hashes of recently OCR'd images. Each entry keeps
+# its own copy of the result artifacts so it outlives the session's last_result;
+# evicting an entry releases them. Entries are scoped by OCR mode and language,
+# so a Normal-mode result is never offered for a Document-mode upload.
+class PerceptualIndex:
+    def __init__(self, artifacts, max_per_user: int = PHASH_MAX_PER_USER, max_users: int = PHASH_MAX_USERS):
+        self.artifacts = artifacts
+        self.max_per_user = max_per_user
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def _copy(self, handle):
+        data = self.artifacts.get_bytes(handle)
+        return self.artifacts.put_bytes(data) if data is not None else None
+
+    def _release(self, entry):
+        self.artifacts.delete(entry["result"].get("pages_id"), entry["result"].get("photo_id"))
+
+    def add(self, user_id: str, dhash: int, result: dict, mode: str = "", language: str = ""):
+        snapshot = dict(result, pages_id=self._copy(result.get("pages_id")), photo_id=self._copy(result.get("photo_id")))
+        entry = {"dhash": dhash, "ts": time.time(), "mode": mode, "language": language, "result": snapshot}
+        evicted = []
+        with self._lock:
+            entries = self._users.pop(user_id, None)
+            if entries is None:
+                entries = deque()
+            entries.append(entry)
+            while len(entries) > self.max_per_user:
+                evicted.append(entries.popleft())
+            self._users[user_id] = entries
+            while len(self._users) > self.max_users:
+                _, old = self._users.popitem(last=False)
+                evicted.extend(old)
+        for e in evicted:
+            self._release(e)
+
+    def find(self, user_id: str, dhash: int, max_distance: int = PHASH_MAX_DISTANCE, mode: str = "", language: str = ""):
+        with self._lock:
+            entries = list(self._users.get(user_id, ()))
+        best, best_dist = None, max_distance + 1
+        for entry in reversed(entries):
+            if entry["mode"] != mode or entry["language"] != language:
+                continue
+            dist = hamming_distance(entry["dhash"], dhash)
+            if dist < best_dist:
+                best, best_dist = entry, dist
+        if best is None:
+            return None, None
+        return best, best_dist
+
+    def materialize(self, entry) -> dict:
+        # Fresh artifact copies, so the caller can release them independently.
+        result = dict(entry["result"])
+        result["pages_id"] = self._copy(result.get("pages_id"))
+        result["photo_id"] = self._copy(result.get("photo_id"))
+        return result
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_phash_index(artifacts) -> PerceptualIndex:
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = PerceptualIndex(artifacts)
+        return _INDEX
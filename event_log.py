@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+EVENT_LOG_CAPACITY = int(os.getenv("EVENT_LOG_CAPACITY", "200") or 200)
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "event_log.sqlite3")
+
+SEVERITIES = ("debug", "info", "warning", "error")
+
+
+# Background writer: events are queued by the request threads and batch-inserted
+# into SQLite by a single daemon thread, so logging never blocks a rerun on disk.
+class SqliteEventSink:
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="event-log-sink", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_schema(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                session_id TEXT,
+                severity TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                message TEXT,
+                duration_ms REAL,
+                doc_hash TEXT
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_stage ON events (stage, severity)")
+        conn.commit()
+
+    def submit(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        conn = self._connect()
+        self._init_schema(conn)
+        self._ready.set()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                conn.executemany(
+                    "INSERT INTO events (ts, session_id, severity, stage, message, duration_ms, doc_hash) "
+                    "VALUES (:ts, :session_id, :severity, :stage, :msg, :duration_ms, :doc_hash)",
+                    batch,
+                )
+                conn.commit()
+            except sqlite3.Error:
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def error_counts(self, since_ts: float = 0.0):
+        self._ready.wait(5)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT stage, severity, COUNT(*), COUNT(DISTINCT session_id) FROM events "
+                "WHERE ts >= ? AND severity IN ('warning', 'error') "
+                "GROUP BY stage, severity ORDER BY COUNT(*) DESC",
+                (since_ts,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{"stage": r[0], "severity": r[1], "count": r[2], "sessions": r[3]} for r in rows]
+
+
+_SINK = None
+_SINK_LOCK = threading.Lock()
+
+
+def get_event_sink():
+    global _SINK
+    if not EVENT_LOG_PATH:
+        return None
+    with _SINK_LOCK:
+        if _SINK is None:
+            _SINK = SqliteEventSink(EVENT_LOG_PATH)
+        return _SINK
+
+
+# Per-session ring buffer of structured events. Memory is bounded by
+# ``capacity``; everything is also forwarded to the shared sink, if any.
+class EventLog:
+    def __init__(self, session_id: str = "", capacity: int = EVENT_LOG_CAPACITY, sink=None):
+        self.session_id = session_id
+        self.capacity = capacity
+        self.sink = sink
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def log(self, stage: str, message: str, severity: str = "error", duration_ms=None, doc_hash=None):
+        now = time.time()
+        event = {
+            "ts": now,
+            "time": datetime.fromtimestamp(now).strftime("%H:%M:%S"),
+            "session_id": self.session_id,
+            "severity": severity if severity in SEVERITIES else "error",
+            "stage": stage,
+            "msg": message,
+            "duration_ms": round(duration_ms, 3) if duration_ms is not None else None,
+            "doc_hash": doc_hash,
+        }
+        with self._lock:
+            self._events.append(event)
+            self.total += 1
+        if self.sink is not None:
+            self.sink.submit(event)
+        return event
+
+    def __len__(self):
+        return len(self._events)
+
+    def count(self, *severities):
+        with self._lock:
+            return sum(1 for e in self._events if e["severity"] in severities)
+
+    def page(self, page: int, page_size: int = 10):
+        with self._lock:
+            newest_first = list(reversed(self._events))
+        start = max(page, 0) * page_size
+        return newest_first[start:start + page_size]
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def to_text(self) -> str:
+        with self._lock:
+            events = list(self._events)
+        return "\n".join(
+            f"[{e['time']}] [{e['severity'].upper()}] [{e['stage']}] {e['msg']}"
+            + (f" ({e['duration_ms']} ms)" if e["duration_ms"] is not None else "")
+            + (f" doc={e['doc_hash']}" if e["doc_hash"] else "")
+            for e in events
+        )
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            events = list(self._events)
+        return "\n".join(json.dumps(e, ensure_ascii=False) for e in events)
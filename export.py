@@ -0,0 +1,155 @@
+"""Stream saved extractions out of the configured store as CSV, JSONL or Parquet.
+
+Rows are read with keyset pagination (one page of --page-size rows in memory
+at a time) and written to the output as each page arrives, so memory stays
+flat however many records are exported. Parquet gets one row group per page.
+
+Needs SUPABASE_URL and SUPABASE_SERVICE_KEY (row-level security would hide
+other users' rows from the anon key), or STORAGE_BACKEND=sqlite for a local store.
+
+    python export.py --format csv --out extractions.csv
+    python export.py --format parquet --out extractions.parquet --user-id <uuid>
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+from supabase import create_client
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from database import SUPABASE_URL, _get_secret
+from storage import STORAGE_BACKEND, SupabaseStorage, get_storage
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_MIME = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+EXPORT_PAGE_SIZE = 1000
+# Above this many records the sidebar's "Export all" is disabled in favour of
+# this CLI: Streamlit holds a download's whole payload in server memory.
+EXPORT_INAPP_MAX_ROWS = int(os.getenv("EXPORT_INAPP_MAX_ROWS", "5000") or 5000)
+
+
+def fields_csv(fields) -> str:
+    # Single-document Field,Value CSV, quoted so commas and newlines in values survive.
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows(fields.items())
+    return buf.getvalue()
+
+
+class CsvSink:
+    def __init__(self, fh, columns):
+        self._text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._text, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class JsonlSink:
+    def __init__(self, fh, columns):
+        self._text = io.TextIOWrapper(fh, encoding="utf-8", newline="\n")
+        self._columns = columns
+
+    def write(self, rows):
+        self._text.writelines(
+            json.dumps({c: row.get(c) for c in self._columns}, ensure_ascii=False) + "\n" for row in rows
+        )
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class ParquetSink:
+    def __init__(self, fh, columns):
+        if pq is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        self._schema = pa.schema([(c, pa.float64() if c == "file_size_kb" else pa.string()) for c in columns])
+        self._writer = pq.ParquetWriter(fh, self._schema, compression="zstd")
+
+    def write(self, rows):
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def export_extractions(storage, fmt, fh, user_id=None, page_size=EXPORT_PAGE_SIZE, include_raw_text=False, progress=None):
+    # Writes every matching row to the binary file object fh; returns the row count.
+    columns = storage.export_columns(include_raw_text)
+    sink = SINKS[fmt](fh, columns)
+    count = 0
+    try:
+        for rows in storage.iter_pages(user_id, columns, page_size):
+            sink.write(rows)
+            count += len(rows)
+            if progress is not None:
+                progress(count)
+    finally:
+        sink.close()
+    return count
+
+
+def export_to_bytes(storage, fmt, user_id=None, page_size=EXPORT_PAGE_SIZE):
+    # For the in-app download, which st.download_button materialises in memory
+    # anyway; the sidebar only offers it up to EXPORT_INAPP_MAX_ROWS records.
+    buf = io.BytesIO()
+    export_extractions(storage, fmt, buf, user_id=user_id, page_size=page_size)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--out", default="", help="output file (default: extractions.<format>; - for stdout)")
+    parser.add_argument("--user-id", default="", help="only export this user's rows")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE)
+    parser.add_argument("--raw-text", action="store_true", help="include the full OCR text as a raw_text column")
+    args = parser.parse_args(argv)
+
+    if STORAGE_BACKEND == "sqlite":
+        storage = get_storage()
+    else:
+        key = _get_secret("SUPABASE_SERVICE_KEY")
+        if not SUPABASE_URL or not key:
+            print("SUPABASE_URL and SUPABASE_SERVICE_KEY are required", file=sys.stderr)
+            return 2
+        client = create_client(SUPABASE_URL, key)
+        storage = SupabaseStorage(lambda: client)
+
+    out = args.out or f"extractions.{args.format}"
+    started = time.perf_counter()
+    fh = sys.stdout.buffer if out == "-" else open(out, "wb")
+    try:
+        count = export_extractions(
+            storage, args.format, fh, user_id=args.user_id or None, page_size=args.page_size,
+            include_raw_text=args.raw_text, progress=lambda n: print(f"exported {n} rows", file=sys.stderr),
+        )
+    finally:
+        if fh is not sys.stdout.buffer:
+            fh.close()
+    print(f"exported={count} format={args.format} out={out} elapsed={time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
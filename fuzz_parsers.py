@@ -0,0 +1,157 @@
+"""Regex fuzz/perf harness for the ID-text parsers.
+
+Collects every pattern the parsers compile (via regex_guard.REGEX), then times
+each one against adversarial inputs of growing size — long label repetitions,
+whitespace and newline runs, digit soup, Devanagari, concatenated multi-page
+text — and flags patterns whose cost grows super-linearly. Finally runs whole
+documents through extract_fields to show the effect of PARSE_MAX_CHARS and the
+parse time budget.
+
+    python fuzz_parsers.py --sizes 1000,4000,16000
+    PARSE_REGEX_BACKEND=re2 python fuzz_parsers.py
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import argparse
+
+from id_corpus import generate_corpus
+from ocr_extraction import FIELD_EXTRACTORS, extract_fields
+from regex_guard import REGEX, PARSE_TIME_BUDGET_MS, parse_budget
+
+LABELS = [
+    "address", "name", "dob", "vid", "s/o", "enrolment", "father's name", "date of birth",
+    "valid till", "cov", "rto", "part no", "serial", "polling station", "पता", "नाम", "जन्म तिथि",
+]
+
+
+def _fill(unit: str, size: int) -> str:
+    return (unit * (size // max(len(unit), 1) + 1))[:size]
+
+
+def adversarial_inputs(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    corpus_text = "\n\n".join(d["text"] for d in generate_corpus(per_type=10, seed=seed))
+    noise = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789 :-/.,\n|OIl") for _ in range(size))
+    return {
+        "label_repeat": _fill(" ".join(LABELS) + " ", size),
+        "label_ws_runs": _fill("vid" + " " * 64 + "address" + "\n" * 64 + "name :" + " " * 64, size),
+        "newline_runs": _fill("enrolment" + "\n" * 256 + "x", size),
+        "label_long_ws": "".join(label + "\n" * (size // len(LABELS)) + "x" for label in LABELS),
+        "label_long_spaces": "".join(label + " " * (size // len(LABELS)) + "x\n" for label in LABELS),
+        "digit_soup": _fill("1234 5678 12-05-2011 ", size),
+        "long_line": _fill("A", size),
+        "devanagari": _fill("पता नाम आधार जन्म तिथि पिता का नाम ", size),
+        "random_noise": noise,
+        "multi_page": _fill(corpus_text + "\n\n", size),
+    }
+
+
+def _time_pattern(compiled, text: str) -> float:
+    started = time.perf_counter()
+    for _ in compiled.finditer(text):
+        pass
+    return (time.perf_counter() - started) * 1000
+
+
+def _growth(sizes, times):
+    # Slope of log(time) against log(size): ~1 is linear, ~2 quadratic.
+    pts = [(math.log(s), math.log(t)) for s, t in zip(sizes, times) if t > 0.05]
+    if len(pts) < 2:
+        return 0.0
+    (x0, y0), (x1, y1) = pts[0], pts[-1]
+    return (y1 - y0) / (x1 - x0) if x1 != x0 else 0.0
+
+
+def collect_patterns():
+    # Running the corpus through every extractor compiles the patterns on the hot paths.
+    for doc in generate_corpus(per_type=10):
+        extract_fields(doc["text"])
+        for extractor in FIELD_EXTRACTORS.values():
+            extractor(doc["text"])
+    return REGEX.patterns()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,4000,16000", help="comma-separated input sizes in characters")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-exponent", type=float, default=1.5, help="flag patterns growing faster than size**N")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore patterns faster than this at the largest size")
+    parser.add_argument("--call-cap-ms", type=float, default=5000.0, help="stop growing a pattern once one call exceeds this")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(int(s) for s in args.sizes.split(",") if s.strip())
+    inputs = {size: adversarial_inputs(size, args.seed) for size in sizes}
+    patterns = collect_patterns()
+
+    rows = []
+    for pattern, flags in patterns:
+        compiled = REGEX.compile(pattern, flags)
+        for family in inputs[sizes[0]]:
+            times = []
+            for size in sizes:
+                times.append(_time_pattern(compiled, inputs[size][family]))
+                if times[-1] > args.call_cap_ms:
+                    break
+            rows.append({
+                "pattern": pattern,
+                "family": family,
+                "sizes": sizes[:len(times)],
+                "ms": [round(t, 3) for t in times],
+                "exponent": round(_growth(sizes, times), 2),
+            })
+
+    flagged = [
+        r for r in rows
+        if r["ms"][-1] >= args.min_ms and (r["exponent"] > args.max_exponent or r["ms"][-1] > args.call_cap_ms)
+    ]
+    worst = sorted(rows, key=lambda r: r["ms"][-1], reverse=True)[:args.top]
+
+    documents = {}
+    largest = sizes[-1]
+    for family, text in inputs[largest].items():
+        started = time.perf_counter()
+        with parse_budget(0):
+            extract_fields(text, budget_ms=0)
+        unbounded = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        extract_fields(text)
+        bounded = (time.perf_counter() - started) * 1000
+        documents[family] = {"unbudgeted_ms": round(unbounded, 2), "budgeted_ms": round(bounded, 2)}
+
+    report = {
+        "engine": REGEX.engine,
+        "patterns": len(patterns),
+        "re2_fallbacks": sorted(REGEX.fallbacks),
+        "sizes": sizes,
+        "budget_ms": PARSE_TIME_BUDGET_MS,
+        "flagged": flagged,
+        "worst": worst,
+        "documents": documents,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"engine={report['engine']} patterns={report['patterns']} sizes={sizes} budget={PARSE_TIME_BUDGET_MS:.0f}ms")
+        if report["re2_fallbacks"]:
+            print(f"{len(report['re2_fallbacks'])} pattern(s) not RE2-compatible, using stdlib re")
+        print(f"\n{'ms @' + str(largest):>12}{'exp':>7}  {'family':<14}pattern")
+        for r in worst:
+            mark = " *" if r in flagged else ""
+            print(f"{r['ms'][-1]:>12.2f}{r['exponent']:>7.2f}  {r['family']:<14}{r['pattern'][:70]}{mark}")
+        print(f"\n{'document family':<16}{'unbudgeted ms':>15}{'budgeted ms':>13}   (@{largest} chars)")
+        for family, d in documents.items():
+            print(f"{family:<16}{d['unbudgeted_ms']:>15.2f}{d['budgeted_ms']:>13.2f}")
+        print(f"\n{len(flagged)} super-linear pattern(s) flagged" + (" (marked *)" if flagged else ""))
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Synthetic OCR-text corpus for Aadhaar, PAN, DL and Voter cards.
+
+Texts imitate what OCR.space returns for real cards: bilingual labels, front
+and back sides, uneven spacing, O/0 and I/1 confusions and stray punctuation.
+Generation is fully deterministic for a given seed.
+"""
+
+import random
+
+FIRST_NAMES = [
+    "Rahul", "Priya", "Suresh", "Anita", "Mohammed", "Lakshmi", "Arjun", "Kavita",
+    "Sandeep", "Fatima", "Vikram", "Meena", "Rohit", "Deepa", "Imran", "Sunita",
+]
+LAST_NAMES = [
+    "Sharma", "Singh", "Patil", "Devi", "Khan", "Iyer", "Reddy", "Gupta",
+    "Nair", "Das", "Yadav", "Joshi", "Mehta", "Pillai", "Chauhan", "Bose",
+]
+CITIES = [
+    ("Pune", "Maharashtra", "MH"), ("Bengaluru", "Karnataka", "KA"), ("Lucknow", "Uttar Pradesh", "UP"),
+    ("Chennai", "Tamil Nadu", "TN"), ("Jaipur", "Rajasthan", "RJ"), ("Kolkata", "West Bengal", "WB"),
+    ("Patna", "Bihar", "BR"), ("Ahmedabad", "Gujarat", "GJ"), ("Kochi", "Kerala", "KL"),
+    ("Bhopal", "Madhya Pradesh", "MP"),
+]
+STREETS = ["MG Road", "Station Road", "Gandhi Nagar", "Nehru Colony", "Shivaji Chowk", "Lake View Layout"]
+BLOOD_GROUPS = ["A+", "B+", "O+", "AB+", "A-", "B-", "O-"]
+VEHICLE_CLASSES = ["LMV", "MCWG", "LMV, MCWG", "LMV-NT, MCWG", "TRANS"]
+DOC_TYPES = ("aadhaar", "pan", "dl", "voter")
+
+
+class _Noise:
+    def __init__(self, rng: random.Random, level: float):
+        self.rng = rng
+        self.level = level
+
+    def chance(self, p: float) -> bool:
+        return self.rng.random() < p * self.level
+
+    def digits(self, s: str) -> str:
+        # OCR confusions inside digit runs, which clean_ocr_text is meant to undo.
+        out = []
+        for i, ch in enumerate(s):
+            if ch == "0" and 0 < i < len(s) - 1 and s[i - 1].isdigit() and s[i + 1].isdigit() and self.chance(0.15):
+                ch = "O"
+            elif ch == "1" and 0 < i < len(s) - 1 and s[i - 1].isdigit() and s[i + 1].isdigit() and self.chance(0.1):
+                ch = "l"
+            out.append(ch)
+        return "".join(out)
+
+    def spacing(self, line: str) -> str:
+        if self.chance(0.3):
+            line = line.replace(" ", "  ", 1)
+        if self.chance(0.15):
+            line = " " + line
+        if self.chance(0.1):
+            line = line + self.rng.choice([" |", " .", " ,", " '"])
+        return line
+
+    def lines(self, lines):
+        out = []
+        for line in lines:
+            if line and self.chance(0.03):
+                continue
+            out.append(self.spacing(line))
+            if self.chance(0.05):
+                out.append("")
+        return "\n".join(out)
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _date(rng, start_year=1955, end_year=2005):
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(start_year, end_year)}"
+
+
+def _address(rng):
+    city, state, _ = rng.choice(CITIES)
+    pin = f"{rng.randint(1, 8)}{rng.randint(0, 99999):05d}"
+    return f"House No {rng.randint(1, 999)}, {rng.choice(STREETS)}, {city}, {state} - {pin}", state, pin
+
+
+def aadhaar_text(rng, noise):
+    name = _name(rng)
+    number = " ".join(f"{rng.randint(0, 9999):04d}" for _ in range(3))
+    number = str(rng.randint(2, 9)) + number[1:]
+    gender = rng.choice([("पुरुष", "MALE"), ("महिला", "FEMALE")])
+    dob = _date(rng)
+    if rng.random() < 0.55:
+        lines = [
+            "भारत सरकार",
+            "GOVERNMENT OF INDIA",
+            name,
+            f"जन्म तिथि / DOB: {noise.digits(dob)}",
+            f"{gender[0]} / {gender[1]}",
+            noise.digits(number),
+            "मेरा आधार, मेरी पहचान",
+        ]
+    else:
+        address, _, _ = _address(rng)
+        vid = " ".join(f"{rng.randint(0, 9999):04d}" for _ in range(4))
+        lines = [
+            "Unique Identification Authority of India",
+            "भारतीय विशिष्ट पहचान प्राधिकरण",
+            "पता:",
+            f"Address: S/O: {_name(rng)}, {address}",
+            noise.digits(number),
+            f"VID : {noise.digits(vid)}",
+            "help@uidai.gov.in www.uidai.gov.in",
+        ]
+    return noise.lines(lines)
+
+
+def pan_text(rng, noise):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    pan = (
+        "".join(rng.choice(letters) for _ in range(3))
+        + "P"
+        + rng.choice(letters)
+        + f"{rng.randint(0, 9999):04d}"
+        + rng.choice(letters)
+    )
+    lines = [
+        "आयकर विभाग INCOME TAX DEPARTMENT",
+        "भारत सरकार GOVT. OF INDIA",
+        "स्थायी लेखा संख्या कार्ड",
+        "Permanent Account Number Card",
+        pan,
+        "नाम / Name",
+        _name(rng).upper(),
+        "पिता का नाम / Father's Name",
+        _name(rng).upper(),
+        "जन्म की तारीख / Date of Birth",
+        noise.digits(_date(rng)),
+    ]
+    return noise.lines(lines)
+
+
+def dl_text(rng, noise):
+    city, state, code = rng.choice(CITIES)
+    number = f"{code}{rng.randint(1, 50):02d} {rng.randint(1995, 2022)}{rng.randint(0, 9999999):07d}"
+    issue_year = rng.randint(2005, 2022)
+    issue = f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{issue_year}"
+    valid = f"{issue[:6]}{issue_year + 20}"
+    address, _, _ = _address(rng)
+    lines = [
+        "Union of India",
+        f"{state} State Motor Driving Licence" if rng.random() < 0.5 else "Driving Licence",
+        f"DL No: {noise.digits(number)}",
+        f"Name: {_name(rng).upper()}",
+        f"S/D/W of: {_name(rng).upper()}",
+        f"Date of Issue: {noise.digits(issue)}",
+        f"Valid Till: {noise.digits(valid)}",
+        f"DOB: {noise.digits(_date(rng).replace('/', '-'))}",
+        f"Blood Group: {rng.choice(BLOOD_GROUPS)}",
+        f"COV: {rng.choice(VEHICLE_CLASSES)}",
+        f"Address: {address}",
+        "",
+        f"Licensing Authority: RTO {city.upper()}",
+    ]
+    return noise.lines(lines)
+
+
+def voter_text(rng, noise):
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    epic = "".join(rng.choice(letters) for _ in range(3)) + f"{rng.randint(0, 9999999):07d}"
+    gender = rng.choice(["Male", "Female"])
+    if rng.random() < 0.6:
+        lines = [
+            "ELECTION COMMISSION OF INDIA",
+            "भारत निर्वाचन आयोग",
+            "ELECTOR PHOTO IDENTITY CARD",
+            epic,
+            f"Elector's Name : {_name(rng).upper()}",
+            f"Father's Name : {_name(rng).upper()}",
+            f"Sex / लिंग : {gender}",
+            f"Date of Birth / जन्म तिथि : {noise.digits(_date(rng))}",
+        ]
+    else:
+        address, state, _ = _address(rng)
+        lines = [
+            epic,
+            f"Address: {address}",
+            f"Assembly Constituency: {rng.choice(CITIES)[0]} North",
+            f"Part No: {rng.randint(1, 300)}",
+            f"Serial No: {rng.randint(1, 1500)}",
+            f"Polling Station: Govt School {rng.choice(STREETS)}",
+            "Electoral Registration Officer",
+        ]
+    return noise.lines(lines)
+
+
+GENERATORS = {"aadhaar": aadhaar_text, "pan": pan_text, "dl": dl_text, "voter": voter_text}
+
+
+def generate_corpus(per_type: int = 25, seed: int = 1234, noise_level: float = 1.0):
+    """Return a list of ``{"id", "doc_type", "text"}`` dicts, ``per_type`` per card type."""
+    corpus = []
+    for doc_type in DOC_TYPES:
+        for i in range(per_type):
+            rng = random.Random(f"{seed}:{doc_type}:{i}")
+            text = GENERATORS[doc_type](rng, _Noise(rng, noise_level))
+            corpus.append({"id": f"{doc_type}-{i:03d}", "doc_type": doc_type, "text": text})
+    return corpus
+
+
+if __name__ == "__main__":
+    for doc in generate_corpus(per_type=1):
+        print(f"--- {doc['id']} ---\n{doc['text']}\n")
@@ -0,0 +1,138 @@
+import json
+import time
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (ms) for the cumulative Prometheus buckets.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Percentiles are computed over the most recent samples of each stage.
+MAX_SAMPLES = 2048
+
+STAGE_ORDER = (
+    "decode", "blur", "phash", "face_extraction", "compress", "ocr_network", "ocr_local",
+    "parse", "photo_upload", "db_duplicate_check", "db_insert", "db_raw_text", "db_fetch",
+)
+
+
+def percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+class StageHistogram:
+    def __init__(self):
+        self.count = 0
+        self.sum_ms = 0.0
+        self.cpu_ms = 0.0
+        self.max_ms = 0.0
+        self.mem_count = 0
+        self.mem_sum_kb = 0.0
+        self.mem_max_kb = 0.0
+        self.bucket_counts = [0] * len(BUCKETS_MS)
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def observe(self, ms: float, cpu_ms: float = 0.0, mem_kb=None):
+        if mem_kb is not None:
+            self.mem_count += 1
+            self.mem_sum_kb += mem_kb
+            self.mem_max_kb = max(self.mem_max_kb, mem_kb)
+        self.count += 1
+        self.sum_ms += ms
+        self.cpu_ms += cpu_ms
+        self.max_ms = max(self.max_ms, ms)
+        self.samples.append(ms)
+        for i, upper in enumerate(BUCKETS_MS):
+            if ms <= upper:
+                self.bucket_counts[i] += 1
+                break
+
+    def snapshot(self) -> dict:
+        vals = sorted(self.samples)
+        snap = {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "cpu_ms": round(self.cpu_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(percentile(vals, 0.50), 3),
+            "p95_ms": round(percentile(vals, 0.95), 3),
+            "p99_ms": round(percentile(vals, 0.99), 3),
+        }
+        if self.mem_count:
+            snap["mem_peak_kb_avg"] = round(self.mem_sum_kb / self.mem_count, 1)
+            snap["mem_peak_kb_max"] = round(self.mem_max_kb, 1)
+        return snap
+
+
+# Process-wide, thread-safe per-stage latency aggregation.
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage: str, ms: float, cpu_ms: float = 0.0, mem_kb=None):
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = StageHistogram()
+            hist.observe(ms, cpu_ms, mem_kb)
+
+    @contextmanager
+    def timer(self, stage: str):
+        # While tracemalloc is tracing, also records the stage's peak Python
+        # allocation above what was live when it started. The peak counter is
+        # process-wide, so the figure is only exact for one stage at a time
+        # (bench_pipeline measures it in a serial pass).
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_mem = tracemalloc.get_traced_memory()[0]
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            ms, cpu_ms = (time.perf_counter() - start) * 1000, (time.thread_time() - start_cpu) * 1000
+            mem_kb = (tracemalloc.get_traced_memory()[1] - start_mem) / 1024 if tracing else None
+            self.observe(stage, ms, cpu_ms, mem_kb)
+
+    def _ordered_stages(self):
+        known = [s for s in STAGE_ORDER if s in self._stages]
+        return known + sorted(s for s in self._stages if s not in STAGE_ORDER)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {s: self._stages[s].snapshot() for s in self._ordered_stages()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "ocr_stream_stage_duration_seconds") -> str:
+        lines = [
+            f"# HELP {prefix} Time spent per extraction pipeline stage.",
+            f"# TYPE {prefix} histogram",
+        ]
+        with self._lock:
+            for stage in self._ordered_stages():
+                hist = self._stages[stage]
+                cumulative = 0
+                for upper, n in zip(BUCKETS_MS, hist.bucket_counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_bucket{{stage="{stage}",le="{upper / 1000:g}"}} {cumulative}')
+                lines.append(f'{prefix}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+                lines.append(f'{prefix}_sum{{stage="{stage}"}} {hist.sum_ms / 1000:.6f}')
+                lines.append(f'{prefix}_count{{stage="{stage}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+METRICS = Metrics()
+
+
+def timed(stage: str):
+    return METRICS.timer(stage)
@@ -0,0 +1,218 @@
+"""Local stand-in for the OCR.space ``parse/image`` endpoint.
+
+Point the app or a benchmark at it with ``OCR_URL=http://127.0.0.1:8765/parse/image``.
+Responses are replayed from recorded JSON files (``--replay``) or synthesised
+from fixture texts (``--fixtures``, or a small built-in set), with configurable
+latency, error and timeout behaviour.
+
+    python mock_ocr_server.py --port 8765 --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUILTIN_FIXTURES = [
+    "GOVERNMENT OF INDIA\nRahul Kumar Sharma\nDOB: 14/08/1991\nMale\n4821 7736 9013\nमेरा आधार, मेरी पहचान",
+    "INCOME TAX DEPARTMENT\nGOVT. OF INDIA\nPermanent Account Number Card\nABCPS1234K\nName\nPRIYA SINGH\nFather's Name\nRAJESH SINGH\nDate of Birth\n02/11/1988",
+    "Union of India\nDriving Licence\nDL No: MH12 20110012345\nName: SURESH PATIL\nDate of Issue: 12-05-2011\nValid Till: 11-05-2031\nDOB: 23-09-1985\nBlood Group: B+\nCOV: LMV, MCWG",
+    "ELECTION COMMISSION OF INDIA\nElector Photo Identity Card\nABC1234567\nElector's Name: ANITA DEVI\nFather's Name: RAM PRASAD\nSex: Female\nDate of Birth: 01/01/1990",
+]
+
+
+def load_fixtures(path: str):
+    if not path:
+        return list(BUILTIN_FIXTURES)
+    texts = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".txt"):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts or list(BUILTIN_FIXTURES)
+
+
+def load_replays(path: str):
+    if not path:
+        return []
+    replays = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".json"):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                replays.append(json.load(f))
+    return replays
+
+
+def parse_multipart(content_type: str, body: bytes):
+    msg = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    form, files = {}, {}
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if not name:
+            continue
+        if part.get_filename() is not None:
+            files[name] = part.get_payload(decode=True) or b""
+        else:
+            form[name] = (part.get_payload(decode=True) or b"").decode("utf-8", "replace")
+    return form, files
+
+
+class MockOcrConfig:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        hang_seconds: float = 120.0,
+        fixtures=None,
+        replays=None,
+        seed=None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.fixtures = fixtures or list(BUILTIN_FIXTURES)
+        self.replays = replays or []
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def roll(self):
+        with self.lock:
+            self.requests += 1
+            return self.random.random(), self.random.uniform(-1, 1)
+
+
+def synthetic_response(cfg: MockOcrConfig, file_bytes: bytes, engine: str, elapsed_ms: float) -> dict:
+    # Same upload -> same fixture, so repeated runs are comparable.
+    idx = int(hashlib.sha1(file_bytes).hexdigest(), 16)
+    if cfg.replays:
+        return cfg.replays[idx % len(cfg.replays)]
+    return {
+        "ParsedResults": [
+            {
+                "TextOverlay": {"Lines": [], "HasOverlay": False},
+                "FileParseExitCode": 1,
+                "ParsedText": cfg.fixtures[idx % len(cfg.fixtures)],
+                "ErrorMessage": "",
+                "ErrorDetails": "",
+            }
+        ],
+        "OCRExitCode": 1,
+        "IsErroredOnProcessing": False,
+        "ProcessingTimeInMilliseconds": str(round(elapsed_ms)),
+        "SearchablePDFURL": "Searchable PDF not generated as it was not requested.",
+        "OCREngine": engine,
+    }
+
+
+def errored_response(message: str) -> dict:
+    return {"OCRExitCode": 3, "IsErroredOnProcessing": True, "ErrorMessage": [message], "ProcessingTimeInMilliseconds": "0"}
+
+
+def make_handler(cfg: MockOcrConfig):
+    class MockOcrHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            started = time.perf_counter()
+            if self.path.rstrip("/") != "/parse/image":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            form, files = parse_multipart(self.headers.get("Content-Type", ""), self.rfile.read(length))
+
+            if not form.get("apikey"):
+                self._send_json(403, errored_response("API key is missing or invalid"))
+                return
+
+            roll, jitter = cfg.roll()
+            if roll < cfg.hang_rate:
+                time.sleep(cfg.hang_seconds)
+            delay = max(0.0, cfg.latency_ms + jitter * cfg.jitter_ms) / 1000
+            if delay:
+                time.sleep(delay)
+
+            if roll < cfg.hang_rate + cfg.timeout_rate:
+                payload = errored_response("E101: Timed out waiting for results")
+            elif roll < cfg.hang_rate + cfg.timeout_rate + cfg.error_rate:
+                payload = errored_response("E500: Resource Exhaustion (synthetic)")
+            else:
+                elapsed = (time.perf_counter() - started) * 1000
+                payload = synthetic_response(cfg, files.get("file", b""), form.get("OCREngine", "1"), elapsed)
+            self._send_json(200, payload)
+
+    return MockOcrHandler
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, config=None):
+    cfg = config or MockOcrConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-ocr-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/parse/image"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction answered with an E101 timeout error")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction that stall for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--fixtures", default="", help="directory of .txt fixture texts")
+    parser.add_argument("--replay", default="", help="directory of recorded .json responses")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    cfg = MockOcrConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        fixtures=load_fixtures(args.fixtures),
+        replays=load_replays(args.replay),
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    print(f"Mock OCR.space listening on http://{args.host}:{server.server_address[1]}/parse/image", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import os
+import io
+import time
+import threading
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageEnhance, ImageOps
+
+from metrics import timed
+from ocr_extraction import perform_ocr, prepare_upload, get_ocr_client, extract_fields, score_fields
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+OCR_LOCAL_WORKERS = int(os.getenv("OCR_LOCAL_WORKERS", "0") or 0) or (os.cpu_count() or 2)
+OCR_LOCAL_TIMEOUT = int(os.getenv("OCR_LOCAL_TIMEOUT", "60") or 60)
+# Extra seconds to wait for a pool result beyond OCR_LOCAL_TIMEOUT (queueing, preprocessing).
+OCR_LOCAL_QUEUE_GRACE = int(os.getenv("OCR_LOCAL_QUEUE_GRACE", "30") or 30)
+OCR_LOCAL_MIN_CONFIDENCE = float(os.getenv("OCR_LOCAL_MIN_CONFIDENCE", "70") or 70)
+# "auto" engine mode: try OCR.space engines fastest first, stop at the first result scoring this high.
+OCR_AUTO_MIN_SCORE = float(os.getenv("OCR_AUTO_MIN_SCORE", "0.65") or 0.65)
+AUTO_ENGINE_ORDER = (1, 2, 3)
+
+# OCR.space language codes -> Tesseract traineddata names.
+TESSERACT_LANGS = {
+    "eng": "eng", "spa": "spa", "fre": "fra", "ger": "deu",
+    "ita": "ita", "chs": "chi_sim", "cht": "chi_tra",
+}
+
+
+def _tesseract_worker(raw_bytes: bytes, lang: str, timeout: float = 0) -> dict:
+    # Runs in a pool process; must stay a picklable module-level function.
+    # Errors come back as plain dicts: pytesseract's exceptions don't unpickle.
+    try:
+        return _tesseract_recognize(raw_bytes, lang, timeout)
+    except pytesseract.TesseractNotFoundError:
+        return {"error": "tesseract binary not found", "unavailable": True}
+    except RuntimeError as e:
+        # pytesseract kills its own tesseract subprocess when timeout= expires.
+        if "timeout" in str(e).lower():
+            return {"error": f"Local OCR failed: timed out after {timeout:.0f}s"}
+        return {"error": f"Local OCR failed: {str(e).strip() or type(e).__name__}"}
+    except Exception as e:
+        return {"error": f"Local OCR failed: {str(e).strip() or type(e).__name__}"}
+
+
+def _tesseract_recognize(raw_bytes: bytes, lang: str, timeout: float = 0) -> dict:
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(raw_bytes))
+    img = ImageOps.exif_transpose(img).convert("L")
+    if img.width < 1000:
+        img = img.resize((1000, int(img.height * 1000 / img.width)), Image.LANCZOS)
+    img = ImageEnhance.Contrast(img).enhance(1.5)
+
+    data = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT, timeout=timeout)
+    lines, confs = {}, []
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        conf = float(data["conf"][i])
+        if not word or conf < 0:
+            continue
+        confs.append(conf)
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    return {
+        "ParsedResults": [{"ParsedText": text, "MeanConfidence": round(sum(confs) / len(confs), 1) if confs else 0.0}],
+        "ProcessingTimeInMilliseconds": str(round((time.perf_counter() - started) * 1000)),
+        "OCREngine": "tesseract",
+    }
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+# Why local OCR can't run in this process (set on first failure, logged once).
+_LOCAL_UNAVAILABLE = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn, not fork: the Streamlit server process is multi-threaded.
+            _POOL = ProcessPoolExecutor(max_workers=OCR_LOCAL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def _reset_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def _local_unavailable(client, reason: str) -> dict:
+    global _LOCAL_UNAVAILABLE
+    if _LOCAL_UNAVAILABLE is None:
+        _LOCAL_UNAVAILABLE = reason
+        client.log("Local OCR", f"local OCR unavailable: {reason}", severity="warning")
+    return {"error": f"Local OCR unavailable: {_LOCAL_UNAVAILABLE}"}
+
+
+def result_confidence(result: dict) -> float:
+    pages = result.get("ParsedResults") or []
+    confs = [pr.get("MeanConfidence") for pr in pages if pr.get("MeanConfidence") is not None]
+    return sum(confs) / len(confs) if confs else 0.0
+
+
+# An engine turns document bytes into an OCR.space-shaped result:
+# {"ParsedResults": [{"ParsedText": ...}, ...], ...} or {"error": ...}.
+class OcrEngine(ABC):
+    name = ""
+    label = ""
+    # Whether the OCR.space engine number changes the result (escalation is pointless otherwise).
+    uses_engine_code = True
+
+    def prepare(self, raw_bytes, is_pdf=False, client=None):
+        # Per-file work shared by repeated recognize() calls (see recognize_auto).
+        return None
+
+    @abstractmethod
+    def recognize(self, raw_bytes, language_code, engine_code, is_pdf=False, client=None, upload=None) -> dict:
+        ...
+
+
+class OcrSpaceEngine(OcrEngine):
+    name = "ocrspace"
+    label = "OCR.space (remote)"
+
+    def recognize(self, raw_bytes, language_code, engine_code, is_pdf=False, client=None, upload=None) -> dict:
+        return perform_ocr(raw_bytes, language_code, engine_code, is_pdf=is_pdf, client=client, upload=upload)
+
+    def prepare(self, raw_bytes, is_pdf=False, client=None):
+        return prepare_upload(raw_bytes, is_pdf, client)
+
+
+class TesseractEngine(OcrEngine):
+    name = "local"
+    label = "Tesseract (local)"
+    uses_engine_code = False
+
+    def __init__(self, timeout: int = OCR_LOCAL_TIMEOUT):
+        self.timeout = timeout
+
+    def recognize(self, raw_bytes, language_code, engine_code, is_pdf=False, client=None, upload=None) -> dict:
+        client = client or get_ocr_client()
+        if pytesseract is None:
+            return _local_unavailable(client, "pytesseract is not installed")
+        if _LOCAL_UNAVAILABLE is not None:
+            return _local_unavailable(client, _LOCAL_UNAVAILABLE)
+        if is_pdf:
+            return {"error": "Local OCR does not support PDFs"}
+        future = None
+        try:
+            with timed("ocr_local"):
+                future = _get_pool().submit(
+                    _tesseract_worker, raw_bytes, TESSERACT_LANGS.get(language_code, "eng"), self.timeout
+                )
+                # The worker enforces self.timeout on its own tesseract process;
+                # the extra wait here covers image preprocessing and queueing.
+                result = future.result(timeout=self.timeout + OCR_LOCAL_QUEUE_GRACE)
+            if result.get("unavailable"):
+                return _local_unavailable(client, result["error"])
+            if "error" in result:
+                client.log("Local OCR", result["error"])
+            return result
+        except FutureTimeout:
+            # Only this job is abandoned: a queued one is cancelled, a running one
+            # ends when its tesseract hits the worker-side timeout. The shared pool
+            # and other sessions' jobs are left alone.
+            future.cancel()
+            client.log("Local OCR", f"no result after {self.timeout + OCR_LOCAL_QUEUE_GRACE}s", severity="warning")
+            return {"error": "Local OCR failed: timed out"}
+        except BrokenProcessPool as e:
+            _reset_pool()
+            client.log("Local OCR", f"worker pool crashed: {e}")
+            return {"error": "Local OCR failed: worker pool crashed"}
+        except Exception as e:
+            msg = str(e) or type(e).__name__
+            client.log("Local OCR", msg)
+            return {"error": f"Local OCR failed: {msg}"}
+
+
+class LocalFirstEngine(OcrEngine):
+    name = "local_first"
+    label = "Local first → OCR.space"
+
+    def __init__(self, local=None, remote=None, min_confidence: float = OCR_LOCAL_MIN_CONFIDENCE):
+        self.local = local or TesseractEngine()
+        self.remote = remote or OcrSpaceEngine()
+        self.min_confidence = min_confidence
+
+    def recognize(self, raw_bytes, language_code, engine_code, is_pdf=False, client=None, upload=None) -> dict:
+        client = client or get_ocr_client()
+        result = self.local.recognize(raw_bytes, language_code, engine_code, is_pdf=is_pdf, client=client, upload=upload)
+        if "error" not in result:
+            conf = result_confidence(result)
+            text = "".join(pr.get("ParsedText", "") for pr in result.get("ParsedResults", [])).strip()
+            if text and conf >= self.min_confidence:
+                return result
+            client.log("Local OCR", f"confidence {conf:.0f} below {self.min_confidence:.0f} — using OCR.space", severity="info")
+        return self.remote.recognize(raw_bytes, language_code, engine_code, is_pdf=is_pdf, client=client, upload=upload)
+
+    def prepare(self, raw_bytes, is_pdf=False, client=None):
+        return self.remote.prepare(raw_bytes, is_pdf, client)
+
+
+ENGINES = {cls.name: cls for cls in (OcrSpaceEngine, TesseractEngine, LocalFirstEngine)}
+
+
+def get_engine(name: str) -> OcrEngine:
+    return ENGINES.get(name, OcrSpaceEngine)()
+
+
+def recognize_auto(engine: OcrEngine, raw_bytes, language_code, is_pdf=False, client=None, parse=True,
+                   min_score: float = OCR_AUTO_MIN_SCORE) -> dict:
+    # Escalates through AUTO_ENGINE_ORDER until the parsed fields score >= min_score
+    # (or, without parsing, until any text comes back). The best attempt is returned
+    # with an "AutoEngine" entry: the engine used, its score, every attempt and, when
+    # parsing, the (doc_type, fields) it produced so callers needn't parse again.
+    # A LocalFirstEngine runs its local engine once, then escalates the remote one.
+    client = client or get_ocr_client()
+    codes = [c for c in AUTO_ENGINE_ORDER if not (is_pdf and c == 3)]
+    steps, local, min_confidence = [], None, 0.0
+    if isinstance(engine, LocalFirstEngine):
+        local, min_confidence = engine.local, engine.min_confidence
+        steps.append(("local", local, codes[0]))
+        engine = engine.remote
+    if not engine.uses_engine_code:
+        codes = codes[:1]
+    steps += [(code, engine, code) for code in codes]
+    upload = engine.prepare(raw_bytes, is_pdf, client) if len(codes) > 1 else None
+    best, attempts = None, []
+    for i, (label, step_engine, code) in enumerate(steps):
+        result = step_engine.recognize(raw_bytes, language_code, code, is_pdf=is_pdf, client=client,
+                                       upload=None if step_engine is local else upload)
+        if "error" in result:
+            attempts.append({"engine": label, "error": result["error"]})
+            if best is None:
+                best = result
+            if step_engine is local:
+                continue
+            break
+        text = "\n".join(pr.get("ParsedText", "") for pr in result.get("ParsedResults") or [])
+        if parse:
+            with timed("parse"):
+                parsed = extract_fields(text, client=client)
+            score = score_fields(*parsed, text)
+        else:
+            parsed, score = None, 1.0 if text.strip() else 0.0
+        attempts.append({"engine": label, "score": score})
+        if "AutoEngine" not in (best or {}) or score > best["AutoEngine"]["score"]:
+            result["AutoEngine"] = {"engine": label, "score": score, "parsed": parsed}
+            best = result
+        conf = result_confidence(result) if step_engine is local else None
+        if conf is not None and conf < min_confidence:
+            client.log("Local OCR", f"confidence {conf:.0f} below {min_confidence:.0f} — using OCR.space", severity="info")
+            continue
+        if score >= min_score:
+            break
+        if i < len(steps) - 1:
+            client.log("Auto Engine", f"engine {label} scored {score:.2f} < {min_score:.2f} — escalating", severity="info")
+    if "AutoEngine" in best:
+        best["AutoEngine"]["attempts"] = attempts
+    return best
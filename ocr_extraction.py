@@ -2,26 +2,93 @@ import os
 import re
 import io
 import cv2
-import base64
+import inspect
 import requests
+import contextvars
+from contextlib import contextmanager
 import numpy as np
 from PIL import Image, ImageEnhance
 
-OCR_URL = "https://api.ocr.space/parse/image"
+from metrics import timed
+from regex_guard import REGEX, PARSE_MAX_CHARS, PARSE_TIME_BUDGET_MS, ParseBudgetExceeded, parse_budget
+
+OCR_URL = os.getenv("OCR_URL", "https://api.ocr.space/parse/image")
 OCR_API_KEY = os.getenv("OCR_API_KEY", "")
-_LOGGER = None
+
+# Shared across OcrClients so keep-alive connections to the OCR API are reused.
+_HTTP_SESSION = requests.Session()
+
+
+# Per-job OCR configuration. Held in a contextvar (or passed explicitly) rather
+# than module globals, so concurrent sessions, worker threads and asyncio tasks
+# each log into their own sink and use their own key and limits.
+class OcrClient:
+    def __init__(
+        self,
+        api_key=None,
+        logger=None,
+        session=None,
+        url: str = OCR_URL,
+        timeout: int = 90,
+        max_upload_bytes: int = 280 * 1024,
+        max_width: int = 1200,
+    ):
+        self.api_key = OCR_API_KEY if api_key is None else api_key
+        self.logger = logger
+        self.session = session or _HTTP_SESSION
+        self.url = url
+        self.timeout = timeout
+        self.max_upload_bytes = max_upload_bytes
+        self.max_width = max_width
+        self._log_kwargs = _accepted_kwargs(logger)
+
+    def log(self, context: str, message: str, **extra):
+        # severity=/duration_ms= are passed only to loggers that take them, so a
+        # plain (context, message) callback keeps working on every path.
+        if callable(self.logger):
+            if self._log_kwargs is not None:
+                extra = {k: v for k, v in extra.items() if k in self._log_kwargs}
+            self.logger(context, message, **extra)
+
+
+def _accepted_kwargs(fn):
+    # Keyword names fn accepts; None when it takes **kwargs (or can't be inspected).
+    if not callable(fn):
+        return frozenset()
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind is p.VAR_KEYWORD for p in params):
+        return None
+    return frozenset(p.name for p in params if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
 
 
-def set_ocr_context(api_key: str = "", logger=None):
-    global OCR_API_KEY, _LOGGER
-    if api_key is not None:
-        OCR_API_KEY = api_key
-    _LOGGER = logger
+_CURRENT_CLIENT = contextvars.ContextVar("ocr_client", default=None)
 
 
-def log_failure(context: str, message: str):
-    if callable(_LOGGER):
-        _LOGGER(context, message)
+def get_ocr_client() -> OcrClient:
+    client = _CURRENT_CLIENT.get()
+    return client if client is not None else OcrClient()
+
+
+def set_ocr_context(api_key: str = "", logger=None) -> OcrClient:
+    client = OcrClient(api_key=api_key, logger=logger)
+    _CURRENT_CLIENT.set(client)
+    return client
+
+
+@contextmanager
+def ocr_context(client: OcrClient):
+    token = _CURRENT_CLIENT.set(client)
+    try:
+        yield client
+    finally:
+        _CURRENT_CLIENT.reset(token)
+
+
+def log_failure(context: str, message: str, **extra):
+    get_ocr_client().log(context, message, **extra)
 
 def get_file_type(f) -> str:
     try:
@@ -38,32 +105,62 @@ def get_file_type(f) -> str:
 def detect_blur(file) -> float:
     try:
         file.seek(0)
-        image = Image.open(file).convert("L")
-        score = cv2.Laplacian(np.array(image), cv2.CV_64F).var()
+        with timed("decode"):
+            image = Image.open(file).convert("L")
+        with timed("blur"):
+            score = cv2.Laplacian(np.array(image), cv2.CV_64F).var()
         file.seek(0)
         return score
     except Exception as e:
         log_failure("Blur Detection", str(e))
         return 999
 
-def compress_image_bytes(raw_bytes: bytes) -> bytes:
+def compute_dhash(file):
+    # 64-bit difference hash: survives re-framing, rescaling and JPEG noise.
+    try:
+        file.seek(0)
+        with timed("phash"):
+            img = Image.open(file)
+            img.draft("L", (64, 64))
+            px = np.asarray(img.convert("L").resize((9, 8), Image.LANCZOS), dtype=np.int16)
+            value = 0
+            for bit in (px[:, 1:] > px[:, :-1]).flatten():
+                value = (value << 1) | int(bit)
+        file.seek(0)
+        return value
+    except Exception as e:
+        log_failure("Perceptual Hash", str(e))
+        return None
+
+def compress_image_bytes(raw_bytes: bytes, client=None) -> bytes:
+    client = client or get_ocr_client()
+    with timed("compress"):
+        return _compress_image_bytes(raw_bytes, client)
+
+
+def _compress_image_bytes(raw_bytes: bytes, client) -> bytes:
     try:
         img = Image.open(io.BytesIO(raw_bytes)).convert("L")
-        if img.width > 1200:
-            img = img.resize((1200, int(img.height * 1200 / img.width)), Image.LANCZOS)
+        if img.width > client.max_width:
+            img = img.resize((client.max_width, int(img.height * client.max_width / img.width)), Image.LANCZOS)
         img = ImageEnhance.Contrast(img).enhance(1.5)
         img = ImageEnhance.Sharpness(img).enhance(1.4)
         for quality in [75, 60, 45, 30, 20]:
             buf = io.BytesIO()
             img.save(buf, format="JPEG", quality=quality, optimize=True)
-            if len(buf.getvalue()) <= 280*1024 or quality == 20:
+            if len(buf.getvalue()) <= client.max_upload_bytes or quality == 20:
                 return buf.getvalue()
         return buf.getvalue()
     except Exception as e:
-        log_failure("Compress Image", str(e))
+        client.log("Compress Image", str(e))
         return raw_bytes
 
 def extract_face_photo(file):
+    with timed("face_extraction"):
+        return _extract_face_photo(file)
+
+
+def _extract_face_photo(file):
     try:
         file.seek(0)
         img_pil = Image.open(file).convert("RGB")
@@ -99,55 +196,60 @@ def extract_face_photo(file):
             face_crop = img_pil.crop((max(0,fx-px), max(0,fy-py), min(w,fx+fw+px), min(h,fy+fh+py)))
         else:
             face_crop = img_pil.crop((int(w*0.6), int(h*0.1), int(w*0.85), int(h*0.7)))
-            log_failure("Face Detection", "No face found — using ROI fallback")
+            log_failure("Face Detection", "No face found — using ROI fallback", severity="warning")
 
         face_crop = face_crop.resize((100, 120), Image.LANCZOS)
         buf = io.BytesIO()
         face_crop.save(buf, format="JPEG", quality=85)
-        buf.seek(0)
-        return base64.b64encode(buf.read()).decode("utf-8")
+        return buf.getvalue()
     except Exception as e:
         log_failure("Face Extraction", str(e))
         return None
 
 
 # ── OCR ───────────────────────────────────────────────────────────
-def perform_ocr(raw_bytes, language_code, engine_code, is_pdf=False, _retry=True):
-    if not OCR_API_KEY:
+def prepare_upload(raw_bytes, is_pdf=False, client=None):
+    # (bytes, filename, mimetype) as posted to OCR.space. Callers sending the same
+    # file to several engines prepare it once and pass it as upload=.
+    if is_pdf:
+        return raw_bytes, "document.pdf", "application/pdf"
+    return compress_image_bytes(raw_bytes, client), "image.jpg", "image/jpeg"
+
+
+def perform_ocr(raw_bytes, language_code, engine_code, is_pdf=False, _retry=True, client=None, upload=None):
+    client = client or get_ocr_client()
+    if not client.api_key:
         return {"error": "Missing OCR_API_KEY"}
     try:
-        if is_pdf:
-            safe_engine = 2 if engine_code == 3 else engine_code
-            send_bytes, filename, mimetype = raw_bytes, "document.pdf", "application/pdf"
-        else:
-            safe_engine = engine_code
-            send_bytes, filename, mimetype = compress_image_bytes(raw_bytes), "image.jpg", "image/jpeg"
-
-        response = requests.post(OCR_URL, data={
-            "apikey": OCR_API_KEY, "language": language_code,
-            "OCREngine": safe_engine, "isOverlayRequired": False,
-            "detectOrientation": True, "scale": True,
-        }, files={"file": (filename, send_bytes, mimetype)}, timeout=90)
-        response.raise_for_status()
-        result = response.json()
+        safe_engine = 2 if is_pdf and engine_code == 3 else engine_code
+        send_bytes, filename, mimetype = upload or prepare_upload(raw_bytes, is_pdf, client)
+
+        with timed("ocr_network"):
+            response = client.session.post(client.url, data={
+                "apikey": client.api_key, "language": language_code,
+                "OCREngine": safe_engine, "isOverlayRequired": False,
+                "detectOrientation": True, "scale": True,
+            }, files={"file": (filename, send_bytes, mimetype)}, timeout=client.timeout)
+            response.raise_for_status()
+            result = response.json()
 
         if result.get("IsErroredOnProcessing"):
             err_msgs = result.get("ErrorMessage", ["Unknown OCR error"])
             err_str = "; ".join(err_msgs) if isinstance(err_msgs, list) else str(err_msgs)
             if _retry and "timed out" in err_str.lower():
-                return perform_ocr(raw_bytes, language_code, 1, is_pdf, _retry=False)
-            log_failure("OCR Processing", err_str)
+                return perform_ocr(raw_bytes, language_code, 1, is_pdf, _retry=False, client=client, upload=upload)
+            client.log("OCR Processing", err_str)
             return {"error": err_str}
         return result
 
     except requests.Timeout:
         if _retry:
-            return perform_ocr(raw_bytes, language_code, 1, is_pdf, _retry=False)
+            return perform_ocr(raw_bytes, language_code, 1, is_pdf, _retry=False, client=client, upload=upload)
         msg = "OCR timed out. Try Engine 1 or a smaller file."
-        log_failure("OCR Timeout", msg)
+        client.log("OCR Timeout", msg)
         return {"error": msg}
     except Exception as e:
-        log_failure("OCR Error", str(e))
+        client.log("OCR Error", str(e))
         return {"error": str(e)}
 
 
@@ -156,11 +258,11 @@ def perform_ocr(raw_bytes, language_code, engine_code, is_pdf=False, _retry=True
 # ================================================================
 
 def clean_ocr_text(text):
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u200b-\u200f\ufeff]', '', text)
+    text = REGEX.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u200b-\u200f\ufeff]', '', text)
     text = text.replace('\r\n', '\n').replace('\r', '\n')
-    text = re.sub(r'[ \t]+', ' ', text)
-    text = re.sub(r'(?<=\d)[Oo](?=\d)', '0', text)
-    text = re.sub(r'(?<=\d)[Il](?=\d)', '1', text)
+    text = REGEX.sub(r'[ \t]+', ' ', text)
+    text = REGEX.sub(r'(?<=\d)[Oo](?=\d)', '0', text)
+    text = REGEX.sub(r'(?<=\d)[Il](?=\d)', '1', text)
     return text.strip()
 
 
@@ -187,10 +289,10 @@ def detect_doc_type(text):
         "assembly constituency", "elector photo identity card", "kkd", "kk"
     ]
 
-    pan_pat     = re.search(r'\b[A-Z]{5}[0-9]{4}[A-Z]\b', text)
-    aadhaar_pat = re.search(r'\b\d{4}[\s\-]\d{4}[\s\-]\d{4}\b|\b\d{12}\b|XXXX\s*XXXX\s*\d{4}', text, re.IGNORECASE)
-    dl_pat      = re.search(r'\b[A-Z]{2}[\s\-]?\d{2}[\s\-]?\d{4,11}\b', text)
-    epic_pat    = re.search(r'\b[A-Z]{3}\d{7}\b', text)
+    pan_pat     = REGEX.search(r'\b[A-Z]{5}[0-9]{4}[A-Z]\b', text)
+    aadhaar_pat = REGEX.search(r'\b\d{4}[\s\-]\d{4}[\s\-]\d{4}\b|\b\d{12}\b|XXXX\s*XXXX\s*\d{4}', text, re.IGNORECASE)
+    dl_pat      = REGEX.search(r'\b[A-Z]{2}[\s\-]?\d{2}[\s\-]?\d{4,11}\b', text)
+    epic_pat    = REGEX.search(r'\b[A-Z]{3}\d{7}\b', text)
 
     scores = {
         "aadhaar": sum(2 for s in aadhaar_signals if s in t) + (6 if aadhaar_pat else 0),
@@ -208,9 +310,9 @@ def extract_aadhaar_fields(text):
     lines = [l.strip() for l in text.splitlines() if l.strip()]
     full  = text
 
-    masked_m = re.search(r'\b(XXXX[\s]*XXXX[\s]*\d{4})\b', full, re.IGNORECASE)
+    masked_m = REGEX.search(r'\b(XXXX[\s]*XXXX[\s]*\d{4})\b', full, re.IGNORECASE)
     if masked_m:
-        fields["Aadhaar Number"] = re.sub(r'\s+', ' ', masked_m.group(1).upper()).strip()
+        fields["Aadhaar Number"] = REGEX.sub(r'\s+', ' ', masked_m.group(1).upper()).strip()
     else:
         for pat, fmt in [
             (r'\b(\d{4})\s(\d{4})\s(\d{4})\b',
@@ -220,43 +322,43 @@ def extract_aadhaar_fields(text):
             (r'(?<!\d)(\d{12})(?!\d)',
              lambda m: f"{m.group(1)[:4]} {m.group(1)[4:8]} {m.group(1)[8:]}"),
         ]:
-            m = re.search(pat, full)
+            m = REGEX.search(pat, full)
             if m:
                 fields["Aadhaar Number"] = fmt(m)
                 break
 
-    vid_m = re.search(
-        r'(?:vid|virtual\s*id|virtual\s*identification)\s*[:\-]?\s*(\d[\d\s]{14,18})',
+    vid_m = REGEX.search(
+        r'(?:vid|virtual\s*id|virtual\s*identification)\s*(?:[:\-]\s*)?(\d[\d\s]{14,18})',
         full, re.IGNORECASE)
     if not vid_m:
-        vid_m = re.search(r'VID\s*[:\-]\s*([\d\s]{16,20})', full, re.IGNORECASE)
+        vid_m = REGEX.search(r'VID\s*[:\-]\s*([\d\s]{16,20})', full, re.IGNORECASE)
     if vid_m:
-        raw_vid = re.sub(r'\s', '', vid_m.group(1))
+        raw_vid = REGEX.sub(r'\s', '', vid_m.group(1))
         if len(raw_vid) == 16:
             fields["VID"] = f"{raw_vid[:4]} {raw_vid[4:8]} {raw_vid[8:12]} {raw_vid[12:]}"
         else:
             fields["VID"] = raw_vid
 
-    enrol_m = re.search(
-        r'(?:enrolment|enrollment)\s*(?:no\.?|number)?\s*[:\-]?\s*([\d/\s]{14,25})',
+    enrol_m = REGEX.search(
+        r'(?:enrolment|enrollment)\s*(?:(?:no\.?|number)\s*)?(?:[:\-]\s*)?([\d/\s]{14,25})',
         full, re.IGNORECASE)
     if enrol_m:
         fields["Enrolment No"] = enrol_m.group(1).strip()
 
     for i, line in enumerate(lines):
         if line.strip().lower() == 'to' and i + 1 < len(lines):
-            candidate = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+            candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
             words = candidate.split()
             if 1 <= len(words) <= 5 and all(len(w) >= 2 for w in words):
                 fields["Name"] = candidate.title()
             break
 
     if "Name" not in fields:
-        m = re.search(
-            r'(?:^|\n)\s*(?:name|naam|नाम)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,40})',
+        m = REGEX.search(
+            r'^[^\S\n]*(?:name|naam|नाम)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,40})',
             full, re.IGNORECASE | re.MULTILINE)
         if m:
-            candidate = re.sub(r'\s+', ' ', m.group(1)).strip().rstrip('.')
+            candidate = REGEX.sub(r'\s+', ' ', m.group(1)).strip().rstrip('.')
             if len(candidate.split()) >= 1 and len(candidate) >= 4:
                 fields["Name"] = candidate.title()
 
@@ -267,7 +369,7 @@ def extract_aadhaar_fields(text):
             'और', 'भारत', 'unique', 'identification', 'authority', 'enrolment'
         }
         for line in lines[1:15]:
-            candidate = re.sub(r'[^A-Za-z\s]', '', line).strip()
+            candidate = REGEX.sub(r'[^A-Za-z\s]', '', line).strip()
             words = [w for w in candidate.split() if len(w) >= 2]
             if 2 <= len(words) <= 5 and not {w.lower() for w in words}.intersection(skip_words):
                 if all(w.isalpha() for w in words):
@@ -275,11 +377,11 @@ def extract_aadhaar_fields(text):
                     break
 
     for pat in [
-        r'(?:dob|date\s*of\s*birth|d\.o\.b|जन्म\s*तिथि)\s*[:\-/]?\s*(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
-        r'DOB\s*[:/]?\s*(\d{2}/\d{2}/\d{4})',
+        r'(?:dob|date\s*of\s*birth|d\.o\.b|जन्म\s*तिथि)\s*(?:[:\-/]\s*)?(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})',
+        r'DOB\s*(?:[:/]\s*)?(\d{2}/\d{2}/\d{4})',
         r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b',
     ]:
-        m = re.search(pat, full, re.IGNORECASE)
+        m = REGEX.search(pat, full, re.IGNORECASE)
         if m:
             fields["Date of Birth"] = m.group(1).strip()
             break
@@ -288,25 +390,25 @@ def extract_aadhaar_fields(text):
         ('female', 'Female'), ('male', 'Male'), ('transgender', 'Transgender'),
         ('महिला', 'Female'), ('पुरुष', 'Male'),
     ]:
-        if re.search(r'\b' + re.escape(token) + r'\b', full, re.IGNORECASE):
+        if REGEX.search(r'\b' + re.escape(token) + r'\b', full, re.IGNORECASE):
             fields["Gender"] = label
             break
 
-    addr_m = re.search(
-        r'(?:s[/\\]o|d[/\\]o|w[/\\]o|c[/\\]o|address|पता)\s*[:\-]?\s*(.+)',
+    addr_m = REGEX.search(
+        r'(?:s[/\\]o|d[/\\]o|w[/\\]o|c[/\\]o|address|पता)\s*(?:[:\-]\s*)?(.+)',
         full, re.IGNORECASE | re.DOTALL)
     if addr_m:
         addr_raw = addr_m.group(1)
-        addr_raw = re.split(
+        addr_raw = REGEX.split(
             r'\b(XXXX|VID\b|\d{4}[\s\-]\d{4}[\s\-]\d{4}|dob\b|male\b|female\b|'
             r'मेरा\s*आधार|government|aadhaar\s*no)',
             addr_raw, flags=re.IGNORECASE)[0]
-        addr_clean = re.sub(r'\s+', ' ', addr_raw).strip().rstrip(',').strip()
+        addr_clean = REGEX.sub(r'\s+', ' ', addr_raw).strip().rstrip(',').strip()
         if len(addr_clean) > 8:
             fields["Address"] = addr_clean[:300]
 
     used_digits = fields.get("Aadhaar Number", "").replace(" ", "")
-    for m in re.finditer(r'\b(\d{6})\b', full):
+    for m in REGEX.finditer(r'\b(\d{6})\b', full):
         pin = m.group(1)
         if pin in used_digits:
             continue
@@ -320,12 +422,12 @@ def extract_aadhaar_fields(text):
         r'sikkim|tamil\s*nadu|telangana|tripura|uttar\s*pradesh|uttarakhand|'
         r'west\s*bengal|delhi|jammu|ladakh|chandigarh|puducherry)\b'
     )
-    sm = re.search(state_pat, full, re.IGNORECASE)
+    sm = REGEX.search(state_pat, full, re.IGNORECASE)
     if sm:
         fields["State"] = sm.group(1).title()
 
     aadhaar_digits = fields.get("Aadhaar Number", "").replace(" ", "")
-    for m in re.finditer(r'(?<!\d)([6-9]\d{9})(?!\d)', full):
+    for m in REGEX.finditer(r'(?<!\d)([6-9]\d{9})(?!\d)', full):
         mob = m.group(1)
         if mob not in aadhaar_digits:
             fields["Mobile"] = mob
@@ -340,25 +442,25 @@ def extract_pan_fields(text):
     lines = [l.strip() for l in text.splitlines() if l.strip()]
     full  = text
 
-    m = re.search(r'\b([A-Z]{5}[0-9]{4}[A-Z])\b', full)
+    m = REGEX.search(r'\b([A-Z]{5}[0-9]{4}[A-Z])\b', full)
     if m:
         fields["PAN Number"] = m.group(1)
 
     name_found = False
     for i, line in enumerate(lines):
-        if re.search(r'(?:^|/)\s*name\s*$', line, re.IGNORECASE) or \
-           re.fullmatch(r'(?:naam|नाम\s*/\s*name)', line.strip(), re.IGNORECASE):
+        if REGEX.search(r'(?:^|/)\s*name\s*$', line, re.IGNORECASE) or \
+           REGEX.fullmatch(r'(?:naam|नाम\s*/\s*name)', line.strip(), re.IGNORECASE):
             if i + 1 < len(lines):
-                candidate = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+                candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
                 if len(candidate) >= 3:
                     fields["Name"] = candidate.title()
                     name_found = True
             break
 
     if not name_found:
-        m2 = re.search(r'(?:name|naam)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,50})', full, re.IGNORECASE)
+        m2 = REGEX.search(r'(?:name|naam)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,50})', full, re.IGNORECASE)
         if m2:
-            candidate = re.sub(r'\s+', ' ', m2.group(1)).strip().rstrip('.')
+            candidate = REGEX.sub(r'\s+', ' ', m2.group(1)).strip().rstrip('.')
             if len(candidate) >= 3:
                 fields["Name"] = candidate.title()
                 name_found = True
@@ -377,55 +479,55 @@ def extract_pan_fields(text):
 
     fname_found = False
     for i, line in enumerate(lines):
-        if re.search(r"father'?s?\s*name", line, re.IGNORECASE) or \
-           re.search(r'पिता\s*का\s*नाम', line):
-            same_line = re.sub(r"(?:father'?s?\s*name|पिता\s*का\s*नाम)\s*[:\-/]?\s*", '', line, flags=re.IGNORECASE).strip()
-            if len(same_line) >= 3 and re.search(r'[A-Za-z]', same_line):
-                candidate = re.sub(r'[^A-Za-z\s\.]', '', same_line).strip()
+        if REGEX.search(r"father'?s?\s*name", line, re.IGNORECASE) or \
+           REGEX.search(r'पिता\s*का\s*नाम', line):
+            same_line = REGEX.sub(r"(?:father'?s?\s*name|पिता\s*का\s*नाम)\s*(?:[:\-/]\s*)?", '', line, flags=re.IGNORECASE).strip()
+            if len(same_line) >= 3 and REGEX.search(r'[A-Za-z]', same_line):
+                candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', same_line).strip()
                 if len(candidate) >= 3:
                     fields["Father's Name"] = candidate.title()
                     fname_found = True
                     break
             if not fname_found and i + 1 < len(lines):
-                candidate = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+                candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
                 if len(candidate) >= 3:
                     fields["Father's Name"] = candidate.title()
                     fname_found = True
             break
 
     if not fname_found:
-        m3 = re.search(
-            r"(?:father'?s?\s*(?:name)?|पिता)\s*[:\-/]\s*([A-Za-z][A-Za-z\s\.]{2,50})",
+        m3 = REGEX.search(
+            r"(?:father'?s?(?:\s*name)?|पिता)\s*[:\-/]\s*([A-Za-z][A-Za-z\s\.]{2,50})",
             full, re.IGNORECASE)
         if m3:
-            candidate = re.sub(r'\s+', ' ', m3.group(1)).strip().rstrip('.')
+            candidate = REGEX.sub(r'\s+', ' ', m3.group(1)).strip().rstrip('.')
             if len(candidate) >= 3:
                 fields["Father's Name"] = candidate.title()
 
     for i, line in enumerate(lines):
-        if re.search(r'date\s*of\s*birth|dob|जन्म\s*की\s*तारीख', line, re.IGNORECASE):
-            m4 = re.search(r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})', line)
+        if REGEX.search(r'date\s*of\s*birth|dob|जन्म\s*की\s*तारीख', line, re.IGNORECASE):
+            m4 = REGEX.search(r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})', line)
             if m4:
                 fields["Date of Birth"] = m4.group(1).strip()
                 break
             if i + 1 < len(lines):
-                m4 = re.search(r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})', lines[i + 1])
+                m4 = REGEX.search(r'(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4})', lines[i + 1])
                 if m4:
                     fields["Date of Birth"] = m4.group(1).strip()
             break
 
     if "Date of Birth" not in fields:
-        m5 = re.search(r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b', full)
+        m5 = REGEX.search(r'\b(\d{2}[\/\-\.]\d{2}[\/\-\.]\d{4})\b', full)
         if m5:
             fields["Date of Birth"] = m5.group(1).strip()
 
-    type_m = re.search(
+    type_m = REGEX.search(
         r'\b(individual|company|firm|huf|trust|aop|boi|llp|partnership)\b',
         full, re.IGNORECASE)
     if type_m:
         fields["Account Type"] = type_m.group(1).title()
 
-    if re.search(r'income\s*tax|आयकर', full, re.IGNORECASE):
+    if REGEX.search(r'income\s*tax|आयकर', full, re.IGNORECASE):
         fields["Issued By"] = "Income Tax Department, Govt. of India"
 
     return fields
@@ -443,7 +545,7 @@ def extract_dl_fields(text):
         r'\b([A-Z]{2}\d{13})\b',
     ]
     for pat in dl_patterns:
-        dl_m = re.search(pat, full)
+        dl_m = REGEX.search(pat, full)
         if dl_m:
             if dl_m.lastindex == 4:
                 fields["DL Number"] = (
@@ -453,29 +555,29 @@ def extract_dl_fields(text):
                 fields["DL Number"] = dl_m.group(1)
             break
 
-    all_dates = re.findall(r'(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})', full)
+    all_dates = REGEX.findall(r'(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})', full)
 
-    issue_m = re.search(
-        r'(?:date\s*of\s*issue|d\.?\s*o\.?\s*i\.?|issued\s*on)\s*[:\-]?\s*(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
+    issue_m = REGEX.search(
+        r'(?:date\s*of\s*issue|d\.?\s*o\.?\s*i\.?|issued\s*on)\s*(?:[:\-]\s*)?(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
         full, re.IGNORECASE)
     if issue_m:
         fields["Date of Issue"] = issue_m.group(1)
 
-    valid_m = re.search(
-        r'(?:valid\s*till|validity|expiry|expires?\s*on|valid\s*upto)\s*[:\-]?\s*(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
+    valid_m = REGEX.search(
+        r'(?:valid\s*till|validity|expiry|expires?\s*on|valid\s*upto)\s*(?:[:\-]\s*)?(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
         full, re.IGNORECASE)
     if valid_m:
         fields["Valid Till"] = valid_m.group(1)
 
-    dob_m = re.search(
-        r'(?:date\s*of\s*birth|d\.?\s*o\.?\s*b\.?|dob)\s*[:\-]?\s*(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
+    dob_m = REGEX.search(
+        r'(?:date\s*of\s*birth|d\.?\s*o\.?\s*b\.?|dob)\s*(?:[:\-]\s*)?(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
         full, re.IGNORECASE)
     if dob_m:
         fields["Date of Birth"] = dob_m.group(1)
 
     if all_dates and len(all_dates) >= 2:
         if "Date of Issue" not in fields and "Valid Till" not in fields:
-            block_m = re.search(
+            block_m = REGEX.search(
                 r'(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})\s+(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{4})',
                 full)
             if block_m:
@@ -488,29 +590,29 @@ def extract_dl_fields(text):
                     fields["Date of Birth"] = d
                     break
 
-    bg_m = re.search(r'\b(A|B|AB|O)[\+\-]\b', full)
+    bg_m = REGEX.search(r'\b(A|B|AB|O)[\+\-]\b', full)
     if bg_m:
         fields["Blood Group"] = bg_m.group(0)
     else:
-        bg_m2 = re.search(r'blood\s*group\s*[:\-]?\s*([ABO]{1,2}[\+\-]?)', full, re.IGNORECASE)
+        bg_m2 = REGEX.search(r'blood\s*group\s*(?:[:\-]\s*)?([ABO]{1,2}[\+\-]?)', full, re.IGNORECASE)
         if bg_m2:
             fields["Blood Group"] = bg_m2.group(1).upper()
 
     name_found = False
     for i, line in enumerate(lines):
-        if re.search(r'(?:^|\s)(?:name|naam)\s*$', line, re.IGNORECASE):
+        if REGEX.search(r'(?:^|\s)(?:name|naam)\s*$', line, re.IGNORECASE):
             if i + 1 < len(lines):
-                candidate = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+                candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
                 if len(candidate) >= 3:
                     fields["Name"] = candidate.title()
                     name_found = True
             break
     if not name_found:
-        m = re.search(
+        m = REGEX.search(
             r'(?:name|naam)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,45})',
             full, re.IGNORECASE)
         if m:
-            candidate = re.sub(r'[^A-Za-z\s\.]', '', m.group(1)).strip()
+            candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', m.group(1)).strip()
             if len(candidate) >= 3:
                 fields["Name"] = candidate.title()
                 name_found = True
@@ -527,34 +629,34 @@ def extract_dl_fields(text):
                 fields["Name"] = line.title()
                 break
 
-    sdw_m = re.search(
-        r'(?:son|daughter|wife)\s*/?\s*(?:daughter\s*/\s*)?(?:son\s*/\s*)?(?:wife\s*of|of)\s*[:\-]?\s*([A-Za-z][A-Za-z\s\.]{2,50})',
+    sdw_m = REGEX.search(
+        r'(?:son|daughter|wife)\s*(?:/\s*)?(?:daughter\s*/\s*)?(?:son\s*/\s*)?(?:wife\s*of|of)\s*(?:[:\-]\s*)?([A-Za-z][A-Za-z\s\.]{2,50})',
         full, re.IGNORECASE)
     if sdw_m:
-        candidate = re.sub(r'[^A-Za-z\s\.]', '', sdw_m.group(1)).strip()
+        candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', sdw_m.group(1)).strip()
         if len(candidate) >= 3:
             fields["Son/Daughter/Wife of"] = candidate.title()
 
-    cov_m = re.search(
-        r'(?:cov|class\s*of\s*vehicle|vehicle\s*class|authorised\s*to\s*drive)\s*[:\-]?\s*([A-Z0-9,/\s\-]{2,40})',
+    cov_m = REGEX.search(
+        r'(?:cov|class\s*of\s*vehicle|vehicle\s*class|authorised\s*to\s*drive)\s*(?:[:\-]\s*)?([A-Z0-9,/\s\-]{2,40})',
         full, re.IGNORECASE)
     if cov_m:
         vc = cov_m.group(1).strip().rstrip(',').strip()[:60]
         if vc:
             fields["Vehicle Class"] = vc
 
-    rto_m = re.search(
-        r'(?:licensing\s*authority|issued\s*by|issuing\s*authority|licencing\s*authority|rto)\s*[:\-]?\s*([A-Za-z\s,\.]{4,60})',
+    rto_m = REGEX.search(
+        r'(?:licensing\s*authority|issued\s*by|issuing\s*authority|licencing\s*authority|rto)\s*(?:[:\-]\s*)?([A-Za-z\s,\.]{4,60})',
         full, re.IGNORECASE)
     if rto_m:
         fields["Issuing Authority"] = rto_m.group(1).strip()
 
-    addr_m = re.search(
-        r'(?:address|addr|पता)\s*[:\-]?\s*(.+?)(?:\n\n|\bDL\b|\bLicen|\bValid|\bCOV\b|$)',
+    addr_m = REGEX.search(
+        r'(?:address|addr|पता)\s*(?:[:\-]\s*)?(.+?)(?:\n\n|\bDL\b|\bLicen|\bValid|\bCOV\b|$)',
         full, re.IGNORECASE | re.DOTALL)
     if addr_m:
         addr_raw = addr_m.group(1)
-        addr_clean = re.sub(r'\s+', ' ', addr_raw).strip().rstrip(',')[:250]
+        addr_clean = REGEX.sub(r'\s+', ' ', addr_raw).strip().rstrip(',')[:250]
         if len(addr_clean) > 6:
             fields["Address"] = addr_clean
 
@@ -585,7 +687,7 @@ def extract_voter_fields(text):
     lines = [l.strip() for l in text.splitlines() if l.strip()]
     full  = text
 
-    epic_m = re.search(r'\b([A-Z]{2,3}\d{7})\b', full)
+    epic_m = REGEX.search(r'\b([A-Z]{2,3}\d{7})\b', full)
     if epic_m:
         fields["EPIC Number"] = epic_m.group(1)
 
@@ -594,9 +696,9 @@ def extract_voter_fields(text):
         r'(?:elector\s*name|name\s*of\s*elector|name|नाम)\s*[:\-]\s*([A-Za-z][A-Za-z\s\.]{2,50})',
         r'Name\s*:\s*([A-Za-z][A-Za-z\s\.]{2,50})',
     ]:
-        m = re.search(pat, full, re.IGNORECASE)
+        m = REGEX.search(pat, full, re.IGNORECASE)
         if m:
-            candidate = re.sub(r'[^A-Za-z\s\.]', '', m.group(1)).strip()
+            candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', m.group(1)).strip()
             if len(candidate) >= 4:
                 fields["Name"] = candidate.title()
                 name_found = True
@@ -604,53 +706,53 @@ def extract_voter_fields(text):
 
     if not name_found:
         for i, line in enumerate(lines):
-            if re.fullmatch(r'(?:name|naam)', line.strip(), re.IGNORECASE):
+            if REGEX.fullmatch(r'(?:name|naam)', line.strip(), re.IGNORECASE):
                 if i + 1 < len(lines):
-                    candidate = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+                    candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
                     if len(candidate) >= 4:
                         fields["Name"] = candidate.title()
                         name_found = True
                 break
 
     rel_patterns = [
-        r"(?:father'?s?\s*name|father\s*name|पिता\s*का\s*नाम)\s*[:\-]?\s*([A-Za-z][A-Za-z\s\.]{2,50})",
-        r"(?:husband'?s?\s*name|पति\s*का\s*नाम)\s*[:\-]?\s*([A-Za-z][A-Za-z\s\.]{2,50})",
+        r"(?:father'?s?\s*name|father\s*name|पिता\s*का\s*नाम)\s*(?:[:\-]\s*)?([A-Za-z][A-Za-z\s\.]{2,50})",
+        r"(?:husband'?s?\s*name|पति\s*का\s*नाम)\s*(?:[:\-]\s*)?([A-Za-z][A-Za-z\s\.]{2,50})",
         r"Father'?s?\s*Name\s*:\s*([A-Za-z][A-Za-z\s\.]{2,50})",
     ]
     for pat in rel_patterns:
-        rel_m = re.search(pat, full, re.IGNORECASE)
+        rel_m = REGEX.search(pat, full, re.IGNORECASE)
         if rel_m:
-            candidate = re.sub(r'[^A-Za-z\s\.]', '', rel_m.group(1)).strip()
+            candidate = REGEX.sub(r'[^A-Za-z\s\.]', '', rel_m.group(1)).strip()
             if len(candidate) >= 4:
                 fields["Father's Name"] = candidate.title()
                 break
 
     if "Father's Name" not in fields:
         for i, line in enumerate(lines):
-            if re.search(r"father'?s?\s*name|पिता", line, re.IGNORECASE):
-                same = re.sub(r"father'?s?\s*name\s*[:\-]?", '', line, flags=re.IGNORECASE).strip()
-                same = re.sub(r'[^A-Za-z\s\.]', '', same).strip()
+            if REGEX.search(r"father'?s?\s*name|पिता", line, re.IGNORECASE):
+                same = REGEX.sub(r"father'?s?\s*name\s*[:\-]?", '', line, flags=re.IGNORECASE).strip()
+                same = REGEX.sub(r'[^A-Za-z\s\.]', '', same).strip()
                 if len(same) >= 4:
                     fields["Father's Name"] = same.title()
                     break
                 if i + 1 < len(lines):
-                    nxt = re.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
+                    nxt = REGEX.sub(r'[^A-Za-z\s\.]', '', lines[i + 1]).strip()
                     if len(nxt) >= 4:
                         fields["Father's Name"] = nxt.title()
                 break
 
-    dob_m = re.search(
-        r'(?:date\s*of\s*birth|dob|जन्म\s*तिथि|जन्म\s*दिनांक)\s*[:\-/]?\s*(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{2,4})',
+    dob_m = REGEX.search(
+        r'(?:date\s*of\s*birth|dob|जन्म\s*तिथि|जन्म\s*दिनांक)\s*(?:[:\-/]\s*)?(\d{1,2}[\-/\.]\d{1,2}[\-/\.]\d{2,4})',
         full, re.IGNORECASE)
     if dob_m:
         fields["Date of Birth"] = dob_m.group(1)
     else:
-        date_m = re.search(r'\b(\d{2}[\-/\.]\d{2}[\-/\.]\d{4})\b', full)
+        date_m = REGEX.search(r'\b(\d{2}[\-/\.]\d{2}[\-/\.]\d{4})\b', full)
         if date_m:
             fields["Date of Birth"] = date_m.group(1)
 
     if "Date of Birth" not in fields:
-        age_m = re.search(r'(?:age|आयु)\s*[:\-/]?\s*(\d{2,3})', full, re.IGNORECASE)
+        age_m = REGEX.search(r'(?:age|आयु)\s*(?:[:\-/]\s*)?(\d{2,3})', full, re.IGNORECASE)
         if age_m:
             fields["Age"] = age_m.group(1)
 
@@ -658,26 +760,26 @@ def extract_voter_fields(text):
         ('female', 'Female'), ('male', 'Male'),
         ('पुरुष', 'Male'), ('महिला', 'Female'),
     ]:
-        if re.search(r'\b' + re.escape(token) + r'\b', full, re.IGNORECASE):
+        if REGEX.search(r'\b' + re.escape(token) + r'\b', full, re.IGNORECASE):
             fields["Gender"] = label
             break
 
-    const_m = re.search(
-        r'(?:assembly\s*constituency|parliamentary\s*constituency|विधान\s*सभा)\s*[:\-]?\s*([A-Za-z\s\(\)\d]{3,60})',
+    const_m = REGEX.search(
+        r'(?:assembly\s*constituency|parliamentary\s*constituency|विधान\s*सभा)\s*(?:[:\-]\s*)?([A-Za-z\s\(\)\d]{3,60})',
         full, re.IGNORECASE)
     if const_m:
         fields["Constituency"] = const_m.group(1).strip().rstrip('.')
 
-    part_m = re.search(r'part\s*(?:no\.?|number|संख्या)?\s*[:\-]?\s*(\d+)', full, re.IGNORECASE)
+    part_m = REGEX.search(r'part\s*(?:(?:no\.?|number|संख्या)\s*)?(?:[:\-]\s*)?(\d+)', full, re.IGNORECASE)
     if part_m:
         fields["Part No"] = part_m.group(1)
 
-    serial_m = re.search(r'(?:serial|sl\.?|क्रमांक)\s*(?:no\.?|number)?\s*[:\-]?\s*(\d+)', full, re.IGNORECASE)
+    serial_m = REGEX.search(r'(?:serial|sl\.?|क्रमांक)\s*(?:(?:no\.?|number)\s*)?(?:[:\-]\s*)?(\d+)', full, re.IGNORECASE)
     if serial_m:
         fields["Serial No"] = serial_m.group(1)
 
-    poll_m = re.search(
-        r'polling\s*station\s*[:\-]?\s*([A-Za-z0-9\s,\.]{4,80})',
+    poll_m = REGEX.search(
+        r'polling\s*station\s*(?:[:\-]\s*)?([A-Za-z0-9\s,\.]{4,80})',
         full, re.IGNORECASE)
     if poll_m:
         fields["Polling Station"] = poll_m.group(1).strip()
@@ -689,10 +791,98 @@ def extract_voter_fields(text):
         r'sikkim|tamil\s*nadu|telangana|tripura|uttar\s*pradesh|uttarakhand|'
         r'west\s*bengal|delhi|jammu|ladakh|chandigarh|puducherry)\b'
     )
-    sm = re.search(state_pat, full, re.IGNORECASE)
+    sm = REGEX.search(state_pat, full, re.IGNORECASE)
     if sm:
         fields["State"] = sm.group(1).title()
 
     return fields
 
 
+FIELD_EXTRACTORS = {
+    "aadhaar": extract_aadhaar_fields,
+    "pan": extract_pan_fields,
+    "dl": extract_dl_fields,
+    "voter": extract_voter_fields,
+}
+
+
+def extract_fields(text, budget_ms=PARSE_TIME_BUDGET_MS, client=None):
+    if PARSE_MAX_CHARS and len(text) > PARSE_MAX_CHARS:
+        text = text[:PARSE_MAX_CHARS]
+    doc_type = "unknown"
+    try:
+        with parse_budget(budget_ms):
+            doc_type = detect_doc_type(text)
+            extractor = FIELD_EXTRACTORS.get(doc_type)
+            return doc_type, (extractor(text) if extractor else {})
+    except ParseBudgetExceeded:
+        (client or get_ocr_client()).log(
+            "Parse", f"gave up after {budget_ms:.0f} ms on {len(text)} chars of OCR text", severity="warning"
+        )
+        return doc_type, {}
+
+
+# ================================================================
+# FIELD QUALITY SCORING
+# ================================================================
+EXPECTED_FIELD_COUNTS = {"aadhaar": 8, "pan": 5, "dl": 8, "voter": 7}
+
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6), (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8), (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2), (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4), (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2), (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0), (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5), (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+
+def aadhaar_number_valid(number):
+    compact = number.replace(" ", "").replace("-", "").upper()
+    if re.fullmatch(r'XXXXXXXX\d{4}', compact):
+        return True
+    if not re.fullmatch(r'[2-9]\d{11}', compact):
+        return False
+    check = 0
+    for i, digit in enumerate(reversed(compact)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][int(digit)]]
+    return check == 0
+
+
+def pan_number_valid(number):
+    # Fourth letter is the holder type: Person, Company, HUF, Firm, AOP, Trust, BOI, Local authority, AJP, Govt.
+    return bool(re.fullmatch(r'[A-Z]{3}[PCHFATBLJG][A-Z]\d{4}[A-Z]', number))
+
+
+def dl_number_valid(number):
+    return bool(re.fullmatch(r'[A-Z]{2}-?\d{2}-?\d{4}-?\d{7}|[A-Z]{2}\d{2}[A-Z]?\d{10,11}', number.replace(" ", "")))
+
+
+def epic_number_valid(number):
+    return bool(re.fullmatch(r'[A-Z]{3}\d{7}', number))
+
+
+ID_VALIDATORS = {
+    "aadhaar": ("Aadhaar Number", aadhaar_number_valid),
+    "pan": ("PAN Number", pan_number_valid),
+    "dl": ("DL Number", dl_number_valid),
+    "voter": ("EPIC Number", epic_number_valid),
+}
+
+
+def score_fields(doc_type, fields, text=None):
+    # 0..1: field completeness against the expected count, plus a valid ID number.
+    # A document of no known type has nothing to complete; given the OCR text it
+    # scores on whether any came back, so auto mode doesn't escalate for it.
+    expected = EXPECTED_FIELD_COUNTS.get(doc_type)
+    if not expected:
+        return 1.0 if text and text.strip() else 0.0
+    completeness = min(len(fields) / expected, 1.0)
+    key, validator = ID_VALIDATORS[doc_type]
+    id_valid = 1.0 if validator(fields.get(key, "")) else 0.0
+    return round(0.6 * completeness + 0.4 * id_valid, 3)
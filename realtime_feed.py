@@ -0,0 +1,140 @@
+import os
+import asyncio
+import threading
+import weakref
+from collections import deque
+
+try:
+    from realtime import AsyncRealtimeClient
+except ImportError:
+    AsyncRealtimeClient = None
+
+# "supabase" (Realtime change feed), "local" (in-process only) or "off".
+REALTIME_FEED = os.getenv("REALTIME_FEED", "supabase").strip().lower()
+REALTIME_DRAIN_SECONDS = float(os.getenv("REALTIME_DRAIN_SECONDS", "1.0") or 1.0)
+
+
+# Per-session mailbox. Feed threads append inserted rows; the session's sidebar
+# drains it on its next tick. The feed holds inboxes weakly, so a session that
+# goes away simply stops receiving.
+class Inbox:
+    def __init__(self, user_id, access_token=None, maxlen: int = 500):
+        self.user_id = user_id
+        self.access_token = access_token
+        self._rows = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def put(self, row: dict):
+        with self._lock:
+            self._rows.append(row)
+
+    def drain(self):
+        with self._lock:
+            rows = list(self._rows)
+            self._rows.clear()
+        return rows
+
+    def __len__(self):
+        return len(self._rows)
+
+
+# In-process fan-out of inserted rows to every open session of the row's user.
+# On its own it sees saves made by this server process (and whatever a test
+# publishes); SupabaseChangeFeed adds rows pushed by Supabase Realtime.
+class LocalChangeFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inboxes = {}
+
+    def subscribe(self, user_id, access_token=None) -> Inbox:
+        inbox = Inbox(user_id, access_token)
+        with self._lock:
+            self._inboxes.setdefault(user_id, weakref.WeakSet()).add(inbox)
+        return inbox
+
+    def unsubscribe(self, inbox: Inbox):
+        with self._lock:
+            inboxes = self._inboxes.get(inbox.user_id)
+            if inboxes is not None:
+                inboxes.discard(inbox)
+
+    def publish(self, row: dict) -> int:
+        with self._lock:
+            inboxes = list(self._inboxes.get(row.get("user_id"), ()))
+        for inbox in inboxes:
+            inbox.put(row)
+        return len(inboxes)
+
+    def _live_users(self):
+        with self._lock:
+            return {uid for uid, inboxes in self._inboxes.items() if len(inboxes)}
+
+
+# Subscribes to INSERTs on extractions through Supabase Realtime. One socket per
+# user, authorised with that user's JWT so row-level security applies to the
+# feed; the sockets live on a private event loop thread.
+class SupabaseChangeFeed(LocalChangeFeed):
+    def __init__(self, url: str, key: str):
+        super().__init__()
+        self._url = url.rstrip("/") + "/realtime/v1"
+        self._key = key
+        self._clients = {}
+        self.errors = deque(maxlen=50)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="realtime-feed", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, user_id, access_token=None) -> Inbox:
+        inbox = super().subscribe(user_id, access_token)
+        if access_token:
+            asyncio.run_coroutine_threadsafe(self._watch(user_id, access_token), self._loop)
+        return inbox
+
+    def _on_insert(self, payload):
+        row = payload.get("data", {}).get("record")
+        if row:
+            self.publish(row)
+
+    async def _watch(self, user_id, access_token):
+        # Runs on the feed loop only, so _clients needs no lock.
+        live = self._live_users()
+        for uid in [uid for uid in self._clients if uid not in live]:
+            client, _ = self._clients.pop(uid)
+            await client.close()
+
+        if user_id in self._clients:
+            client, token = self._clients[user_id]
+            if token != access_token:
+                await client.set_auth(access_token)
+                self._clients[user_id] = (client, access_token)
+            return
+
+        client = AsyncRealtimeClient(self._url, self._key, auto_reconnect=True)
+        await client.set_auth(access_token)
+        channel = client.channel(f"extractions:{user_id}")
+        channel.on_postgres_changes(
+            "INSERT", self._on_insert, table="extractions", schema="public", filter=f"user_id=eq.{user_id}"
+        )
+        self._clients[user_id] = (client, access_token)
+        try:
+            await channel.subscribe()
+        except Exception as e:
+            self._clients.pop(user_id, None)
+            self.errors.append(f"{user_id}: {e}")
+
+
+_FEED = None
+_FEED_LOCK = threading.Lock()
+
+
+def get_change_feed(url: str = "", key: str = ""):
+    global _FEED
+    if REALTIME_FEED == "off":
+        return None
+    with _FEED_LOCK:
+        if _FEED is None:
+            if REALTIME_FEED == "supabase" and url and key and AsyncRealtimeClient is not None:
+                _FEED = SupabaseChangeFeed(url, key)
+            else:
+                _FEED = LocalChangeFeed()
+        return _FEED
@@ -0,0 +1,75 @@
+import sys
+
+from database import LIST_COLUMNS, EXTENDED_FIELD_COLUMNS
+
+# Display label -> column, per doc type, in the order the sidebar and exports show them.
+RECORD_FIELDS = {
+    "aadhaar": (("Name", "holder_name"), ("Aadhaar No", "aadhaar_number"), ("DOB", "dob"), ("Gender", "gender"), ("Address", "address"), ("Pincode", "pincode"), ("State", "state"), ("VID", "vid"), ("Enrolment", "enrolment_no"), ("Mobile", "mobile")),
+    "pan": (("Name", "holder_name"), ("PAN No", "pan_number"), ("Father", "father_name"), ("DOB", "dob"), ("Acct Type", "account_type"), ("Issued By", "issued_by")),
+    "dl": (("Name", "holder_name"), ("DL No", "dl_number"), ("Issued", "date_of_issue"), ("Valid Till", "valid_till"), ("DOB", "dob"), ("Blood", "blood_group"), ("Vehicle", "vehicle_class"), ("S/D/W of", "son_daughter_wife_of"), ("Authority", "issuing_authority"), ("State", "state")),
+    "voter": (("Name", "holder_name"), ("EPIC No", "epic_number"), ("Father/Husb", "father_husband_name"), ("DOB", "dob"), ("Gender", "gender"), ("Constitency", "constituency"), ("Part No", "part_no"), ("Serial No", "serial_no"), ("State", "state")),
+}
+OTHER_FIELDS = (("File", "file_name"),)
+
+RECORD_COLUMNS = (*LIST_COLUMNS, *EXTENDED_FIELD_COLUMNS, "photo_url", "user_id")
+_COLUMN_SET = frozenset(RECORD_COLUMNS) | {"archived"}
+
+
+# One loaded extractions row. Slots instead of a ~35-key dict per record; empty
+# columns are stored as None and columns outside RECORD_COLUMNS (raw_text, the
+# archive's extras) are dropped. The display projection and search text are
+# computed on first use and kept on the record.
+class Extraction:
+    __slots__ = RECORD_COLUMNS + ("archived", "_display", "_search")
+
+    @classmethod
+    def from_row(cls, row: dict, archived=None):
+        rec = cls.__new__(cls)
+        for col in RECORD_COLUMNS:
+            setattr(rec, col, row.get(col) or None)
+        rec.doc_type = sys.intern(rec.doc_type or "other")
+        rec.created_at = rec.created_at or ""
+        rec.archived = bool(row.get("archived") if archived is None else archived)
+        rec._display = None
+        rec._search = None
+        return rec
+
+    @classmethod
+    def from_rows(cls, rows, archived=None):
+        return [cls.from_row(row, archived) for row in rows]
+
+    def get(self, col, default=None):
+        # dict-style access for code that treats records as rows.
+        if col not in _COLUMN_SET:
+            return default
+        value = getattr(self, col)
+        return default if value is None else value
+
+    @property
+    def display(self):
+        if self._display is None:
+            keys = RECORD_FIELDS.get(self.doc_type, OTHER_FIELDS)
+            self._display = {label: getattr(self, col) for label, col in keys if getattr(self, col)}
+        return self._display
+
+    @property
+    def search_text(self):
+        if self._search is None:
+            self._search = " ".join(str(v) for v in self.display.values()).lower()
+        return self._search
+
+    def matches(self, query: str) -> bool:
+        return not query or query.lower() in self.search_text
+
+    @property
+    def doc_number(self):
+        return self.aadhaar_number or self.pan_number or self.dl_number or self.epic_number or ""
+
+    def to_dict(self):
+        row = {col: getattr(self, col) for col in RECORD_COLUMNS if getattr(self, col) is not None}
+        if self.archived:
+            row["archived"] = True
+        return row
+
+    def __repr__(self):
+        return f"Extraction(id={self.id!r}, doc_type={self.doc_type!r}, holder_name={self.holder_name!r})"
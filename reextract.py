@@ -0,0 +1,227 @@
+"""Re-run the field parsers over stored extractions without re-running OCR.
+
+Streams rows of the ``extractions`` table in keyset-paginated pages, re-parses
+the full OCR text (the compressed side-table copy, else the ``raw_text``
+preview) with detect_doc_type/extract_*_fields in a process pool, diffs the
+result against the stored columns and writes back only the changed columns.
+Writes go through the ``reextract_apply`` RPC in batches (print its SQL with
+--print-sql and run it once in the Supabase SQL editor). Without it the job
+falls back to one UPDATE per changed row.
+
+Needs SUPABASE_URL and SUPABASE_SERVICE_KEY (row-level security would hide
+other users' rows from the anon key).
+
+    python reextract.py --dry-run
+    python reextract.py --user-id <uuid> --page-size 500 --workers 8
+"""
+
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from supabase import create_client
+
+from database import (
+    SUPABASE_URL,
+    FIELD_COLUMNS,
+    EXTENDED_FIELD_COLUMNS,
+    RAW_TEXT_TABLE,
+    RAW_TEXT_PREVIEW_CHARS,
+    _get_secret,
+    field_columns,
+    iter_extraction_pages,
+    stored_doc_type,
+    unpack_raw_text,
+)
+from ocr_extraction import extract_fields
+
+APPLY_RPC = "reextract_apply"
+
+
+def apply_sql(include_extended=True) -> str:
+    columns = ["doc_type", *FIELD_COLUMNS, *(EXTENDED_FIELD_COLUMNS if include_extended else ())]
+    sets = ",\n    ".join(
+        f"{c} = CASE WHEN u.s ? '{c}' THEN u.s->>'{c}' ELSE x.{c} END" for c in columns
+    )
+    return f"""CREATE OR REPLACE FUNCTION {APPLY_RPC}(updates jsonb) RETURNS integer
+LANGUAGE sql AS $$
+  WITH u AS (
+    SELECT e->>'id' AS id, e->'set' AS s FROM jsonb_array_elements(updates) e
+  ), done AS (
+    UPDATE extractions x SET
+    {sets}
+    FROM u WHERE x.id::text = u.id
+    RETURNING 1
+  )
+  SELECT count(*)::integer FROM done;
+$$;
+"""
+
+
+def _reparse(item):
+    # Runs in a pool process; must stay a picklable module-level function.
+    row_id, raw_text, payload = item
+    if payload:
+        raw_text = unpack_raw_text(payload)[0]
+    doc_type, fields = extract_fields(raw_text or "")
+    return row_id, doc_type, fields
+
+
+def _norm(value):
+    return "" if value is None else str(value)
+
+
+def diff_row(row, doc_type, fields, include_extended=True, allow_clear=False):
+    # Columns whose freshly parsed value differs from the stored one. Values the
+    # new parse no longer finds are kept unless allow_clear: older rows only have
+    # the truncated preview, so a missing field may just be past the cut.
+    changes = {}
+    if doc_type != "unknown" and stored_doc_type(doc_type) != row.get("doc_type"):
+        changes["doc_type"] = stored_doc_type(doc_type)
+    for col, value in field_columns(fields, include_extended).items():
+        if _norm(value) == _norm(row.get(col)):
+            continue
+        if value or allow_clear:
+            changes[col] = value or None
+    return changes
+
+
+def fetch_payloads(supabase, ids):
+    if not ids:
+        return {}
+    try:
+        res = supabase.table(RAW_TEXT_TABLE).select("extraction_id,payload").in_("extraction_id", ids).execute()
+    except Exception as e:
+        print(f"{RAW_TEXT_TABLE} unavailable, using raw_text previews: {e}", file=sys.stderr)
+        return {}
+    return {r["extraction_id"]: r["payload"] for r in res.data or []}
+
+
+class UpdateWriter:
+    def __init__(self, supabase, batch_size=200, threads=8, dry_run=False):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.threads = threads
+        self.dry_run = dry_run
+        self.use_rpc = True
+        self.pending = []
+        self.written = 0
+        self.errors = []
+
+    def add(self, row_id, changes):
+        self.pending.append({"id": row_id, "set": changes})
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch or self.dry_run:
+            return
+        if self.use_rpc:
+            try:
+                res = self.supabase.rpc(APPLY_RPC, {"updates": batch}).execute()
+                self.written += int(res.data or 0)
+                return
+            except Exception as e:
+                err = str(e)
+                if "PGRST202" not in err and APPLY_RPC not in err:
+                    self.errors.append(err)
+                    return
+                print(f"{APPLY_RPC} RPC not found — falling back to per-row updates (see --print-sql)", file=sys.stderr)
+                self.use_rpc = False
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            for ok, err in pool.map(self._update_one, batch):
+                if ok:
+                    self.written += 1
+                else:
+                    self.errors.append(err)
+
+    def _update_one(self, update):
+        try:
+            self.supabase.table("extractions").update(update["set"]).eq("id", update["id"]).execute()
+            return True, None
+        except Exception as e:
+            return False, f"{update['id']}: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", default="", help="only re-extract this user's rows")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=200, help="changed rows per write")
+    parser.add_argument("--workers", type=int, default=0, help="parser processes (default: CPU count)")
+    parser.add_argument("--allow-clear", action="store_true", help="also blank columns the new parse no longer finds")
+    parser.add_argument("--core-only", action="store_true", help="skip the extended columns (older schemas)")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing")
+    parser.add_argument("--print-sql", action="store_true", help=f"print the {APPLY_RPC} function and exit")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    include_extended = not args.core_only
+    if args.print_sql:
+        print(apply_sql(include_extended))
+        return 0
+
+    key = _get_secret("SUPABASE_SERVICE_KEY")
+    if not SUPABASE_URL or not key:
+        print("SUPABASE_URL and SUPABASE_SERVICE_KEY are required", file=sys.stderr)
+        return 2
+    supabase = create_client(SUPABASE_URL, key)
+
+    columns = ["id", "doc_type", "raw_text", *FIELD_COLUMNS, *(EXTENDED_FIELD_COLUMNS if include_extended else ())]
+    writer = UpdateWriter(supabase, batch_size=args.batch_size, dry_run=args.dry_run)
+    scanned, changed_rows, column_changes = 0, 0, Counter()
+    started = time.perf_counter()
+
+    # spawn, not fork: the Supabase client already has live connection threads.
+    with ProcessPoolExecutor(
+        max_workers=args.workers or None, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        for rows in iter_extraction_pages(supabase, columns, args.page_size, args.user_id or None):
+            by_id = {row["id"]: row for row in rows}
+            # Only rows whose preview hit the cap can have more text in the side table.
+            payloads = fetch_payloads(
+                supabase, [r["id"] for r in rows if len(r.get("raw_text") or "") >= RAW_TEXT_PREVIEW_CHARS]
+            )
+            items = [(row["id"], row.get("raw_text"), payloads.get(row["id"])) for row in rows if row.get("raw_text")]
+            for row_id, doc_type, fields in pool.map(_reparse, items, chunksize=max(1, len(items) // 32)):
+                changes = diff_row(by_id[row_id], doc_type, fields, include_extended, args.allow_clear)
+                if changes:
+                    changed_rows += 1
+                    column_changes.update(changes.keys())
+                    writer.add(row_id, changes)
+            scanned += len(rows)
+            print(f"scanned {scanned} rows, {changed_rows} changed", file=sys.stderr)
+    writer.flush()
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "scanned": scanned,
+        "changed_rows": changed_rows,
+        "written": writer.written,
+        "dry_run": args.dry_run,
+        "column_changes": dict(column_changes.most_common()),
+        "errors": writer.errors[:20],
+        "error_count": len(writer.errors),
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(scanned / elapsed, 1) if elapsed else 0.0,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"scanned={scanned} changed={changed_rows} written={writer.written}"
+              f"{' (dry run)' if args.dry_run else ''} errors={len(writer.errors)}"
+              f" elapsed={report['elapsed_s']}s ({report['rows_per_s']} rows/s)")
+        for col, n in column_changes.most_common():
+            print(f"  {col:<24}{n:>8}")
+        for err in writer.errors[:20]:
+            print(f"  error: {err}")
+    return 1 if writer.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import os
+import re
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# "re" (stdlib, backtracking) or "re2" (linear time; needs the google-re2 package).
+PARSE_REGEX_BACKEND = os.getenv("PARSE_REGEX_BACKEND", "re").strip().lower()
+# Wall-clock budget for one extract_fields() call; 0 disables it.
+PARSE_TIME_BUDGET_MS = float(os.getenv("PARSE_TIME_BUDGET_MS", "2000") or 0)
+# OCR text beyond this many characters is not parsed; 0 disables the cap.
+PARSE_MAX_CHARS = int(os.getenv("PARSE_MAX_CHARS", "20000") or 0)
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+
+
+class ParseBudgetExceeded(Exception):
+    pass
+
+
+_DEADLINE = contextvars.ContextVar("parse_deadline", default=None)
+
+
+@contextmanager
+def parse_budget(budget_ms: float = PARSE_TIME_BUDGET_MS):
+    deadline = time.perf_counter() + budget_ms / 1000 if budget_ms and budget_ms > 0 else None
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def check_budget():
+    deadline = _DEADLINE.get()
+    if deadline is not None and time.perf_counter() > deadline:
+        raise ParseBudgetExceeded("parse time budget exceeded")
+
+
+# Drop-in for the module-level re functions used by the parsers. Every call
+# checks the current parse budget first, so a document stops at the next
+# pattern once its deadline has passed. With the re2 engine, patterns RE2
+# cannot express (lookarounds, backreferences) fall back to stdlib re and are
+# listed in `fallbacks`. Note RE2's \b is ASCII-only, so run bench_parsers.py
+# with PARSE_REGEX_BACKEND=re2 before switching a deployment over.
+class RegexBackend:
+    def __init__(self, engine: str = PARSE_REGEX_BACKEND):
+        self.engine = "re2" if engine == "re2" and re2 is not None else "re"
+        self.fallbacks = set()
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def compile(self, pattern, flags=0):
+        key = (pattern, flags)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compile(pattern, flags)
+            with self._lock:
+                self._compiled[key] = compiled
+        return compiled
+
+    def _compile(self, pattern, flags):
+        if self.engine == "re2":
+            inline = "".join(c for flag, c in _INLINE_FLAGS if flags & flag)
+            options = re2.Options()
+            options.log_errors = False
+            try:
+                return re2.compile(f"(?{inline}){pattern}" if inline else pattern, options)
+            except re2.error:
+                with self._lock:
+                    self.fallbacks.add(pattern)
+        return re.compile(pattern, flags)
+
+    def patterns(self):
+        with self._lock:
+            return list(self._compiled)
+
+    def search(self, pattern, string, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).search(string)
+
+    def match(self, pattern, string, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).match(string)
+
+    def fullmatch(self, pattern, string, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).fullmatch(string)
+
+    def findall(self, pattern, string, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).findall(string)
+
+    def finditer(self, pattern, string, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).finditer(string)
+
+    def sub(self, pattern, repl, string, count=0, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).sub(repl, string, count)
+
+    def split(self, pattern, string, maxsplit=0, flags=0):
+        check_budget()
+        return self.compile(pattern, flags).split(string, maxsplit)
+
+
+REGEX = RegexBackend()
@@ -1,160 +1,460 @@
 import json
 import streamlit as st
 
+from realtime_feed import REALTIME_DRAIN_SECONDS
+from export import EXPORT_FORMATS, EXPORT_INAPP_MAX_ROWS, EXPORT_MIME
+from records import Extraction
+from ui_helpers import HTML_CACHE, content_key, render_sidebar_kv
 
-def render_sidebar(*, supabase, auth_logout_fn, load_extractions_fn):
-    with st.sidebar:
+EVENT_PAGE_SIZE = 10
+RECORD_PAGE_SIZE = 15
+# Records per server query; "›" past the last loaded page fetches the next batch.
+RECORD_FETCH_SIZE = 105
+# Opened raw texts kept per session; closing a toggle drops its entry.
+RAW_TEXT_CACHE_SIZE = 4
+DOC_LABELS = {"aadhaar": "Aadhaar", "pan": "PAN", "dl": "DL", "voter": "Voter", "other": "Other"}
+
+
+@st.fragment
+def render_sidebar(
+    *,
+    supabase,
+    auth_logout_fn,
+    load_extractions_fn,
+    load_counts_fn=None,
+    load_raw_text_fn=None,
+    search_archive_fn=None,
+    change_feed=None,
+    export_fn=None,
+    metrics=None,
+    artifact_store=None,
+):
+    st.markdown(
+        """
+    <div style="display:flex;align-items:center;justify-content:space-between;
+        padding:14px 0 8px;border-bottom:1px solid #e8eaf0;margin-bottom:4px;">
+        <div style="display:flex;align-items:center;gap:9px;">
+            <div style="width:28px;height:28px;
+                background:linear-gradient(135deg,#4f46e5,#818cf8);
+                border-radius:7px;display:flex;align-items:center;
+                justify-content:center;font-size:0.85rem;">📝</div>
+            <div>
+                <div style="font-weight:800;font-size:0.88rem;
+                    color:#1a1a2e;line-height:1.1;">OCR Stream</div>
+                <div style="font-size:0.58rem;color:#9ca3af;
+                    font-family:'DM Mono',monospace;letter-spacing:0.5px;">
+                    Document Extractor</div>
+            </div>
+        </div>
+    </div>""",
+        unsafe_allow_html=True,
+    )
+
+    st.markdown('<div class="logout-btn">', unsafe_allow_html=True)
+    if st.button("⏻  Logout", key="sb_logout", use_container_width=True):
+        auth_logout_fn(supabase)
+        st.session_state.sb_records = None
+        st.session_state.sb_counts = None
+        st.session_state.sb_search_hits = None
+        inbox = st.session_state.pop("sb_inbox", None)
+        if inbox is not None and change_feed is not None:
+            change_feed.unsubscribe(inbox)
+        st.rerun(scope="app")
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    st.markdown('<div class="sb-header">🗂 Saved Extractions</div>', unsafe_allow_html=True)
+    sb_r1, sb_r2 = st.columns([4, 1])
+    with sb_r2:
+        if st.button("↺", key="sb_refresh", help="Refresh"):
+            st.session_state.sb_records = None
+            st.session_state.sb_counts = None
+            st.session_state.sb_search_hits = None
+            st.rerun(scope="fragment")
+
+    # New records arrive through the change feed instead of re-querying; the
+    # records panel below then polls its inbox on a timer.
+    user = st.session_state.get("user")
+    inbox = None
+    if change_feed is not None and user is not None:
+        inbox = st.session_state.get("sb_inbox")
+        token = st.session_state.get("access_token")
+        if inbox is None or inbox.user_id != user.id or inbox.access_token != token:
+            if inbox is not None:
+                change_feed.unsubscribe(inbox)
+            inbox = st.session_state.sb_inbox = change_feed.subscribe(user.id, token)
+
+    records_panel = _saved_extractions_static if inbox is None else _saved_extractions_live
+    records_panel(
+        supabase,
+        user,
+        load_extractions_fn,
+        load_counts_fn=load_counts_fn,
+        load_raw_text_fn=load_raw_text_fn,
+        search_archive_fn=search_archive_fn,
+        export_fn=export_fn,
+        inbox=inbox,
+    )
+
+    render_event_log(st.session_state.event_log)
+
+    if metrics is not None:
+        render_diagnostics(metrics, artifact_store)
+
+
+def _saved_extractions(
+    supabase,
+    user,
+    load_extractions_fn,
+    load_counts_fn=None,
+    load_raw_text_fn=None,
+    search_archive_fn=None,
+    export_fn=None,
+    inbox=None,
+):
+    # Owns sb_records. With a change feed it runs every REALTIME_DRAIN_SECONDS,
+    # merging saves from the inbox so that only this panel reruns.
+    if inbox is not None:
+        _apply_inserts(inbox.drain())
+
+    # Header counts come from the server-side counts table (one small query);
+    # False marks it unavailable, and the loaded records are counted instead.
+    if st.session_state.get("sb_counts") is None:
+        counts = load_counts_fn(supabase) if load_counts_fn is not None else None
+        st.session_state.sb_counts = False if counts is None else counts
+    type_counts = st.session_state.sb_counts
+    # Drawn before, and regardless of, the records fetch below.
+    if type_counts:
+        _render_badges(getattr(user, "id", None), type_counts)
+
+    # Fetched a batch at a time and kept in session state, so searching or
+    # expanding records (fragment reruns) doesn't hit the database. Cleared on
+    # refresh; saves are merged in from the inbox above.
+    if st.session_state.get("sb_records") is None:
+        st.session_state.sb_records = load_extractions_fn(supabase, RECORD_FETCH_SIZE)
+        st.session_state.sb_records_more = len(st.session_state.sb_records) >= RECORD_FETCH_SIZE
+    records = st.session_state.sb_records
+    more = st.session_state.get("sb_records_more", False)
+
+    if not records:
         st.markdown(
             """
-        <div style="display:flex;align-items:center;justify-content:space-between;
-            padding:14px 0 8px;border-bottom:1px solid #e8eaf0;margin-bottom:4px;">
-            <div style="display:flex;align-items:center;gap:9px;">
-                <div style="width:28px;height:28px;
-                    background:linear-gradient(135deg,#4f46e5,#818cf8);
-                    border-radius:7px;display:flex;align-items:center;
-                    justify-content:center;font-size:0.85rem;">📝</div>
-                <div>
-                    <div style="font-weight:800;font-size:0.88rem;
-                        color:#1a1a2e;line-height:1.1;">OCR Stream</div>
-                    <div style="font-size:0.58rem;color:#9ca3af;
-                        font-family:'DM Mono',monospace;letter-spacing:0.5px;">
-                        Document Extractor</div>
-                </div>
+        <div style="text-align:center;padding:24px 8px 16px;color:#9ca3af;">
+            <div style="font-size:1.6rem;opacity:0.3;margin-bottom:6px;">🗃️</div>
+            <div style="font-size:0.76rem;font-weight:600;">No extractions yet</div>
+            <div style="font-size:0.63rem;font-family:'DM Mono',monospace;margin-top:3px;">
+                Extract a document to see it here
             </div>
         </div>""",
             unsafe_allow_html=True,
         )
+    else:
+        if type_counts is False:
+            type_counts = {}
+            for r in records:
+                type_counts[r.doc_type] = type_counts.get(r.doc_type, 0) + 1
+            _render_badges(getattr(user, "id", None), type_counts)
 
-        st.markdown('<div class="logout-btn">', unsafe_allow_html=True)
-        if st.button("⏻  Logout", key="sb_logout", use_container_width=True):
-            auth_logout_fn(supabase)
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
-
-        st.markdown('<div class="sb-header">🗂 Saved Extractions</div>', unsafe_allow_html=True)
-        sb_r1, sb_r2 = st.columns([4, 1])
-        with sb_r2:
-            if st.button("↺", key="sb_refresh", help="Refresh"):
-                st.rerun()
+        search_q = st.text_input("search", placeholder="🔍  Search by name, number…", key="sb_search", label_visibility="collapsed")
+        query = search_q.strip()
+        if query:
+            # Searched server-side and paged like the full list: the loaded
+            # batch is only the newest slice of the history.
+            hits = st.session_state.get("sb_search_hits")
+            if not hits or hits[0] != query:
+                batch = load_extractions_fn(supabase, RECORD_FETCH_SIZE, query=query)
+                hits = st.session_state.sb_search_hits = (query, batch, len(batch) >= RECORD_FETCH_SIZE)
+            _, matches, more = hits
+        else:
+            matches = records
+        # Only the current page is built as widgets.
+        matches = matches + _archived_matches(search_archive_fn, search_q, matches)
 
-        records = load_extractions_fn(supabase)
+        if st.session_state.get("sb_page_query") != search_q:
+            st.session_state.sb_page_query = search_q
+            st.session_state.sb_page = 0
+        pages = max(1, -(-len(matches) // RECORD_PAGE_SIZE))
+        page = min(st.session_state.get("sb_page", 0), pages - 1)
 
-        if not records:
-            st.markdown(
-                """
-            <div style="text-align:center;padding:24px 8px 16px;color:#9ca3af;">
-                <div style="font-size:1.6rem;opacity:0.3;margin-bottom:6px;">🗃️</div>
-                <div style="font-size:0.76rem;font-weight:600;">No extractions yet</div>
-                <div style="font-size:0.63rem;font-family:'DM Mono',monospace;margin-top:3px;">
-                    Extract a document to see it here
-                </div>
-            </div>""",
-                unsafe_allow_html=True,
-            )
-        else:
-            type_counts = {}
-            for r in records:
-                t = r.get("doc_type", "other")
-                type_counts[t] = type_counts.get(t, 0) + 1
+        for r in matches[page * RECORD_PAGE_SIZE:(page + 1) * RECORD_PAGE_SIZE]:
+            ts = r.created_at[:16].replace("T", " ")
+            dtype = r.doc_type
+            dlabel = DOC_LABELS.get(dtype, dtype.title())
+            name = r.holder_name or "—"
+            rid = r.id or "x"
+            display = r.display
 
-            label_map = {"aadhaar": "Aadhaar", "pan": "PAN", "dl": "DL", "voter": "Voter", "other": "Other"}
-            badges_html = " ".join(
-                f'<span class="sb-record-badge sb-badge-{t}">{label_map.get(t,t)} {c}</span>' for t, c in type_counts.items()
-            )
-            st.markdown(
-                f'<div style="margin-bottom:8px;line-height:2.4;">{badges_html}'
-                f'<span style="font-size:0.62rem;color:#9ca3af;margin-left:4px;">'
-                f'({len(records)} total)</span></div>',
-                unsafe_allow_html=True,
-            )
+            doc_num = r.doc_number
+            short_num = (doc_num[:10] + "…") if len(doc_num) > 10 else doc_num
 
-            search_q = st.text_input("search", placeholder="🔍  Search by name, number…", key="sb_search", label_visibility="collapsed")
+            with st.expander(f"{dlabel} · {name}{' · 🗄' if r.archived else ''}", expanded=False):
+                st.markdown(
+                    f'<span class="sb-ts">{ts}{(" · " + short_num) if short_num else ""}</span>',
+                    unsafe_allow_html=True,
+                )
+                stored_url = r.photo_url
+                if stored_url:
+                    st.image(stored_url, width=64, caption="ID Photo")
 
-            for r in records:
-                ts = r.get("created_at", "")[:16].replace("T", " ")
-                dtype = r.get("doc_type", "other")
-                dlabel = label_map.get(dtype, dtype.title())
-                name = r.get("holder_name") or "—"
-                rid = r.get("id", "x")
-
-                if dtype == "aadhaar":
-                    keys = [("Name", "holder_name"), ("Aadhaar No", "aadhaar_number"), ("DOB", "dob"), ("Gender", "gender"), ("Address", "address"), ("Pincode", "pincode"), ("State", "state"), ("VID", "vid"), ("Enrolment", "enrolment_no"), ("Mobile", "mobile")]
-                elif dtype == "pan":
-                    keys = [("Name", "holder_name"), ("PAN No", "pan_number"), ("Father", "father_name"), ("DOB", "dob"), ("Acct Type", "account_type"), ("Issued By", "issued_by")]
-                elif dtype == "dl":
-                    keys = [("Name", "holder_name"), ("DL No", "dl_number"), ("Issued", "date_of_issue"), ("Valid Till", "valid_till"), ("DOB", "dob"), ("Blood", "blood_group"), ("Vehicle", "vehicle_class"), ("S/D/W of", "son_daughter_wife_of"), ("Authority", "issuing_authority"), ("State", "state")]
-                elif dtype == "voter":
-                    keys = [("Name", "holder_name"), ("EPIC No", "epic_number"), ("Father/Husb", "father_husband_name"), ("DOB", "dob"), ("Gender", "gender"), ("Constitency", "constituency"), ("Part No", "part_no"), ("Serial No", "serial_no"), ("State", "state")]
+                st.markdown(render_sidebar_kv(display, rid), unsafe_allow_html=True)
+                # List rows carry no raw text; it is fetched and decompressed only when opened.
+                raw_cache = st.session_state.setdefault("sb_raw_text", {})
+                if load_raw_text_fn is not None and st.toggle("📄 Raw text", key=f"sb_raw_{rid}"):
+                    if rid not in raw_cache:
+                        raw_cache[rid] = load_raw_text_fn(rid)[0]
+                        while len(raw_cache) > RAW_TEXT_CACHE_SIZE:
+                            raw_cache.pop(next(iter(raw_cache)))
+                    st.text_area("Raw text", value=raw_cache[rid] or "No text stored.", height=160,
+                                 key=f"sb_raw_text_{rid}", label_visibility="collapsed")
                 else:
-                    keys = [("Raw Text", "raw_text")]
-
-                display = {label: r[col] for label, col in keys if r.get(col)}
-                if search_q:
-                    searchable = " ".join(str(v) for v in display.values()).lower()
-                    if search_q.lower() not in searchable:
-                        continue
-
-                doc_num = r.get("aadhaar_number") or r.get("pan_number") or r.get("dl_number") or r.get("epic_number") or ""
-                short_num = (doc_num[:10] + "…") if len(doc_num) > 10 else doc_num
-
-                with st.expander(f"{dlabel} · {name}", expanded=False):
-                    st.markdown(
-                        f'<span class="sb-ts">{ts}{(" · " + short_num) if short_num else ""}</span>',
-                        unsafe_allow_html=True,
-                    )
-                    stored_url = r.get("photo_url", "")
-                    if stored_url:
-                        st.image(stored_url, width=64, caption="ID Photo")
-
-                    rows_html = "".join(
-                        f'<div class="sb-kv-row"><span class="sb-key">{k}</span><span class="sb-val">{v}</span></div>'
-                        for k, v in display.items()
-                    )
-                    st.markdown(f'<div class="sb-kv">{rows_html}</div>', unsafe_allow_html=True)
-                    st.download_button(
-                        "⬇ JSON",
-                        data=json.dumps(display, indent=2, ensure_ascii=False),
-                        file_name=f"{dtype}_{rid[:8]}.json",
-                        mime="application/json",
-                        key=f"sb_dl_{rid}",
-                        use_container_width=True,
-                    )
-
-        st.markdown('<div class="sb-header">🔴 Failure Log</div>', unsafe_allow_html=True)
-        fail_count = len(st.session_state.failure_log)
-
-        if fail_count == 0:
-            st.markdown(
-                "<p style='color:#9ca3af;font-size:0.73rem;font-family:monospace;text-align:center;padding:6px 0 0;margin:0;'>No failures ✓</p>",
-                unsafe_allow_html=True,
-            )
-        else:
-            fl_c1, fl_c2 = st.columns([3, 1])
-            with fl_c1:
+                    raw_cache.pop(rid, None)
+                # The JSON is only serialised when the button is clicked.
+                st.download_button(
+                    "⬇ JSON",
+                    data=lambda display=display: json.dumps(display, indent=2, ensure_ascii=False),
+                    file_name=f"{dtype}_{rid[:8]}.json",
+                    mime="application/json",
+                    key=f"sb_dl_{rid}",
+                    on_click="ignore",
+                    use_container_width=True,
+                )
+
+        if pages > 1 or more:
+            pg1, pg2, pg3 = st.columns([1, 2, 1])
+            with pg1:
+                if st.button("‹", key="sb_rec_prev", disabled=page == 0):
+                    st.session_state.sb_page = page - 1
+                    st.rerun(scope="fragment")
+            with pg2:
                 st.markdown(
-                    f"<p style='color:#dc2626;font-size:0.73rem;font-weight:700;margin:4px 0;'>{fail_count} error(s)</p>",
+                    f"<p style='color:#9ca3af;font-size:0.68rem;text-align:center;margin:6px 0;'>{page + 1} / {pages}{'+' if more else ''}</p>",
                     unsafe_allow_html=True,
                 )
-            with fl_c2:
-                if st.button("🗑", key="sb_clear_log", help="Clear log"):
-                    st.session_state.failure_log = []
-                    st.rerun()
-
-            entries_html = "".join(
-                f'<div class="fail-entry-sb"><span class="fail-ts-sb">[{e["ts"]}] <span class="fail-ctx-sb">{e["ctx"]}</span></span><span class="fail-msg-sb">{e["msg"]}</span></div>'
-                for e in reversed(st.session_state.failure_log)
-            )
+            with pg3:
+                if st.button("›", key="sb_rec_next", disabled=page >= pages - 1 and not more):
+                    if page < pages - 1 or _load_more(supabase, load_extractions_fn, query):
+                        st.session_state.sb_page = page + 1
+                    st.rerun(scope="fragment")
+
+        if export_fn is not None:
+            # The download's payload is held in server memory, so large
+            # histories (or an unknown total) go through export.py instead.
+            counts = st.session_state.sb_counts
+            total = sum(counts.values()) if counts else (None if st.session_state.get("sb_records_more") else len(records))
+            too_big = total is None or total > EXPORT_INAPP_MAX_ROWS
+            ex1, ex2 = st.columns([1, 1])
+            with ex1:
+                fmt = st.selectbox("Format", EXPORT_FORMATS, key="sb_export_fmt", label_visibility="collapsed")
+            with ex2:
+                # Runs only when clicked.
+                st.download_button(
+                    "⬇ Export all",
+                    data=lambda fmt=fmt: export_fn(fmt),
+                    file_name=f"extractions.{fmt}",
+                    mime=EXPORT_MIME[fmt],
+                    key="sb_export_all",
+                    on_click="ignore",
+                    disabled=too_big,
+                    use_container_width=True,
+                )
+            if too_big:
+                st.caption(f"In-app export is limited to {EXPORT_INAPP_MAX_ROWS} records — use `python export.py` for the full history.")
+
+
+_saved_extractions_static = st.fragment(_saved_extractions)
+_saved_extractions_live = st.fragment(_saved_extractions, run_every=REALTIME_DRAIN_SECONDS)
+
+
+def _load_more(supabase, load_extractions_fn, query=""):
+    # Appends the next batch of the list, or of the current search's hits;
+    # returns whether it added any rows.
+    records = st.session_state.sb_search_hits[1] if query else st.session_state.sb_records
+    last = records[-1]
+    batch = load_extractions_fn(supabase, RECORD_FETCH_SIZE, (last.created_at, last.id), query=query)
+    known = {r.id for r in records}
+    fresh = [r for r in batch if r.id not in known]
+    more = len(batch) >= RECORD_FETCH_SIZE
+    if query:
+        st.session_state.sb_search_hits = (query, records + fresh, more)
+    else:
+        st.session_state.sb_records = records + fresh
+        st.session_state.sb_records_more = more
+    return bool(fresh)
+
+
+def _render_badges(user_id, type_counts):
+    type_counts = dict(sorted(type_counts.items(), key=lambda kv: -kv[1]))
+    badges_html = HTML_CACHE.get_or_render(
+        content_key("sb_badges", user_id, type_counts),
+        lambda: " ".join(
+            f'<span class="sb-record-badge sb-badge-{t}">{DOC_LABELS.get(t, t)} {c}</span>' for t, c in type_counts.items()
+        ),
+    )
+    st.markdown(
+        f'<div style="margin-bottom:8px;line-height:2.4;">{badges_html}'
+        f'<span style="font-size:0.62rem;color:#9ca3af;margin-left:4px;">'
+        f'({sum(type_counts.values())} total)</span></div>',
+        unsafe_allow_html=True,
+    )
+
+
+def _archived_matches(search_archive_fn, search_q, records):
+    # Archived records are never listed, only searched on demand; the last
+    # query's hits are kept so fragment reruns don't repeat it.
+    if search_archive_fn is None:
+        return []
+    if not st.checkbox("Include archived", key="sb_include_archived", help="Also search records moved to the archive") or not search_q:
+        return []
+    hits = st.session_state.get("sb_archive_hits")
+    if not hits or hits[0] != search_q:
+        hits = st.session_state.sb_archive_hits = (search_q, search_archive_fn(search_q))
+    hot_ids = {r.id for r in records}
+    return [r for r in hits[1] if r.id not in hot_ids]
+
+
+def render_event_log(event_log):
+    st.markdown('<div class="sb-header">🔴 Event Log</div>', unsafe_allow_html=True)
+    fail_count = event_log.count("error", "warning")
+
+    if len(event_log) == 0:
+        st.markdown(
+            "<p style='color:#9ca3af;font-size:0.73rem;font-family:monospace;text-align:center;padding:6px 0 0;margin:0;'>No failures ✓</p>",
+            unsafe_allow_html=True,
+        )
+        return
+
+    fl_c1, fl_c2 = st.columns([3, 1])
+    with fl_c1:
+        color = "#dc2626" if fail_count else "#16a34a"
+        st.markdown(
+            f"<p style='color:{color};font-size:0.73rem;font-weight:700;margin:4px 0;'>{fail_count} error(s) · {len(event_log)} event(s)</p>",
+            unsafe_allow_html=True,
+        )
+    with fl_c2:
+        if st.button("🗑", key="sb_clear_log", help="Clear log"):
+            event_log.clear()
+            st.session_state.event_log_page = 0
+            st.rerun(scope="fragment")
+
+    pages = max(1, -(-len(event_log) // EVENT_PAGE_SIZE))
+    page = min(st.session_state.get("event_log_page", 0), pages - 1)
+    msg_color = {"error": "#dc2626", "warning": "#d97706"}
+    entries_html = "".join(
+        f'<div class="fail-entry-sb"><span class="fail-ts-sb">[{e["time"]}] <span class="fail-ctx-sb">{e["stage"]}</span>'
+        f'{(" · " + str(round(e["duration_ms"])) + " ms") if e["duration_ms"] is not None else ""}</span>'
+        f'<span class="fail-msg-sb" style="color:{msg_color.get(e["severity"], "#374151")};">{e["msg"]}</span></div>'
+        for e in event_log.page(page, EVENT_PAGE_SIZE)
+    )
+    st.markdown(
+        f'<div style="background:#fff9f9;border:1px solid #fecaca;border-radius:8px;padding:10px 12px;max-height:220px;overflow-y:auto;margin-top:6px;">{entries_html}</div>',
+        unsafe_allow_html=True,
+    )
+
+    if pages > 1:
+        pg1, pg2, pg3 = st.columns([1, 2, 1])
+        with pg1:
+            if st.button("‹", key="sb_log_prev", disabled=page == 0):
+                st.session_state.event_log_page = page - 1
+                st.rerun(scope="fragment")
+        with pg2:
             st.markdown(
-                f'<div style="background:#fff9f9;border:1px solid #fecaca;border-radius:8px;padding:10px 12px;max-height:220px;overflow-y:auto;margin-top:6px;">{entries_html}</div>',
+                f"<p style='color:#9ca3af;font-size:0.68rem;text-align:center;margin:6px 0;'>{page + 1} / {pages}</p>",
                 unsafe_allow_html=True,
             )
+        with pg3:
+            if st.button("›", key="sb_log_next", disabled=page >= pages - 1):
+                st.session_state.event_log_page = page + 1
+                st.rerun(scope="fragment")
 
-            log_text = "\n".join(f"[{e['ts']}] [{e['ctx']}] {e['msg']}" for e in st.session_state.failure_log)
-            st.download_button(
-                "⬇ Download Log",
-                data=log_text,
-                file_name="failure_log.txt",
-                mime="text/plain",
-                key="sb_dl_log",
-                use_container_width=True,
-            )
+    st.download_button(
+        "⬇ Download Log",
+        data=event_log.to_text(),
+        file_name="event_log.txt",
+        mime="text/plain",
+        key="sb_dl_log",
+        use_container_width=True,
+    )
+
+
+def render_diagnostics(metrics, artifact_store=None):
+    st.markdown('<div class="sb-header">⏱ Stage Timings</div>', unsafe_allow_html=True)
+    snapshot = metrics.snapshot()
+
+    h = HTML_CACHE.stats()
+    st.markdown(
+        f'<div class="sb-kv"><div class="sb-kv-row"><span class="sb-key">html cache</span>'
+        f'<span class="sb-val">{h["entries"]}/{h["capacity"]} · {h["hits"]} hits · {h["misses"]} misses</span></div></div>',
+        unsafe_allow_html=True,
+    )
+
+    if artifact_store is not None:
+        a = artifact_store.stats()
+        mb = 1024 * 1024
+        st.markdown(
+            f'<div class="sb-kv"><div class="sb-kv-row"><span class="sb-key">artifacts</span>'
+            f'<span class="sb-val">{a["memory_entries"]} in RAM · {a["memory_bytes"] / mb:.1f}/{a["memory_budget_bytes"] / mb:.0f} MB'
+            f' · {a["disk_entries"]} spilled · {a["disk_bytes"] / mb:.1f} MB</span></div></div>',
+            unsafe_allow_html=True,
+        )
+
+    if not snapshot:
+        st.markdown(
+            "<p style='color:#9ca3af;font-size:0.73rem;font-family:monospace;text-align:center;padding:6px 0 0;margin:0;'>No timings yet</p>",
+            unsafe_allow_html=True,
+        )
+        return
+
+    rows_html = '<div class="sb-kv-row"><span class="sb-key">stage (n)</span><span class="sb-val">p50 · p95 · p99 ms</span></div>'
+    rows_html += "".join(
+        f'<div class="sb-kv-row"><span class="sb-key">{stage} ({s["count"]})</span>'
+        f'<span class="sb-val">{s["p50_ms"]:.0f} · {s["p95_ms"]:.0f} · {s["p99_ms"]:.0f}</span></div>'
+        for stage, s in snapshot.items()
+    )
+    st.markdown(f'<div class="sb-kv">{rows_html}</div>', unsafe_allow_html=True)
+
+    dg1, dg2 = st.columns(2)
+    with dg1:
+        st.download_button(
+            "⬇ JSON",
+            data=metrics.to_json(),
+            file_name="stage_timings.json",
+            mime="application/json",
+            key="sb_dl_timings_json",
+            use_container_width=True,
+        )
+    with dg2:
+        st.download_button(
+            "⬇ Prometheus",
+            data=metrics.to_prometheus(),
+            file_name="stage_timings.prom",
+            mime="text/plain",
+            key="sb_dl_timings_prom",
+            use_container_width=True,
+        )
+
+
+def _apply_inserts(rows):
+    if not rows:
+        return False
+    records = st.session_state.get("sb_records")
+    if records is None:
+        # Nothing cached yet: the next load fetches everything, counts included.
+        st.session_state.sb_counts = None
+        return True
+    known = {r.id for r in records}
+    fresh = []
+    for row in rows:
+        if row.get("id") in known:
+            continue
+        known.add(row.get("id"))
+        fresh.append(Extraction.from_row(row))
+    if not fresh:
+        return False
+    fresh.sort(key=lambda r: r.created_at, reverse=True)
+    st.session_state.sb_records = fresh + records
+    # A cached search may be missing the new rows; rerun it.
+    st.session_state.sb_search_hits = None
+    counts = st.session_state.get("sb_counts")
+    if isinstance(counts, dict):
+        for r in fresh:
+            counts[r.doc_type] = counts.get(r.doc_type, 0) + 1
+    return True
@@ -0,0 +1,343 @@
+import os
+import uuid
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import streamlit as st
+
+from metrics import timed
+from database import (
+    LIST_COLUMNS,
+    LIST_PAGE_SIZE,
+    FIELD_COLUMNS,
+    EXTENDED_FIELD_COLUMNS,
+    RAW_TEXT_PREVIEW_CHARS,
+    SEARCH_COLUMNS,
+    STORAGE_BACKEND,
+    _get_secret,
+    _photo_path,
+    _safe_log,
+    _search_term,
+    check_duplicate,
+    doc_unique_key,
+    field_columns,
+    get_extractions_feed,
+    get_session_client,
+    iter_extraction_pages,
+    load_extraction_counts,
+    load_extractions,
+    load_raw_text,
+    pack_raw_text,
+    save_extraction,
+    search_archived_extractions,
+    stored_doc_type,
+    unpack_raw_text,
+    upload_photo_to_storage,
+)
+
+SQLITE_PATH = _get_secret("SQLITE_PATH", "extractions.sqlite3")
+SQLITE_PHOTO_DIR = _get_secret("SQLITE_PHOTO_DIR", "photos")
+# With the sqlite backend there is no hosted auth; everyone is this user.
+LOCAL_USER_ID = _get_secret("LOCAL_USER_ID", "local")
+
+ROW_COLUMNS = (*LIST_COLUMNS, *EXTENDED_FIELD_COLUMNS, "photo_url")
+
+
+# Persistence used by the app: saves, the duplicate check, photo storage and
+# the sidebar's reads. Methods take the user explicitly; the Supabase backend
+# additionally relies on the session's access token for row-level security.
+class StorageBackend(ABC):
+    name = ""
+    has_auth = True
+    has_archive = False
+
+    @abstractmethod
+    def check_duplicate(self, user_id, doc_type, fields) -> bool:
+        ...
+
+    @abstractmethod
+    def store_photo(self, user_id, photo_bytes, log_failure=None) -> str:
+        ...
+
+    @abstractmethod
+    def save_extraction(self, user_id, doc_type, fields, raw_text="", file_name="", file_size_bytes=0,
+                        photo_bytes=None, pages=None, log_failure=None):
+        ...
+
+    @abstractmethod
+    def load_extractions(self, user_id, log_failure=None, limit=LIST_PAGE_SIZE, before=None, query=""):
+        ...
+
+    @abstractmethod
+    def load_counts(self, user_id, log_failure=None):
+        ...
+
+    @abstractmethod
+    def load_raw_text(self, user_id, extraction_id, log_failure=None):
+        ...
+
+    def search_archive(self, user_id, query, log_failure=None):
+        return []
+
+    @abstractmethod
+    def export_columns(self, include_raw_text=False):
+        ...
+
+    @abstractmethod
+    def iter_pages(self, user_id, columns, page_size=500):
+        ...
+
+    def bound(self):
+        # A copy usable outside the current script run (deferred downloads).
+        return self
+
+
+class SupabaseStorage(StorageBackend):
+    name = "supabase"
+    has_archive = True
+
+    def __init__(self, client_fn=get_session_client):
+        self._client_fn = client_fn
+
+    def check_duplicate(self, user_id, doc_type, fields):
+        return check_duplicate(self._client_fn(), doc_type, fields)
+
+    def store_photo(self, user_id, photo_bytes, log_failure=None):
+        return upload_photo_to_storage(self._client_fn(), photo_bytes, log_failure)
+
+    def save_extraction(self, user_id, doc_type, fields, raw_text="", file_name="", file_size_bytes=0,
+                        photo_bytes=None, pages=None, log_failure=None):
+        return save_extraction(self._client_fn(), doc_type, fields, raw_text, file_name, file_size_bytes,
+                               photo_bytes=photo_bytes, log_failure=log_failure, pages=pages)
+
+    def load_extractions(self, user_id, log_failure=None, limit=LIST_PAGE_SIZE, before=None, query=""):
+        return load_extractions(self._client_fn(), log_failure=log_failure, limit=limit, before=before, query=query)
+
+    def load_counts(self, user_id, log_failure=None):
+        return load_extraction_counts(self._client_fn(), log_failure=log_failure)
+
+    def load_raw_text(self, user_id, extraction_id, log_failure=None):
+        return load_raw_text(self._client_fn(), extraction_id, log_failure=log_failure)
+
+    def search_archive(self, user_id, query, log_failure=None):
+        return search_archived_extractions(self._client_fn(), query, log_failure=log_failure)
+
+    def export_columns(self, include_raw_text=False):
+        columns = [*ROW_COLUMNS, "user_id"] + (["raw_text"] if include_raw_text else [])
+        try:
+            self._client_fn().table("extractions").select(",".join(columns)).limit(1).execute()
+            return columns
+        except Exception as e:
+            err = str(e)
+            if "42703" not in err and "column" not in err.lower():
+                raise
+        # Older schemas lack the extended columns; fall back to the core list.
+        return [*LIST_COLUMNS, "user_id"] + (["raw_text"] if include_raw_text else [])
+
+    def iter_pages(self, user_id, columns, page_size=500):
+        return iter_extraction_pages(self._client_fn(), columns, page_size, user_id)
+
+    def bound(self):
+        client = self._client_fn()
+        return SupabaseStorage(lambda: client)
+
+
+# Single-file SQLite store for local development, kiosks and offline tests. WAL
+# lets readers run alongside the one writer; the duplicate check is a unique
+# index on the normalised ID number, and photos are content-addressed files.
+class SqliteStorage(StorageBackend):
+    name = "sqlite"
+    has_auth = False
+
+    def __init__(self, path: str = SQLITE_PATH, photo_dir: str = SQLITE_PHOTO_DIR):
+        self.path = path
+        self.photo_dir = photo_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        fields = ",\n".join(f"{c} TEXT" for c in (*FIELD_COLUMNS, *EXTENDED_FIELD_COLUMNS))
+        with self._lock:
+            self._conn.executescript(
+                f"""CREATE TABLE IF NOT EXISTS extractions (
+                    id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    doc_type TEXT NOT NULL,
+                    file_name TEXT,
+                    file_size_kb REAL,
+                    {fields},
+                    photo_url TEXT,
+                    raw_text TEXT,
+                    raw_payload TEXT,
+                    unique_key TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_extractions_user_created ON extractions (user_id, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_extractions_user_type ON extractions (user_id, doc_type);
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_extractions_unique_key ON extractions (user_id, doc_type, unique_key);
+                """
+            )
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def check_duplicate(self, user_id, doc_type, fields):
+        key = doc_unique_key(doc_type, fields)
+        if not key:
+            return False
+        with timed("db_duplicate_check"):
+            rows = self._query(
+                "SELECT 1 FROM extractions WHERE user_id = ? AND doc_type = ? AND unique_key = ? LIMIT 1",
+                (user_id, stored_doc_type(doc_type), key),
+            )
+        return bool(rows)
+
+    def store_photo(self, user_id, photo_bytes, log_failure=None):
+        if not photo_bytes:
+            return ""
+        path = os.path.join(self.photo_dir, _photo_path(user_id, photo_bytes))
+        try:
+            with timed("photo_upload"):
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                    with open(tmp, "wb") as fh:
+                        fh.write(photo_bytes)
+                    os.replace(tmp, path)
+            return path
+        except OSError as e:
+            _safe_log(log_failure, "Photo Upload", str(e))
+            return ""
+
+    def save_extraction(self, user_id, doc_type, fields, raw_text="", file_name="", file_size_bytes=0,
+                        photo_bytes=None, pages=None, log_failure=None):
+        if not user_id:
+            return False, "Not logged in"
+        if self.check_duplicate(user_id, doc_type, fields):
+            return False, "duplicate"
+        photo_url = self.store_photo(user_id, photo_bytes, log_failure) if photo_bytes else ""
+        row = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "doc_type": stored_doc_type(doc_type),
+            "file_name": file_name,
+            "file_size_kb": round(file_size_bytes / 1024, 1) if file_size_bytes else 0,
+            **field_columns(fields),
+            "photo_url": photo_url,
+            "raw_text": raw_text[:RAW_TEXT_PREVIEW_CHARS],
+        }
+        row = {k: v for k, v in row.items() if v != ""}
+        payload = pack_raw_text(raw_text, pages) if len(raw_text) > RAW_TEXT_PREVIEW_CHARS or pages else None
+        cols = [*row, "raw_payload", "unique_key"]
+        try:
+            with timed("db_insert"), self._lock:
+                self._conn.execute(
+                    f"INSERT INTO extractions ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                    (*row.values(), payload, doc_unique_key(doc_type, fields)),
+                )
+                self._conn.commit()
+        except sqlite3.IntegrityError:
+            return False, "duplicate"
+        except sqlite3.Error as e:
+            return False, str(e)
+        feed = get_extractions_feed()
+        if feed is not None:
+            feed.publish({k: v for k, v in row.items() if k != "raw_text"})
+        return True, None
+
+    def load_extractions(self, user_id, log_failure=None, limit=LIST_PAGE_SIZE, before=None, query=""):
+        where, params = "user_id = ?", (user_id,)
+        if before is not None:
+            where += " AND (created_at < ? OR (created_at = ? AND id < ?))"
+            params += (before[0], before[0], before[1])
+        term = _search_term(query)
+        if query and not term:
+            return []
+        if term:
+            where += " AND (" + " OR ".join(f"{col} LIKE ?" for col in SEARCH_COLUMNS) + ")"
+            params += (f"%{term}%",) * len(SEARCH_COLUMNS)
+        try:
+            with timed("db_fetch"):
+                rows = self._query(
+                    f"SELECT {', '.join(ROW_COLUMNS)} FROM extractions WHERE {where} "
+                    "ORDER BY created_at DESC, id DESC LIMIT ?",
+                    (*params, limit),
+                )
+            return [{k: v for k, v in r.items() if v is not None} for r in rows]
+        except sqlite3.Error as e:
+            _safe_log(log_failure, "SQLite Fetch", str(e))
+            return []
+
+    def load_counts(self, user_id, log_failure=None):
+        try:
+            with timed("db_fetch"):
+                rows = self._query(
+                    "SELECT doc_type, COUNT(*) AS n FROM extractions WHERE user_id = ? GROUP BY doc_type", (user_id,)
+                )
+            return {r["doc_type"]: r["n"] for r in rows}
+        except sqlite3.Error as e:
+            _safe_log(log_failure, "SQLite Counts", str(e))
+            return None
+
+    def load_raw_text(self, user_id, extraction_id, log_failure=None):
+        try:
+            rows = self._query(
+                "SELECT raw_text, raw_payload FROM extractions WHERE id = ? AND user_id = ?", (extraction_id, user_id)
+            )
+        except sqlite3.Error as e:
+            _safe_log(log_failure, "SQLite Raw Text", str(e))
+            return "", None
+        if not rows:
+            return "", None
+        if rows[0]["raw_payload"]:
+            return unpack_raw_text(rows[0]["raw_payload"])
+        return rows[0]["raw_text"] or "", None
+
+    def export_columns(self, include_raw_text=False):
+        return [*ROW_COLUMNS, "user_id"] + (["raw_text"] if include_raw_text else [])
+
+    def iter_pages(self, user_id, columns, page_size=500):
+        last_id = ""
+        where = "id > ?" + (" AND user_id = ?" if user_id else "")
+        # raw_text in an export is the full text, unpacked from raw_payload.
+        select = [*columns, "raw_payload"] if "raw_text" in columns else list(columns)
+        while True:
+            params = (last_id, user_id) if user_id else (last_id,)
+            rows = self._query(
+                f"SELECT {', '.join(select)} FROM extractions WHERE {where} ORDER BY id LIMIT ?", (*params, page_size)
+            )
+            if not rows:
+                return
+            for row in rows:
+                payload = row.pop("raw_payload", None)
+                if payload:
+                    row["raw_text"] = unpack_raw_text(payload)[0]
+            yield rows
+            last_id = rows[-1]["id"]
+            if len(rows) < page_size:
+                return
+
+
+_STORAGE = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    global _STORAGE
+    with _STORAGE_LOCK:
+        if _STORAGE is None:
+            _STORAGE = SqliteStorage() if STORAGE_BACKEND == "sqlite" else SupabaseStorage()
+        return _STORAGE
+
+
+def current_user_id():
+    user = st.session_state.get("user")
+    return user.id if user is not None else None
@@ -0,0 +1,55 @@
+import io
+import os
+import sys
+import tempfile
+
+# Offline configuration; modules read these at import time.
+_TMP = tempfile.mkdtemp(prefix="ocr-stream-tests-")
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["REALTIME_FEED"] = "local"
+os.environ["SQLITE_PATH"] = os.path.join(_TMP, "extractions.sqlite3")
+os.environ["SQLITE_PHOTO_DIR"] = os.path.join(_TMP, "photos")
+os.environ["ARTIFACT_SPILL_DIR"] = os.path.join(_TMP, "artifacts")
+os.environ.pop("SUPABASE_URL", None)
+os.environ.pop("SUPABASE_ANON_KEY", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from PIL import Image
+
+from storage import SqliteStorage
+from ocr_extraction import OcrClient
+from mock_ocr_server import MockOcrConfig, start_mock_server
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path):
+    return SqliteStorage(str(tmp_path / "extractions.sqlite3"), str(tmp_path / "photos"))
+
+
+@pytest.fixture
+def ocr_server():
+    # Factory: starts a local OCR.space stand-in and returns (config, client).
+    servers = []
+
+    def start(**config):
+        cfg = MockOcrConfig(seed=0, **config)
+        server, url = start_mock_server(config=cfg)
+        servers.append(server)
+        logged = []
+        client = OcrClient(api_key="test", url=url, logger=lambda context, message: logged.append((context, message)))
+        client.logged = logged
+        return cfg, client
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def sample_jpeg():
+    buf = io.BytesIO()
+    Image.new("RGB", (320, 200), "white").save(buf, format="JPEG")
+    return buf.getvalue()
@@ -0,0 +1,98 @@
+from concurrent.futures import Future
+
+import pytest
+
+import ocr_engines
+from ocr_engines import LocalFirstEngine, OcrEngine, TesseractEngine, recognize_auto
+
+
+class _Client:
+    def __init__(self):
+        self.logged = []
+
+    def log(self, context, message, **extra):
+        self.logged.append((context, message, extra.get("severity")))
+
+
+class _StubEngine(OcrEngine):
+    def __init__(self, text, confidence=90.0, uses_engine_code=True):
+        self.text, self.confidence, self.uses_engine_code = text, confidence, uses_engine_code
+        self.calls, self.prepared = [], 0
+
+    def prepare(self, raw_bytes, is_pdf=False, client=None):
+        self.prepared += 1
+        return "upload"
+
+    def recognize(self, raw_bytes, language_code, engine_code, is_pdf=False, client=None, upload=None):
+        self.calls.append((engine_code, upload))
+        return {"ParsedResults": [{"ParsedText": self.text, "MeanConfidence": self.confidence}]}
+
+
+def test_worker_maps_tesseract_timeout(sample_jpeg, monkeypatch):
+    pytest.importorskip("pytesseract")
+
+    def hang(*args, **kwargs):
+        assert kwargs["timeout"] == 5
+        raise RuntimeError("Tesseract process timeout")
+
+    monkeypatch.setattr(ocr_engines.pytesseract, "image_to_data", hang)
+    assert ocr_engines._tesseract_worker(sample_jpeg, "eng", 5) == {"error": "Local OCR failed: timed out after 5s"}
+
+
+def test_timeout_abandons_only_that_job(sample_jpeg, monkeypatch):
+    pytest.importorskip("pytesseract")
+
+    class _Pool:
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, fn, *args):
+            future = Future()
+            self.submitted.append((future, args))
+            return future
+
+    pool = _Pool()
+    monkeypatch.setattr(ocr_engines, "_get_pool", lambda: pool)
+    monkeypatch.setattr(ocr_engines, "_LOCAL_UNAVAILABLE", None)
+    monkeypatch.setattr(ocr_engines, "OCR_LOCAL_QUEUE_GRACE", 0)
+    reset = []
+    monkeypatch.setattr(ocr_engines, "_reset_pool", lambda: reset.append(1))
+
+    client = _Client()
+    result = TesseractEngine(timeout=0.05).recognize(sample_jpeg, "eng", 1, client=client)
+    assert result == {"error": "Local OCR failed: timed out"}
+    (future, args), = pool.submitted
+    assert args[2] == 0.05
+    assert future.cancelled()
+    assert reset == []
+    assert client.logged[0][2] == "warning"
+
+
+def test_auto_runs_local_once_then_escalates_remote():
+    local = _StubEngine("ELECTION COMMISSION OF INDIA", uses_engine_code=False)
+    remote = _StubEngine("ELECTION COMMISSION OF INDIA")
+    client = _Client()
+    result = recognize_auto(LocalFirstEngine(local, remote), b"img", "eng", client=client)
+    assert local.calls == [(1, None)]
+    assert remote.calls == [(1, "upload"), (2, "upload"), (3, "upload")]
+    assert remote.prepared == 1
+    assert [a["engine"] for a in result["AutoEngine"]["attempts"]] == ["local", 1, 2, 3]
+
+
+def test_auto_keeps_confident_local_result():
+    local = _StubEngine("just some words", uses_engine_code=False)
+    remote = _StubEngine("unused")
+    result = recognize_auto(LocalFirstEngine(local, remote), b"img", "eng", client=_Client())
+    assert len(local.calls) == 1 and remote.calls == []
+    assert result["AutoEngine"]["engine"] == "local"
+
+
+def test_auto_escalates_low_confidence_local_result():
+    local = _StubEngine("just some words", confidence=10.0, uses_engine_code=False)
+    remote = _StubEngine("just some words")
+    client = _Client()
+    result = recognize_auto(LocalFirstEngine(local, remote, min_confidence=50), b"img", "eng", client=client)
+    assert len(local.calls) == 1
+    assert [code for code, _ in remote.calls] == [1]
+    assert [a["engine"] for a in result["AutoEngine"]["attempts"]] == ["local", 1]
+    assert client.logged[0][0] == "Local OCR"
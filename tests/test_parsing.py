@@ -0,0 +1,128 @@
+import pytest
+
+import ocr_extraction
+from ocr_extraction import (
+    OcrClient,
+    aadhaar_number_valid,
+    dl_number_valid,
+    epic_number_valid,
+    extract_fields,
+    pan_number_valid,
+    perform_ocr,
+    score_fields,
+)
+from ocr_engines import OcrEngine, OcrSpaceEngine, recognize_auto
+from database import pack_raw_text, unpack_raw_text
+from reextract import diff_row
+from mock_ocr_server import BUILTIN_FIXTURES
+
+
+@pytest.mark.parametrize("value, valid", [
+    ("4821 7736 9013", True),
+    ("482177369013", True),
+    ("4821 7736 9014", False),
+    ("0821 7736 9013", False),
+    ("4821 7736 901", False),
+    ("", False),
+])
+def test_aadhaar_verhoeff(value, valid):
+    assert aadhaar_number_valid(value) is valid
+
+
+@pytest.mark.parametrize("fn, value, valid", [
+    (pan_number_valid, "ABCPS1234K", True),
+    (pan_number_valid, "ABCXS1234K", False),
+    (pan_number_valid, "ABCP1234K", False),
+    (dl_number_valid, "MH12 20110012345", True),
+    (dl_number_valid, "MH-12-2011-0012345", True),
+    (dl_number_valid, "XYZ", False),
+    (epic_number_valid, "ABC1234567", True),
+    (epic_number_valid, "AB1234567", False),
+])
+def test_id_formats(fn, value, valid):
+    assert fn(value) is valid
+
+
+def test_score_fields():
+    doc_type, fields = extract_fields(BUILTIN_FIXTURES[1])
+    assert doc_type == "pan"
+    assert score_fields(doc_type, fields) == 1.0
+    # Completeness alone, with an ID that fails its check.
+    assert score_fields("pan", {"PAN Number": "ABCXS1234K"}) == pytest.approx(0.6 / 5)
+    assert score_fields("aadhaar", {}) == 0.0
+
+
+def test_score_fields_unknown_type_scores_text_presence():
+    assert score_fields("unknown", {}, "some text") == 1.0
+    assert score_fields("unknown", {}, "  \n") == 0.0
+    assert score_fields("unknown", {}) == 0.0
+
+
+@pytest.mark.parametrize("text, pages", [
+    ("", None),
+    ("plain", None),
+    ("मेरा आधार " * 500, ["page 1", "पृष्ठ 2"]),
+])
+def test_pack_raw_text_round_trip(text, pages):
+    payload = pack_raw_text(text, pages)
+    assert payload.isascii()
+    assert unpack_raw_text(payload) == (text, pages)
+
+
+def test_diff_row():
+    row = {"doc_type": "pan", "pan_number": "ABCPS1234K", "holder_name": "Priya", "dob": "02/11/1988"}
+    fields = {"PAN Number": "ABCPS1234K", "Name": "Priya Singh"}
+    assert diff_row(row, "pan", fields) == {"holder_name": "Priya Singh"}
+    assert diff_row(row, "pan", fields, allow_clear=True) == {"holder_name": "Priya Singh", "dob": None}
+    assert diff_row(row, "aadhaar", {})["doc_type"] == "aadhaar"
+    assert diff_row(row, "unknown", {}) == {}
+
+
+def test_ocr_engine_is_abstract():
+    with pytest.raises(TypeError):
+        OcrEngine()
+
+
+def test_perform_ocr_against_mock(ocr_server, sample_jpeg):
+    _, client = ocr_server()
+    result = perform_ocr(sample_jpeg, "eng", 2, client=client)
+    assert result["ParsedResults"][0]["ParsedText"] in BUILTIN_FIXTURES
+    assert result["OCREngine"] == "2"
+
+
+def test_perform_ocr_reports_processing_errors(ocr_server, sample_jpeg):
+    _, client = ocr_server(error_rate=1.0)
+    assert "error" in perform_ocr(sample_jpeg, "eng", 1, client=client)
+    assert [context for context, _ in client.logged] == ["OCR Processing"]
+
+
+def test_perform_ocr_without_api_key(sample_jpeg):
+    assert perform_ocr(sample_jpeg, "eng", 1, client=OcrClient(api_key="")) == {"error": "Missing OCR_API_KEY"}
+
+
+def test_recognize_auto_stops_at_first_good_score(ocr_server, sample_jpeg):
+    cfg, client = ocr_server()
+    result = recognize_auto(OcrSpaceEngine(), sample_jpeg, "eng", client=client)
+    auto = result["AutoEngine"]
+    assert auto["engine"] == 1
+    assert auto["attempts"] == [{"engine": 1, "score": auto["score"]}]
+    assert auto["parsed"][0] in ("aadhaar", "pan", "dl", "voter")
+    assert cfg.requests == 1
+
+
+def test_recognize_auto_does_not_escalate_unrecognised_text(ocr_server, sample_jpeg):
+    cfg, client = ocr_server(fixtures=["just some words"])
+    result = recognize_auto(OcrSpaceEngine(), sample_jpeg, "eng", client=client)
+    assert result["AutoEngine"]["score"] == 1.0
+    assert cfg.requests == 1
+
+
+def test_recognize_auto_escalates_and_compresses_once(ocr_server, sample_jpeg, monkeypatch):
+    cfg, client = ocr_server(fixtures=["ELECTION COMMISSION OF INDIA"])
+    calls = []
+    original = ocr_extraction._compress_image_bytes
+    monkeypatch.setattr(ocr_extraction, "_compress_image_bytes", lambda *a: calls.append(1) or original(*a))
+    result = recognize_auto(OcrSpaceEngine(), sample_jpeg, "eng", client=client)
+    assert [a["engine"] for a in result["AutoEngine"]["attempts"]] == [1, 2, 3]
+    assert cfg.requests == 3
+    assert len(calls) == 1
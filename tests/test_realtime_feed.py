@@ -0,0 +1,39 @@
+import gc
+
+from realtime_feed import Inbox, LocalChangeFeed, get_change_feed
+from database import get_extractions_feed
+
+
+def test_inbox_is_bounded_and_drains():
+    inbox = Inbox("u1", maxlen=3)
+    for i in range(5):
+        inbox.put({"id": i})
+    assert len(inbox) == 3
+    assert [r["id"] for r in inbox.drain()] == [2, 3, 4]
+    assert inbox.drain() == []
+
+
+def test_local_feed_fans_out_per_user():
+    feed = LocalChangeFeed()
+    a1, a2, b = feed.subscribe("a"), feed.subscribe("a"), feed.subscribe("b")
+    assert feed.publish({"id": "r1", "user_id": "a"}) == 2
+    assert a1.drain() == a2.drain() == [{"id": "r1", "user_id": "a"}]
+    assert b.drain() == []
+
+    feed.unsubscribe(a1)
+    assert feed.publish({"id": "r2", "user_id": "a"}) == 1
+    assert feed.publish({"id": "r3", "user_id": "nobody"}) == 0
+
+
+def test_local_feed_drops_collected_inboxes():
+    feed = LocalChangeFeed()
+    feed.subscribe("gone")
+    gc.collect()
+    assert feed.publish({"id": "r1", "user_id": "gone"}) == 0
+    assert feed._live_users() == set()
+
+
+def test_non_supabase_storage_gets_local_feed():
+    feed = get_extractions_feed()
+    assert type(feed) is LocalChangeFeed
+    assert get_change_feed() is feed
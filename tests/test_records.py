@@ -0,0 +1,113 @@
+from records import Extraction, RECORD_COLUMNS
+from artifact_store import ArtifactStore
+from dedup import PerceptualIndex
+from ui_helpers import HtmlCache, cached_preview, content_key, PREVIEW_CACHE_SIZE
+
+PAN_ROW = {
+    "id": "r1",
+    "created_at": "2026-01-02T10:00:00",
+    "doc_type": "pan",
+    "holder_name": "Priya Singh",
+    "pan_number": "ABCPS1234K",
+    "dob": "",
+    "raw_text": "not kept",
+}
+
+
+def test_extraction_from_row():
+    rec = Extraction.from_row(PAN_ROW)
+    assert rec.pan_number == "ABCPS1234K"
+    assert rec.dob is None
+    assert rec.get("dob", "-") == "-"
+    assert rec.get("raw_text") is None
+    assert not hasattr(rec, "__dict__")
+    assert rec.doc_number == "ABCPS1234K"
+    assert rec.display == {"Name": "Priya Singh", "PAN No": "ABCPS1234K"}
+    assert rec.to_dict() == {k: v for k, v in PAN_ROW.items() if v and k in RECORD_COLUMNS}
+
+
+def test_extraction_defaults_and_search():
+    rec = Extraction.from_row({"id": "r2", "file_name": "scan.jpg"}, archived=True)
+    assert rec.doc_type == "other"
+    assert rec.created_at == ""
+    assert rec.archived and rec.to_dict()["archived"] is True
+    assert rec.display == {"File": "scan.jpg"}
+
+    pan = Extraction.from_row(PAN_ROW)
+    assert pan.matches("") and pan.matches("priya") and pan.matches("abcps")
+    assert not pan.matches("rahul")
+    assert [r.id for r in Extraction.from_rows([PAN_ROW, {"id": "r2"}])] == ["r1", "r2"]
+
+
+def test_artifact_store_spills_and_evicts(tmp_path):
+    store = ArtifactStore(memory_bytes=10, disk_bytes=12, spill_dir=str(tmp_path))
+    first = store.put_bytes(b"a" * 6)
+    second = store.put_json({"k": "v"})
+    # first was spilled to disk but is still readable.
+    assert store.get_bytes(first) == b"a" * 6
+    assert store.get_json(second) == {"k": "v"}
+    assert store.stats()["disk_entries"] == 1
+
+    third = store.put_bytes(b"c" * 8)
+    fourth = store.put_bytes(b"d" * 8)
+    assert store.get_bytes(first) is None
+    assert store.evicted >= 1
+    assert store.get_bytes(fourth) == b"d" * 8
+
+    store.delete(second, third, fourth, None)
+    stats = store.stats()
+    assert stats["memory_bytes"] == 0 and stats["disk_bytes"] == 0
+    assert store.get_bytes(None) is None
+
+
+def test_html_cache_lru():
+    cache = HtmlCache(capacity=2)
+    renders = []
+
+    def render(text):
+        return lambda: renders.append(text) or text
+
+    assert cache.get_or_render("a", render("A")) == "A"
+    assert cache.get_or_render("a", render("A2")) == "A"
+    cache.get_or_render("b", render("B"))
+    cache.get_or_render("c", render("C"))
+    assert cache.get_or_render("a", render("A3")) == "A3"
+    assert cache.get_or_render(None, render("X")) == "X"
+    assert renders == ["A", "B", "C", "A3", "X"]
+    assert cache.stats() == {"entries": 2, "capacity": 2, "hits": 1, "misses": 4}
+
+
+def test_content_key_tracks_values():
+    assert content_key("kv", None, {"a": 1}) is None
+    assert content_key("kv", "r1", {"a": 1}) == content_key("kv", "r1", {"a": "1"})
+    assert content_key("kv", "r1", {"a": 1}) != content_key("kv", "r1", {"a": 2})
+
+
+def test_cached_preview_is_bounded(sample_jpeg):
+    cache, loads = {}, []
+    for i in range(PREVIEW_CACHE_SIZE + 2):
+        assert cached_preview(cache, i, lambda: loads.append(1) or sample_jpeg)
+    assert len(cache) == PREVIEW_CACHE_SIZE
+    cached_preview(cache, PREVIEW_CACHE_SIZE + 1, lambda: loads.append(1) or sample_jpeg)
+    assert len(loads) == PREVIEW_CACHE_SIZE + 2
+
+    # A failed downsample caches a marker, never the full upload.
+    assert cached_preview(cache, "bad", lambda: b"not an image") == b"not an image"
+    assert cache["bad"] == b""
+
+
+def test_perceptual_index_scoped_by_mode_and_language(tmp_path):
+    store = ArtifactStore(spill_dir=str(tmp_path))
+    index = PerceptualIndex(store)
+    result = {"mode": "Document", "pages_id": store.put_json(["page"]), "photo_id": None}
+    index.add("u1", 0b1010, result, "Document", "eng")
+
+    entry, dist = index.find("u1", 0b1011, mode="Document", language="eng")
+    assert dist == 1
+    assert index.find("u1", 0b1010, mode="Normal", language="eng") == (None, None)
+    assert index.find("u1", 0b1010, mode="Document", language="hin") == (None, None)
+    assert index.find("u2", 0b1010, mode="Document", language="eng") == (None, None)
+
+    reused = index.materialize(entry)
+    assert reused["pages_id"] != result["pages_id"]
+    assert store.get_json(reused["pages_id"]) == ["page"]
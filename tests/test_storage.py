@@ -0,0 +1,176 @@
+import io
+import csv
+import json
+
+import pytest
+
+from storage import StorageBackend, SqliteStorage
+from database import RAW_TEXT_PREVIEW_CHARS, get_extractions_feed
+from realtime_feed import LocalChangeFeed
+from export import export_extractions, export_to_bytes, fields_csv
+from ocr_engines import OcrSpaceEngine, recognize_auto
+from mock_ocr_server import BUILTIN_FIXTURES
+
+PAN_FIELDS = {"PAN Number": "ABCPS1234K", "Name": "Priya Singh", "Date of Birth": "02/11/1988"}
+
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_save_load_and_counts(sqlite_storage):
+    ok, err = sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS, "PAN text", "pan.jpg", 2048)
+    assert (ok, err) == (True, None)
+    ok, err = sqlite_storage.save_extraction("u1", "other", {"Name": "Someone"}, "text", "x.jpg", 10)
+    assert ok
+
+    rows = sqlite_storage.load_extractions("u1")
+    assert [r["doc_type"] for r in rows] == ["other", "pan"]
+    assert rows[1]["pan_number"] == "ABCPS1234K"
+    assert rows[1]["file_size_kb"] == 2.0
+    assert "raw_text" not in rows[1]
+    assert sqlite_storage.load_counts("u1") == {"pan": 1, "other": 1}
+    assert sqlite_storage.load_extractions("u2") == []
+    assert sqlite_storage.load_counts("u2") == {}
+
+
+def test_duplicate_is_per_user_and_normalised(sqlite_storage):
+    assert sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS)[0]
+    assert sqlite_storage.check_duplicate("u1", "pan", {"PAN Number": "abcps 1234k"})
+    assert sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS) == (False, "duplicate")
+    assert sqlite_storage.save_extraction("u2", "pan", PAN_FIELDS) == (True, None)
+
+
+def test_load_extractions_pages_by_keyset(sqlite_storage):
+    for i in range(23):
+        assert sqlite_storage.save_extraction("u1", "other", {"Name": f"n{i}"})[0]
+    seen, before = [], None
+    while True:
+        rows = sqlite_storage.load_extractions("u1", limit=10, before=before)
+        seen += rows
+        if len(rows) < 10:
+            break
+        before = (rows[-1]["created_at"], rows[-1]["id"])
+    assert len(seen) == 23
+    assert len({r["id"] for r in seen}) == 23
+    keys = [(r["created_at"], r["id"]) for r in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_load_extractions_searches_whole_history(sqlite_storage):
+    for i in range(30):
+        name = "Priya Singh" if i % 3 == 0 else f"Rahul {i}"
+        assert sqlite_storage.save_extraction("u1", "other", {"Name": name}, file_name=f"scan{i}.jpg")[0]
+    assert sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS)[0]
+    sqlite_storage.save_extraction("u2", "other", {"Name": "Priya Singh"})
+
+    seen, before = [], None
+    while True:
+        rows = sqlite_storage.load_extractions("u1", limit=4, before=before, query="priya")
+        seen += rows
+        if len(rows) < 4:
+            break
+        before = (rows[-1]["created_at"], rows[-1]["id"])
+    assert len(seen) == 11
+    assert {r["holder_name"] for r in seen} == {"Priya Singh"}
+
+    assert [r["pan_number"] for r in sqlite_storage.load_extractions("u1", query="abcps")] == ["ABCPS1234K"]
+    assert [r["file_name"] for r in sqlite_storage.load_extractions("u1", query="scan7.")] == ["scan7.jpg"]
+    assert sqlite_storage.load_extractions("u1", query="((*") == []
+
+
+def test_raw_text_round_trip(sqlite_storage):
+    long_text = "A" * RAW_TEXT_PREVIEW_CHARS + "TAIL"
+    sqlite_storage.save_extraction("u1", "other", {"Name": "a"}, long_text, pages=["page one", "page two"])
+    sqlite_storage.save_extraction("u1", "other", {"Name": "b"}, "short text")
+    by_name = {r["holder_name"]: r["id"] for r in sqlite_storage.load_extractions("u1")}
+
+    assert sqlite_storage.load_raw_text("u1", by_name["a"]) == (long_text, ["page one", "page two"])
+    assert sqlite_storage.load_raw_text("u1", by_name["b"]) == ("short text", None)
+    assert sqlite_storage.load_raw_text("u2", by_name["a"]) == ("", None)
+
+
+def test_store_photo_is_content_addressed(sqlite_storage):
+    first = sqlite_storage.store_photo("u1", b"jpeg bytes")
+    assert first and sqlite_storage.store_photo("u1", b"jpeg bytes") == first
+    with open(first, "rb") as fh:
+        assert fh.read() == b"jpeg bytes"
+    assert sqlite_storage.store_photo("u1", b"") == ""
+
+
+def test_save_publishes_to_local_feed(sqlite_storage):
+    feed = get_extractions_feed()
+    assert isinstance(feed, LocalChangeFeed)
+    inbox = feed.subscribe("feed-user")
+    try:
+        sqlite_storage.save_extraction("feed-user", "pan", PAN_FIELDS, "PAN text")
+        rows = inbox.drain()
+    finally:
+        feed.unsubscribe(inbox)
+    assert [r["pan_number"] for r in rows] == ["ABCPS1234K"]
+    assert "raw_text" not in rows[0]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_export_round_trip(sqlite_storage, fmt):
+    long_text = "B" * RAW_TEXT_PREVIEW_CHARS + "END"
+    sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS, long_text)
+    for i in range(4):
+        sqlite_storage.save_extraction("u1", "other", {"Name": f"n{i}"}, f"text {i}")
+    sqlite_storage.save_extraction("u2", "other", {"Name": "not exported"})
+
+    buf = io.BytesIO()
+    progress = []
+    count = export_extractions(sqlite_storage, fmt, buf, user_id="u1", page_size=2,
+                               include_raw_text=True, progress=progress.append)
+    assert count == 5
+    assert progress == [2, 4, 5]
+
+    data = buf.getvalue()
+    if fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+    elif fmt == "jsonl":
+        rows = [json.loads(line) for line in data.decode("utf-8").splitlines()]
+    else:
+        pq = pytest.importorskip("pyarrow.parquet")
+        rows = pq.read_table(io.BytesIO(data)).to_pylist()
+    assert len(rows) == 5
+    assert {r["user_id"] for r in rows} == {"u1"}
+    pan = next(r for r in rows if r["doc_type"] == "pan")
+    assert pan["raw_text"] == long_text
+    assert pan["pan_number"] == "ABCPS1234K"
+
+
+def test_export_to_bytes(sqlite_storage):
+    sqlite_storage.save_extraction("u1", "pan", PAN_FIELDS)
+    data = export_to_bytes(sqlite_storage, "jsonl", user_id="u1")
+    assert isinstance(data, bytes)
+    assert json.loads(data)["pan_number"] == "ABCPS1234K"
+
+
+def test_sqlite_file_persists_across_connections(tmp_path):
+    path, photos = str(tmp_path / "db.sqlite3"), str(tmp_path / "photos")
+    SqliteStorage(path, photos).save_extraction("u1", "pan", PAN_FIELDS)
+    reopened = SqliteStorage(path, photos)
+    assert reopened.load_counts("u1") == {"pan": 1}
+    assert reopened.check_duplicate("u1", "pan", PAN_FIELDS)
+
+
+def test_fields_csv_quotes_values():
+    assert fields_csv({"Name": "Singh, Priya", "Address": "line 1\nline 2"}) == (
+        'Name,"Singh, Priya"\r\nAddress,"line 1\nline 2"\r\n'
+    )
+
+
+def test_ocr_to_storage_pipeline(ocr_server, sample_jpeg, sqlite_storage):
+    _, client = ocr_server(fixtures=[BUILTIN_FIXTURES[1]])
+    result = recognize_auto(OcrSpaceEngine(), sample_jpeg, "eng", client=client)
+    doc_type, fields = result["AutoEngine"]["parsed"]
+    text = result["ParsedResults"][0]["ParsedText"]
+
+    assert sqlite_storage.save_extraction("u1", doc_type, fields, text, "pan.jpg", len(sample_jpeg)) == (True, None)
+    assert sqlite_storage.save_extraction("u1", doc_type, fields, text) == (False, "duplicate")
+    (row,) = sqlite_storage.load_extractions("u1")
+    assert (row["doc_type"], row["pan_number"], row["holder_name"]) == ("pan", "ABCPS1234K", "Priya Singh")
+    assert sqlite_storage.load_raw_text("u1", row["id"]) == (text, None)
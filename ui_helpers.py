@@ -1,19 +1,103 @@
+import io
+import os
+import base64
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
-def render_kv_table(fields):
+from PIL import Image
+
+PREVIEW_MAX_WIDTH = 640
+PREVIEW_CACHE_SIZE = 4
+HTML_CACHE_SIZE = int(os.getenv("HTML_CACHE_SIZE", "2048") or 0)
+
+
+# Bounded LRU of rendered HTML fragments, shared by all sessions. Keys are a
+# record/result id plus a hash of the rendered values, so a changed record just
+# misses; unchanged ones skip the string building on every rerun.
+class HtmlCache:
+    def __init__(self, capacity: int = HTML_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        if key is None or self.capacity <= 0:
+            return render()
+        with self._lock:
+            html = self._items.get(key)
+            if html is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return html
+        html = render()
+        with self._lock:
+            self.misses += 1
+            self._items[key] = html
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return html
+
+    def stats(self):
+        return {"entries": len(self._items), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+HTML_CACHE = HtmlCache()
+
+
+def content_key(kind, record_id, values):
+    # None (no caching) without an id to scope the entry to.
+    if record_id is None:
+        return None
+    return kind, record_id, hash(tuple((k, str(v)) for k, v in values.items()))
+
+
+def render_kv_table(fields, record_id=None):
+    return HTML_CACHE.get_or_render(content_key("kv", record_id, fields or {}), lambda: _render_kv_table(fields))
+
+
+def _render_kv_table(fields):
     if not fields:
         return "<p style='color:#9ca3af;font-style:italic;font-size:0.82rem;'>No fields extracted.</p>"
     rows = "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in fields.items())
     return f"""<table class=\"kv-table\">\n        <thead><tr><th>Field</th><th>Value</th></tr></thead>\n        <tbody>{rows}</tbody></table>"""
 
 
+def render_sidebar_kv(display, record_id=None):
+    return HTML_CACHE.get_or_render(content_key("sb_kv", record_id, display), lambda: _render_sidebar_kv(display))
+
+
+def _render_sidebar_kv(display):
+    rows_html = "".join(
+        f'<div class="sb-kv-row"><span class="sb-key">{k}</span><span class="sb-val">{v}</span></div>'
+        for k, v in display.items()
+    )
+    return f'<div class="sb-kv">{rows_html}</div>'
+
+
 def render_confidence_bar(score):
-    pct = min(max(int(score * 100), 0), 100)
+    return _confidence_bar(min(max(int(score * 100), 0), 100))
+
+
+@lru_cache(maxsize=128)
+def _confidence_bar(pct):
     cls = "conf-high" if pct >= 70 else ("conf-mid" if pct >= 40 else "conf-low")
     return f"""<div class=\"conf-wrap\">\n        <span class=\"conf-label\">Confidence</span>\n        <div class=\"conf-bg\"><div class=\"conf-fill {cls}\" style=\"width:{pct}%\"></div></div>\n        <span class=\"conf-pct\">{pct}%</span></div>"""
 
 
-def photo_html(b64, name="", doc_type=""):
-    if b64:
+def photo_html(photo_bytes, name="", doc_type="", photo_key=None):
+    # photo_key identifies the crop's content (its artifact handle); with it the
+    # base64 encoding happens once per result instead of on every rerun.
+    key = ("photo", photo_key, name, doc_type) if photo_key else None
+    return HTML_CACHE.get_or_render(key, lambda: _photo_html(photo_bytes, name, doc_type))
+
+
+def _photo_html(photo_bytes, name="", doc_type=""):
+    # The only place a face crop is base64-encoded: inline in the result HTML.
+    if photo_bytes:
+        b64 = base64.b64encode(photo_bytes).decode("ascii")
         photo_div = f'<div class="photo-frame"><img src="data:image/jpeg;base64,{b64}"/></div>'
     else:
         photo_div = '<div class="photo-placeholder">👤<br/>No photo</div>'
@@ -25,3 +109,31 @@ def photo_html(b64, name="", doc_type=""):
     }
     sub = sub_map.get(doc_type, "")
     return f"""<div class=\"photo-card\">\n        {photo_div}\n        <div class=\"photo-meta\">\n            <div class=\"photo-label\">ID Card Holder</div>\n            <div class=\"photo-name\">{name or '—'}</div>\n            <div class=\"photo-sub\">{sub}</div>\n        </div></div>"""
+
+
+def make_preview(raw_bytes, max_width=PREVIEW_MAX_WIDTH):
+    try:
+        img = Image.open(io.BytesIO(raw_bytes))
+        img.draft("RGB", (max_width, max_width * 2))
+        img = img.convert("RGB")
+        img.thumbnail((max_width, max_width * 2), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=80, optimize=True)
+        return buf.getvalue()
+    except Exception:
+        return None
+
+
+def cached_preview(cache, key, load_bytes, max_width=PREVIEW_MAX_WIDTH):
+    # Downsample once per content key; `load_bytes` is only called on a miss so
+    # the full upload is not re-read on every rerun. A failed downsample caches
+    # an empty marker, never the full upload, and shows the original uncached.
+    preview = cache.get(key)
+    if preview is None:
+        original = load_bytes()
+        preview = make_preview(original, max_width) or b""
+        cache[key] = preview
+        while len(cache) > PREVIEW_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        return preview or original
+    return preview or load_bytes()